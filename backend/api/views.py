@@ -18,6 +18,8 @@ from django.db.models import Q, Sum, Count, Avg
 from django.db import transaction
 import hashlib
 
+from turnos.archivo import contar_asistencias
+
 
 
 # ========== AUTENTICACIÓN ==========
@@ -723,7 +725,9 @@ def dashboard_socio(request):
         'diasRestantes': 68
     }
     total_clases = clases.count()
-    asistencias_mes = 12
+    # Turnos del mes que ya empezaron (incluye los archivados)
+    inicio_mes = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    asistencias_mes = contar_asistencias(user.id, inicio_mes, timezone.now())
     return Response({
         'user': {
             'username': user.username,
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Los eventos en vivo de turnos (/api/turnos/eventos/) son una vista async
+con streaming y necesitan este entrypoint, ej:
+    uvicorn backend.asgi:application
 """
 
 import os
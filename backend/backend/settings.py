@@ -107,6 +107,38 @@ DATABASES = {
     }
 }
 
+# Caché en memoria del proceso (calendario de turnos).
+# Con varios procesos se puede usar el backend de archivos:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gimnasio',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    }
+}
+
+# Eventos en vivo de turnos (/api/turnos/eventos/, requiere ASGI).
+# BrokerLocal reparte en memoria; con varios procesos usar BrokerBaseDatos.
+TURNOS_BROKER_EVENTOS = 'turnos.eventos.BrokerLocal'
+
+# Promover la lista de espera en un hilo del proceso al liberarse un cupo.
+# Con False (o además, como respaldo) correr `manage.py promover_lista_espera`.
+TURNOS_LISTA_ESPERA_EN_SEGUNDO_PLANO = True
+
+# Días que los turnos finalizados quedan en la tabla de turnos antes de
+# pasar a TurnoHistorico (`manage.py archivar_turnos`, también en generar_cupos).
+TURNOS_ARCHIVAR_DESPUES_DE_DIAS = 30
+
+# Kiosco de check-in: validez del QR y escritura de los ingresos por lotes
+# (cada TURNOS_CHECKIN_INTERVALO segundos). Con varios procesos cada uno junta los suyos.
+# Los pendientes se guardan al apagar el proceso; si muere sin apagarse se pierden
+# los ingresos del último intervalo (con TURNOS_CHECKIN_EN_LOTE = False no hay pérdida).
+TURNOS_CHECKIN_VIGENCIA_SEGUNDOS = 300
+TURNOS_CHECKIN_EN_LOTE = True
+TURNOS_CHECKIN_INTERVALO = 2
+
 
 
 AUTH_PASSWORD_VALIDATORS = [
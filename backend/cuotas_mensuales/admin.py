@@ -1,7 +1,7 @@
 # cuotas_mensuales/admin.py
 
 from django.contrib import admin
-from .models import Plan, CuotaMensual, HistorialPago
+from .models import Plan, CuotaMensual, HistorialPago, CambioEstadoCuota
 
 @admin.register(Plan)
 class PlanAdmin(admin.ModelAdmin):
@@ -12,6 +12,20 @@ class PlanAdmin(admin.ModelAdmin):
     ordering = ['precio']
 
 
+class EstadoCalculadoFilter(admin.SimpleListFilter):
+    """Activa / por vencer / vencida según la fecha de vencimiento (filtra en la base)"""
+    title = 'estado calculado'
+    parameter_name = 'estado_calculado'
+
+    def lookups(self, request, model_admin):
+        return [('activa', 'Activa'), ('por_vencer', 'Por vencer'), ('vencida', 'Vencida')]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.con_estado(self.value())
+        return queryset
+
+
 @admin.register(CuotaMensual)
 class CuotaMensualAdmin(admin.ModelAdmin):
     list_display = [
@@ -23,7 +37,7 @@ class CuotaMensualAdmin(admin.ModelAdmin):
         'estado',
         'dias_restantes_display'
     ]
-    list_filter = ['estado', 'fecha_inicio', 'fecha_vencimiento', 'plan']
+    list_filter = ['estado', EstadoCalculadoFilter, 'fecha_inicio', 'fecha_vencimiento', 'plan']
     search_fields = ['socio__username', 'socio__email', 'plan_nombre']
     readonly_fields = ['plan_nombre', 'plan_precio', 'created_at', 'updated_at']
     date_hierarchy = 'fecha_inicio'
@@ -47,14 +61,18 @@ class CuotaMensualAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_estado_calculado().select_related('socio')
+    
     def dias_restantes_display(self, obj):
-        dias = obj.dias_restantes()
+        dias = obj.dias_para_vencer
         if dias == 0:
             return '⚠️ Vencida'
         elif dias <= 7:
             return f'⚠️ {dias} días'
         return f'✅ {dias} días'
     dias_restantes_display.short_description = 'Días Restantes'
+    dias_restantes_display.admin_order_field = 'fecha_vencimiento'
     
     actions = ['renovar_cuotas_seleccionadas', 'suspender_cuotas']
     
@@ -96,4 +114,12 @@ class HistorialPagoAdmin(admin.ModelAdmin):
             'fields': ('created_at',),
             'classes': ('collapse',)
         })
-    )
\ No newline at end of file
+    )
+
+@admin.register(CambioEstadoCuota)
+class CambioEstadoCuotaAdmin(admin.ModelAdmin):
+    list_display = ['cuota', 'socio', 'estado_anterior', 'estado_nuevo', 'motivo', 'fecha']
+    list_filter = ['motivo', 'estado_nuevo', 'fecha']
+    search_fields = ['socio__username']
+    raw_id_fields = ['cuota', 'socio']
+    date_hierarchy = 'fecha'
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CuotasMensualesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cuotas_mensuales'
+
+    def ready(self):
+        from . import signals  # noqa: F401
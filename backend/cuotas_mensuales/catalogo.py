@@ -0,0 +1,66 @@
+# cuotas_mensuales/catalogo.py
+"""
+Catálogo de planes en memoria.
+
+Los planes son pocas filas que casi no cambian y se leen en cada visita a
+la landing (planes_activos, plan_popular) y en cada cuota serializada
+(plan_info). El catálogo se carga una vez por proceso, ya serializado con
+PlanSerializer, y se reutiliza entre requests. Se invalida con las señales
+de Plan y, como respaldo para otros procesos, se recarga cada
+DURACION_CACHE segundos (lo mismo que la plantilla de horarios).
+
+La versión es un hash del contenido: todos los procesos con los mismos
+planes dan el mismo ETag.
+"""
+import hashlib
+import json
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Plan
+
+DURACION_CACHE = 60
+
+_cache = {'catalogo': None, 'cargado': 0.0}
+
+
+def _cargar():
+    # Import local: serializers usa este módulo para plan_info
+    from .serializers import PlanSerializer
+
+    planes = [dict(datos) for datos in PlanSerializer(Plan.objects.all(), many=True).data]
+    activos = [plan for plan in planes if plan['activo']]
+    contenido = json.dumps(planes, cls=DjangoJSONEncoder, sort_keys=True)
+
+    return {
+        'planes': planes,
+        'por_id': {plan['id']: plan for plan in planes},
+        'activos': activos,
+        'popular': next((plan for plan in activos if plan['es_popular']), None),
+        'version': hashlib.md5(contenido.encode()).hexdigest(),
+    }
+
+
+def obtener_catalogo():
+    """{planes, por_id, activos, popular, version}: los planes ya serializados (no modificar)"""
+    catalogo = _cache['catalogo']
+    if catalogo is None or time.monotonic() - _cache['cargado'] > DURACION_CACHE:
+        catalogo = _cargar()
+        _cache['catalogo'] = catalogo
+        _cache['cargado'] = time.monotonic()
+    return catalogo
+
+
+def invalidar_catalogo():
+    _cache['catalogo'] = None
+
+
+def plan_serializado(plan_id):
+    """Datos de PlanSerializer de un plan, o None si no está en el catálogo"""
+    plan = obtener_catalogo()['por_id'].get(plan_id)
+    if plan is None and plan_id is not None:
+        # Plan creado en otro proceso antes de la recarga
+        invalidar_catalogo()
+        plan = obtener_catalogo()['por_id'].get(plan_id)
+    return plan
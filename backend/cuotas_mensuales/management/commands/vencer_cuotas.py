@@ -0,0 +1,26 @@
+# cuotas_mensuales/management/commands/vencer_cuotas.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cuotas_mensuales.vencimientos import LOTE_POR_DEFECTO, vencer_cuotas
+
+
+class Command(BaseCommand):
+    help = (
+        'Pasa a "vencida" las cuotas activas cuya fecha de vencimiento ya pasó y '
+        'registra el cambio de estado. Correr todas las noches (se puede repetir).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=LOTE_POR_DEFECTO,
+            help=f'Cuotas por lote (default {LOTE_POR_DEFECTO})'
+        )
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        total = vencer_cuotas(hoy, options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total} cuotas vencidas (vencimiento anterior al {hoy:%d/%m/%Y}).'
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuotas_mensuales', '0005_alter_cuotamensual_clases_restantes_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioEstadoCuota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(choices=[('activa', 'Activa'), ('vencida', 'Vencida')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('activa', 'Activa'), ('vencida', 'Vencida')], max_length=20)),
+                ('motivo', models.CharField(choices=[('vencimiento', 'Vencimiento')], default='vencimiento', max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cuota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios_estado', to='cuotas_mensuales.cuotamensual')),
+                ('socio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios_estado_cuota', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cambio de Estado de Cuota',
+                'verbose_name_plural': 'Cambios de Estado de Cuotas',
+                'db_table': 'cuotas_cambios_estado',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['socio', 'fecha'], name='cuotas_camb_socio_i_dd2bd4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Índice de auth_user.email para la búsqueda por prefijo del listado de cuotas.
+# Con la collation de MySQL istartswith es un LIKE 'texto%' que usa un índice
+# común (un índice sobre UPPER(email) no serviría: la consulta no usa UPPER).
+# La tabla es de django.contrib.auth, por eso se crea desde esta app.
+INDICE_EMAIL = models.Index(fields=['email'], name='auth_user_email_idx')
+
+
+def crear_indice_email(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.add_index(User, INDICE_EMAIL)
+
+
+def borrar_indice_email(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.remove_index(User, INDICE_EMAIL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuotas_mensuales', '0006_cambioestadocuota'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_email, borrar_indice_email),
+    ]
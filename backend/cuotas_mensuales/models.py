@@ -65,6 +65,93 @@ class Plan(models.Model):
         return []
 
 
+class DiasHasta(models.Func):
+    """
+    Días enteros desde una fecha fija hasta un campo fecha (negativo si ya
+    pasó), calculados en la base: DATEDIFF en MySQL, julianday en SQLite.
+    """
+    output_field = models.IntegerField()
+
+    def __init__(self, expresion, desde, **extra):
+        super().__init__(expresion, models.Value(desde, output_field=models.DateField()), **extra)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='DATEDIFF', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # date - date ya es un entero de días
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+
+class CuotaMensualQuerySet(models.QuerySet):
+    """
+    Estado calculado ('activa', 'por_vencer', 'vencida') y días restantes
+    resueltos en la base, para filtrar y ordenar sin recorrer las cuotas.
+    Los filtros van contra fecha_vencimiento (indexada).
+
+    La anotación de días se llama dias_para_vencer: dias_restantes ya es
+    un método del modelo.
+    """
+    # Días antes del vencimiento en los que la cuota figura 'por_vencer'
+    DIAS_POR_VENCER = 5
+    ESTADOS_CALCULADOS = ('activa', 'por_vencer', 'vencida')
+
+    def con_estado_calculado(self, hoy=None):
+        hoy = hoy or timezone.localdate()
+        return self.annotate(
+            dias_para_vencer=DiasHasta('fecha_vencimiento', hoy),
+            estado_calculado=models.Case(
+                models.When(fecha_vencimiento__lt=hoy, then=models.Value('vencida')),
+                models.When(
+                    fecha_vencimiento__lte=hoy + timedelta(days=self.DIAS_POR_VENCER),
+                    then=models.Value('por_vencer')
+                ),
+                default=models.Value('activa'),
+                output_field=models.CharField()
+            )
+        )
+
+    def con_estado(self, estado_calculado, hoy=None):
+        """Filtra por estado calculado como rango de fecha_vencimiento"""
+        hoy = hoy or timezone.localdate()
+        limite_por_vencer = hoy + timedelta(days=self.DIAS_POR_VENCER)
+        if estado_calculado == 'vencida':
+            return self.filter(fecha_vencimiento__lt=hoy)
+        if estado_calculado == 'por_vencer':
+            return self.filter(fecha_vencimiento__gte=hoy, fecha_vencimiento__lte=limite_por_vencer)
+        if estado_calculado == 'activa':
+            return self.filter(fecha_vencimiento__gt=limite_por_vencer)
+        raise ValueError(f"Estado calculado inválido: {estado_calculado}")
+
+    def ultimas_por_socio(self):
+        """Solo la cuota más reciente de cada socio (por fecha_inicio)"""
+        ultima = CuotaMensual.objects.filter(
+            socio_id=models.OuterRef('socio_id')
+        ).order_by('-fecha_inicio', '-id').values('pk')[:1]
+        return self.filter(pk=models.Subquery(ultima))
+
+    def contar_por_estado(self, hoy=None):
+        """{total, activas, por_vencer, vencidas} por estado calculado, en una consulta"""
+        hoy = hoy or timezone.localdate()
+        limite_por_vencer = hoy + timedelta(days=self.DIAS_POR_VENCER)
+        return self.aggregate(
+            total=models.Count('id'),
+            activas=models.Count('id', filter=models.Q(fecha_vencimiento__gt=limite_por_vencer)),
+            por_vencer=models.Count('id', filter=models.Q(
+                fecha_vencimiento__gte=hoy, fecha_vencimiento__lte=limite_por_vencer
+            )),
+            vencidas=models.Count('id', filter=models.Q(fecha_vencimiento__lt=hoy)),
+        )
+
+
 class CuotaMensual(models.Model):
     """
     Cuotas mensuales de cada socio
@@ -105,6 +192,8 @@ class CuotaMensual(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CuotaMensualQuerySet.as_manager()
+    
     class Meta:
         db_table = 'cuotas_mensuales'
         verbose_name = 'Cuota Mensual'
@@ -170,7 +259,7 @@ class CuotaMensual(models.Model):
             self.estado = 'activa'
     
     def dias_restantes(self):
-        """Calcula los días restantes hasta el vencimiento"""
+        """Calcula los días restantes hasta el vencimiento (en listados: CuotaMensual.objects.con_estado_calculado())"""
         hoy = timezone.now().date()
         delta = self.fecha_vencimiento - hoy
         return delta.days
@@ -184,7 +273,7 @@ class CuotaMensual(models.Model):
         
         if hoy > self.fecha_vencimiento:
             return 'vencida'
-        elif dias <= 5:
+        elif dias <= CuotaMensualQuerySet.DIAS_POR_VENCER:
             return 'por_vencer'
         else:
             return 'activa'
@@ -200,13 +289,61 @@ class CuotaMensual(models.Model):
         self.save()
     
     # 🆕 NUEVO MÉTODO
-    def descontar_clase(self):
-        """Descuenta 1 clase. Retorna True si se pudo descontar, False si no hay clases"""
-        if self.clases_restantes > 0:
-            self.clases_restantes -= 1
-            self.save(update_fields=['clases_restantes'])
-            return True
-        return False
+    def descontar_clase(self, cantidad=1):
+        """Descuenta `cantidad` clases (1 por defecto). Retorna True si se pudo descontar, False si no alcanzan"""
+        # UPDATE condicional: dos reservas simultáneas no pueden dejar el saldo negativo
+        descontadas = CuotaMensual.objects.filter(
+            pk=self.pk,
+            clases_restantes__gte=cantidad
+        ).update(clases_restantes=models.F('clases_restantes') - cantidad)
+        self.refresh_from_db(fields=['clases_restantes'])
+        return descontadas == 1
+
+    def devolver_clase(self, maximo=None):
+        """Devuelve 1 clase sin superar el máximo. Retorna True si se pudo devolver"""
+        cuotas = CuotaMensual.objects.filter(pk=self.pk)
+        if maximo is not None:
+            cuotas = cuotas.filter(clases_restantes__lt=maximo)
+        devueltas = cuotas.update(clases_restantes=models.F('clases_restantes') + 1)
+        self.refresh_from_db(fields=['clases_restantes'])
+        return devueltas == 1
+
+
+class CambioEstadoCuota(models.Model):
+    """
+    Registro de cada cambio de estado de una cuota (ej: activa -> vencida
+    al pasar la fecha de vencimiento, ver vencimientos.py)
+    """
+    MOTIVO_CHOICES = [
+        ('vencimiento', 'Vencimiento'),
+    ]
+
+    cuota = models.ForeignKey(
+        CuotaMensual,
+        on_delete=models.CASCADE,
+        related_name='cambios_estado'
+    )
+    socio = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cambios_estado_cuota'
+    )
+    estado_anterior = models.CharField(max_length=20, choices=CuotaMensual.ESTADO_CHOICES)
+    estado_nuevo = models.CharField(max_length=20, choices=CuotaMensual.ESTADO_CHOICES)
+    motivo = models.CharField(max_length=20, choices=MOTIVO_CHOICES, default='vencimiento')
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'cuotas_cambios_estado'
+        verbose_name = 'Cambio de Estado de Cuota'
+        verbose_name_plural = 'Cambios de Estado de Cuotas'
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['socio', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"Cuota {self.cuota_id}: {self.estado_anterior} -> {self.estado_nuevo} ({self.fecha:%d/%m/%Y})"
 
 
 class HistorialPago(models.Model):
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from .models import Plan, CuotaMensual, HistorialPago
+from .catalogo import plan_serializado
 from django.contrib.auth.models import User
 
 class PlanSerializer(serializers.ModelSerializer):
@@ -30,12 +31,19 @@ class PlanSerializer(serializers.ModelSerializer):
         return obj.get_caracteristicas_list()
 
 
+def _plan_info(cuota):
+    """Plan de la cuota desde el catálogo en memoria (sin consultar Plan)"""
+    plan = plan_serializado(cuota.plan_id)
+    return plan if plan is not None else PlanSerializer(cuota.plan).data
+
+
 class CuotaMensualSerializer(serializers.ModelSerializer):
     socio_username = serializers.CharField(source='socio.username', read_only=True)
     socio_nombre = serializers.CharField(source='socio.first_name', read_only=True)
     socio_email = serializers.CharField(source='socio.email', read_only=True)
-    plan_info = PlanSerializer(source='plan', read_only=True)
+    plan_info = serializers.SerializerMethodField()
     dias_restantes = serializers.SerializerMethodField()
+    estado_calculado = serializers.SerializerMethodField()
     
     class Meta:
         model = CuotaMensual
@@ -52,6 +60,7 @@ class CuotaMensualSerializer(serializers.ModelSerializer):
             'fecha_inicio',
             'fecha_vencimiento',
             'estado',
+            'estado_calculado',
             'tarjeta_ultimos_4',
             'dias_restantes',
             'clases_totales',      # 🆕
@@ -62,7 +71,49 @@ class CuotaMensualSerializer(serializers.ModelSerializer):
         read_only_fields = ['plan_nombre', 'plan_precio', 'clases_totales', 'clases_restantes', 'created_at', 'updated_at']
     
     def get_dias_restantes(self, obj):
-        return obj.dias_restantes()
+        # Si viene anotado por CuotaMensual.objects.con_estado_calculado() no se recalcula
+        dias = getattr(obj, 'dias_para_vencer', None)
+        return dias if dias is not None else obj.dias_restantes()
+    
+    def get_estado_calculado(self, obj):
+        return getattr(obj, 'estado_calculado', None) or obj.get_estado_calculado()
+    
+    def get_plan_info(self, obj):
+        return _plan_info(obj)
+
+
+class CuotaMensualListaSerializer(serializers.ModelSerializer):
+    """
+    Fila del listado paginado: el plan va solo por id (los planes de la
+    página se mandan una vez aparte) y los datos del socio ya vienen unidos.
+    Espera el queryset anotado con CuotaMensual.objects.con_estado_calculado().
+    """
+    socio_username = serializers.CharField(source='socio.username', read_only=True)
+    socio_nombre = serializers.CharField(source='socio.first_name', read_only=True)
+    socio_email = serializers.CharField(source='socio.email', read_only=True)
+    dias_restantes = serializers.IntegerField(source='dias_para_vencer', read_only=True)
+    estado_calculado = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = CuotaMensual
+        fields = [
+            'id',
+            'socio',
+            'socio_username',
+            'socio_nombre',
+            'socio_email',
+            'plan',
+            'plan_nombre',
+            'plan_precio',
+            'fecha_inicio',
+            'fecha_vencimiento',
+            'estado',
+            'estado_calculado',
+            'dias_restantes',
+            'clases_totales',
+            'clases_restantes',
+        ]
+        read_only_fields = fields
 
 
 class CuotaMensualCreateSerializer(serializers.ModelSerializer):
@@ -86,7 +137,7 @@ class CuotaMensualCreateSerializer(serializers.ModelSerializer):
 class CuotaMensualSocioSerializer(serializers.ModelSerializer):
     """Serializer simplificado para que el socio vea su cuota"""
     dias_restantes = serializers.SerializerMethodField()
-    plan_info = PlanSerializer(source='plan', read_only=True)
+    plan_info = serializers.SerializerMethodField()
     
     class Meta:
         model = CuotaMensual
@@ -106,6 +157,9 @@ class CuotaMensualSocioSerializer(serializers.ModelSerializer):
     
     def get_dias_restantes(self, obj):
         return obj.dias_restantes()
+    
+    def get_plan_info(self, obj):
+        return _plan_info(obj)
 
 
 class HistorialPagoSerializer(serializers.ModelSerializer):
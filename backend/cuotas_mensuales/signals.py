@@ -0,0 +1,15 @@
+# cuotas_mensuales/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Plan
+from .catalogo import invalidar_catalogo
+
+
+@receiver([post_save, post_delete], sender=Plan)
+def invalidar_catalogo_planes(sender, **kwargs):
+    """Descartar el catálogo de planes cuando cambia un plan"""
+    invalidar_catalogo()
+    # Otro request podría recargarlo antes del commit con los datos viejos
+    transaction.on_commit(invalidar_catalogo)
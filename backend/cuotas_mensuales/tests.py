@@ -1,3 +1,301 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .catalogo import DURACION_CACHE, invalidar_catalogo
+from .models import CambioEstadoCuota, CuotaMensual, CuotaMensualQuerySet, Plan
+from .vencimientos import vencer_cuotas
+
+
+class CuotasTestCase(TestCase):
+    """Plan 2x semanal y un socio"""
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.plan = Plan.objects.create(
+            nombre='2x Semanal', precio=1000, frecuencia='2', tipo_limite='semanal', cantidad_limite=2
+        )
+        self.socio = User.objects.create_user('socio', email='socio@gym.com', password='x')
+        self.client = APIClient()
+
+    def crear_cuota(self, dias, socio=None, plan=None, inicio=None):
+        """Cuota que vence dentro de `dias` días (negativo: ya venció), sin que el save la marque vencida"""
+        cuota = CuotaMensual.objects.create(
+            socio=socio or self.socio,
+            plan=plan or self.plan,
+            fecha_inicio=inicio or self.hoy - timedelta(days=30),
+            fecha_vencimiento=self.hoy + timedelta(days=30)
+        )
+        CuotaMensual.objects.filter(pk=cuota.pk).update(fecha_vencimiento=self.hoy + timedelta(days=dias))
+        cuota.refresh_from_db()
+        return cuota
+
+
+class VencerCuotasTests(CuotasTestCase):
+
+    def test_vence_solo_las_cuotas_pasadas(self):
+        vencida = self.crear_cuota(-1)
+        vence_hoy = self.crear_cuota(0, socio=User.objects.create_user('otro'))
+        futura = self.crear_cuota(10, socio=User.objects.create_user('tercero'))
+
+        salida = StringIO()
+        call_command('vencer_cuotas', stdout=salida)
+
+        self.assertIn('1 cuotas vencidas', salida.getvalue())
+        self.assertEqual(
+            dict(CuotaMensual.objects.values_list('pk', 'estado')),
+            {vencida.pk: 'vencida', vence_hoy.pk: 'activa', futura.pk: 'activa'}
+        )
+        cambio = CambioEstadoCuota.objects.get()
+        self.assertEqual(
+            (cambio.cuota_id, cambio.socio_id, cambio.estado_anterior, cambio.estado_nuevo, cambio.motivo),
+            (vencida.pk, self.socio.pk, 'activa', 'vencida', 'vencimiento')
+        )
+
+    def test_volver_a_correr_no_hace_nada(self):
+        self.crear_cuota(-3)
+        self.assertEqual(vencer_cuotas(), 1)
+
+        self.assertEqual(vencer_cuotas(), 0)
+        self.assertEqual(CambioEstadoCuota.objects.count(), 1)
+
+    def test_de_a_lotes_un_cambio_por_cuota(self):
+        cuotas = [
+            self.crear_cuota(-dias, socio=User.objects.create_user(f'socio{dias}')) for dias in range(1, 6)
+        ]
+
+        self.assertEqual(vencer_cuotas(lote=2), 5)
+
+        self.assertFalse(CuotaMensual.objects.filter(estado='activa').exists())
+        self.assertEqual(
+            sorted(CambioEstadoCuota.objects.values_list('cuota_id', flat=True)), [cuota.pk for cuota in cuotas]
+        )
+
+    def test_las_ya_vencidas_no_generan_cambios(self):
+        cuota = self.crear_cuota(-1)
+        CuotaMensual.objects.filter(pk=cuota.pk).update(estado='vencida')
+
+        self.assertEqual(vencer_cuotas(), 0)
+        self.assertFalse(CambioEstadoCuota.objects.exists())
+
+
+class EstadoCalculadoTests(CuotasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Un socio por cuota: días hasta el vencimiento -> estado calculado
+        self.esperados = {-1: 'vencida', 0: 'por_vencer', 5: 'por_vencer', 6: 'activa'}
+        self.cuotas = {
+            dias: self.crear_cuota(dias, socio=User.objects.create_user(f'socio{i}'))
+            for i, dias in enumerate(self.esperados)
+        }
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def test_anotacion_en_los_limites(self):
+        anotadas = {
+            cuota.pk: (cuota.dias_para_vencer, cuota.estado_calculado)
+            for cuota in CuotaMensual.objects.con_estado_calculado()
+        }
+
+        for dias, estado in self.esperados.items():
+            cuota = self.cuotas[dias]
+            self.assertEqual(anotadas[cuota.pk], (dias, estado))
+            # Igual que el cálculo en Python del modelo
+            self.assertEqual(cuota.get_estado_calculado(), estado)
+            self.assertEqual(cuota.dias_restantes(), dias)
+
+    def test_con_estado_coincide_con_la_anotacion(self):
+        for estado in CuotaMensualQuerySet.ESTADOS_CALCULADOS:
+            self.assertEqual(
+                set(CuotaMensual.objects.con_estado(estado).values_list('pk', flat=True)),
+                {self.cuotas[dias].pk for dias, esperado in self.esperados.items() if esperado == estado},
+                estado
+            )
+
+    def test_con_otro_dia(self):
+        # Un día después la de hoy vence y la de 6 días pasa a por vencer
+        manana = self.hoy + timedelta(days=1)
+
+        self.assertEqual(
+            set(CuotaMensual.objects.con_estado('vencida', hoy=manana).values_list('pk', flat=True)),
+            {self.cuotas[-1].pk, self.cuotas[0].pk}
+        )
+        self.assertEqual(
+            CuotaMensual.objects.con_estado_calculado(hoy=manana).get(pk=self.cuotas[6].pk).estado_calculado,
+            'por_vencer'
+        )
+
+    def test_estado_invalido(self):
+        with self.assertRaises(ValueError):
+            CuotaMensual.objects.con_estado('pendiente')
+
+    def test_listado_filtra_y_ordena_por_dias_restantes(self):
+        self.client.force_authenticate(self.staff)
+
+        respuesta = self.client.get(
+            '/api/cuotas/cuota_mensual/', {'estado_calculado': 'por_vencer', 'ordering': '-dias_restantes'}
+        )
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            [(cuota['id'], cuota['dias_restantes']) for cuota in respuesta.data],
+            [(self.cuotas[5].pk, 5), (self.cuotas[0].pk, 0)]
+        )
+
+        respuesta = self.client.get('/api/cuotas/cuota_mensual/', {'ordering': 'dias_restantes'})
+        self.assertEqual([cuota['dias_restantes'] for cuota in respuesta.data], [-1, 0, 5, 6])
+
+    def test_listado_parametros_invalidos(self):
+        self.client.force_authenticate(self.staff)
+        for params in ({'estado_calculado': 'pendiente'}, {'ordering': 'socio'}):
+            self.assertEqual(self.client.get('/api/cuotas/cuota_mensual/', params).status_code, 400, params)
+
+
+class ListadoCuotasTests(CuotasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.libre = Plan.objects.create(nombre='Pase Libre', precio=2000, frecuencia='libre', tipo_limite='libre')
+        self.otro = User.objects.create_user('otro', email='ana@gym.com')
+        # El socio renovó: la cuota vieja quedó vencida
+        self.vieja = self.crear_cuota(-20, inicio=self.hoy - timedelta(days=50))
+        CuotaMensual.objects.filter(pk=self.vieja.pk).update(estado='vencida')
+        self.actual = self.crear_cuota(3, inicio=self.hoy - timedelta(days=27))
+        self.de_otro = self.crear_cuota(20, socio=self.otro, plan=self.libre, inicio=self.hoy - timedelta(days=10))
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_authenticate(self.staff)
+
+    def listar(self, **params):
+        respuesta = self.client.get('/api/cuotas/cuota_mensual/', {'page_size': 10, **params})
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data
+
+    def ids(self, **params):
+        return [cuota['id'] for cuota in self.listar(**params)['results']]
+
+    def test_pagina_con_los_planes_aparte(self):
+        datos = self.listar()
+
+        # Por defecto de la más reciente a la más vieja
+        self.assertEqual(
+            [cuota['id'] for cuota in datos['results']], [self.de_otro.pk, self.actual.pk, self.vieja.pk]
+        )
+        self.assertEqual(datos['results'][0]['plan'], self.libre.pk)
+        self.assertEqual(
+            {plan_id: plan['nombre'] for plan_id, plan in datos['planes'].items()},
+            {self.plan.pk: '2x Semanal', self.libre.pk: 'Pase Libre'}
+        )
+
+    def test_cursor_recorre_todo(self):
+        primera = self.listar(page_size=2)
+        segunda = self.client.get(primera['next']).data
+
+        self.assertEqual(
+            [cuota['id'] for cuota in primera['results'] + segunda['results']],
+            [self.de_otro.pk, self.actual.pk, self.vieja.pk]
+        )
+        self.assertIsNone(segunda['next'])
+        self.assertEqual(list(segunda['planes']), [self.plan.pk])
+
+    def test_filtros(self):
+        self.assertEqual(self.ids(estado='vencida'), [self.vieja.pk])
+        self.assertEqual(self.ids(plan=str(self.libre.pk)), [self.de_otro.pk])
+        self.assertEqual(
+            self.ids(vence_desde=str(self.hoy), vence_hasta=str(self.hoy + timedelta(days=5))), [self.actual.pk]
+        )
+        self.assertEqual(self.ids(ultima='1'), [self.de_otro.pk, self.actual.pk])
+
+    def test_busqueda_por_prefijo_de_usuario_o_email(self):
+        self.assertEqual(self.ids(search='SOC'), [self.actual.pk, self.vieja.pk])
+        self.assertEqual(self.ids(search='ana@'), [self.de_otro.pk])
+        # Solo prefijos
+        self.assertEqual(self.ids(search='gym.com'), [])
+
+    def test_filtro_invalido(self):
+        for params in ({'estado': 'pendiente'}, {'plan': 'x'}, {'vence_desde': '01/01/2026'}):
+            respuesta = self.client.get('/api/cuotas/cuota_mensual/', params)
+            self.assertEqual(respuesta.status_code, 400, params)
+
+    def test_sin_page_size_devuelve_la_lista_completa(self):
+        respuesta = self.client.get('/api/cuotas/cuota_mensual/', {'ultima': '1'})
+
+        self.assertEqual([cuota['id'] for cuota in respuesta.data], [self.de_otro.pk, self.actual.pk])
+
+    def test_socio_solo_ve_sus_cuotas(self):
+        self.client.force_authenticate(self.otro)
+
+        self.assertEqual(self.ids(), [self.de_otro.pk])
+
+    def test_resumen(self):
+        respuesta = self.client.get('/api/cuotas/cuota_mensual/resumen/')
+
+        self.assertEqual(respuesta.data, {'total': 3, 'activas': 1, 'por_vencer': 1, 'vencidas': 1})
+        # Con los mismos filtros que el listado
+        respuesta = self.client.get('/api/cuotas/cuota_mensual/resumen/', {'ultima': '1'})
+        self.assertEqual(respuesta.data, {'total': 2, 'activas': 1, 'por_vencer': 1, 'vencidas': 0})
+
+    def test_resumen_solo_staff(self):
+        self.client.force_authenticate(self.socio)
+        self.assertEqual(self.client.get('/api/cuotas/cuota_mensual/resumen/').status_code, 403)
+
+
+class CatalogoPlanesTests(CuotasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        invalidar_catalogo()
+        self.inactivo = Plan.objects.create(
+            nombre='Viejo', precio=500, frecuencia='1', cantidad_limite=1, activo=False
+        )
+
+    def test_etag_y_304(self):
+        respuesta = self.client.get('/api/cuotas/planes/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([plan['nombre'] for plan in respuesta.data], ['Viejo', '2x Semanal'])
+        self.assertIn('max-age=60', respuesta['Cache-Control'])
+        etag = respuesta['ETag']
+
+        # Ya cargado: sin consultas a la base
+        with self.assertNumQueries(0):
+            no_modificado = self.client.get('/api/cuotas/planes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(no_modificado.status_code, 304)
+        self.assertEqual(no_modificado['ETag'], etag)
+
+    def test_guardar_un_plan_cambia_el_etag(self):
+        etag = self.client.get('/api/cuotas/planes/planes_activos/')['ETag']
+
+        self.plan.precio = 1200
+        self.plan.save()
+        respuesta = self.client.get('/api/cuotas/planes/planes_activos/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual([plan['precio'] for plan in respuesta.data], ['1200.00'])
+
+    def test_etag_por_endpoint(self):
+        etag = self.client.get('/api/cuotas/planes/')['ETag']
+
+        respuesta = self.client.get('/api/cuotas/planes/planes_activos/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_otro_proceso_recarga_al_vencer(self):
+        self.client.get('/api/cuotas/planes/')
+        # Cambio sin señal (ej: hecho desde otro proceso)
+        Plan.objects.filter(pk=self.plan.pk).update(es_popular=True)
+
+        self.assertEqual(self.client.get('/api/cuotas/planes/plan_popular/').status_code, 404)
+
+        despues = time.monotonic() + DURACION_CACHE + 1
+        with mock.patch('cuotas_mensuales.catalogo.time.monotonic', return_value=despues):
+            respuesta = self.client.get('/api/cuotas/planes/plan_popular/')
 
-# Create your tests here.
+        self.assertEqual((respuesta.status_code, respuesta.data['id']), (200, self.plan.pk))
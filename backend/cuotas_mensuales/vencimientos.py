@@ -0,0 +1,67 @@
+# cuotas_mensuales/vencimientos.py
+"""
+Vencimiento de cuotas por lotes.
+
+CuotaMensual.save() calcula el estado, pero una cuota que pasa su
+fecha_vencimiento sin que nadie la guarde sigue 'activa' en la base.
+`manage.py vencer_cuotas` (todas las noches) pasa a 'vencida' las cuotas
+activas ya vencidas con un UPDATE por lote y registra cada cambio en
+CambioEstadoCuota con un solo bulk_create. Es idempotente: una cuota ya
+vencida no vuelve a entrar, así que se puede correr las veces que haga falta.
+
+Con el job al día, las consultas pueden filtrar solo por el campo estado
+(indexado junto con el socio).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CambioEstadoCuota, CuotaMensual
+
+LOTE_POR_DEFECTO = 1000
+
+
+def vencer_lote(hoy, lote):
+    """
+    Vence un lote de cuotas activas con fecha_vencimiento anterior a hoy.
+    Retorna la cantidad de cuotas vencidas.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        # Las filas quedan bloqueadas: dos corridas a la vez no duplican eventos
+        filas = list(
+            CuotaMensual.objects.select_for_update()
+            .filter(estado='activa', fecha_vencimiento__lt=hoy)
+            .order_by('fecha_vencimiento', 'id')
+            .values_list('id', 'socio_id')[:lote]
+        )
+        if not filas:
+            return 0
+
+        CuotaMensual.objects.filter(pk__in=[pk for pk, _ in filas], estado='activa').update(
+            estado='vencida', updated_at=ahora
+        )
+        CambioEstadoCuota.objects.bulk_create([
+            CambioEstadoCuota(
+                cuota_id=pk,
+                socio_id=socio_id,
+                estado_anterior='activa',
+                estado_nuevo='vencida',
+                motivo='vencimiento',
+                fecha=ahora
+            )
+            for pk, socio_id in filas
+        ])
+
+    return len(filas)
+
+
+def vencer_cuotas(hoy=None, lote=LOTE_POR_DEFECTO):
+    """Vence todas las cuotas activas vencidas antes de hoy, de a lotes. Retorna el total"""
+    if hoy is None:
+        hoy = timezone.localdate()
+    total = 0
+    while True:
+        vencidas = vencer_lote(hoy, lote)
+        total += vencidas
+        if vencidas < lote:
+            return total
@@ -7,12 +7,18 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import transaction
-from datetime import timedelta
+from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.pagination import CursorPagination
+from datetime import datetime, timedelta
 
-from .models import Plan, CuotaMensual, HistorialPago
+from .models import Plan, CuotaMensual, CuotaMensualQuerySet, HistorialPago
+from .catalogo import DURACION_CACHE as DURACION_CACHE_CATALOGO, obtener_catalogo, plan_serializado
 from .serializers import (
     PlanSerializer,
     CuotaMensualSerializer,
+    CuotaMensualListaSerializer,
     CuotaMensualCreateSerializer,
     CuotaMensualSocioSerializer,
     HistorialPagoSerializer,
@@ -38,21 +44,35 @@ class PlanViewSet(viewsets.ModelViewSet):
         # POST, PUT, DELETE requieren autenticación
         return [IsAuthenticated()]
     
+    def _respuesta_catalogo(self, request, datos, status_code=200):
+        """
+        Respuesta pública desde el catálogo en memoria (catalogo.py), con
+        ETag por versión del catálogo: 304 si el cliente ya la tiene.
+        """
+        etag = quote_etag(f"{self.action}:{obtener_catalogo()['version']}")
+        respuesta = get_conditional_response(request, etag=etag)
+        if respuesta is None:
+            respuesta = Response(datos, status=status_code)
+        respuesta['ETag'] = etag
+        patch_cache_control(respuesta, public=True, max_age=DURACION_CACHE_CATALOGO)
+        return respuesta
+    
+    def list(self, request, *args, **kwargs):
+        """Todos los planes, desde el catálogo en memoria (sin consultar la base)"""
+        return self._respuesta_catalogo(request, obtener_catalogo()['planes'])
+    
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def planes_activos(self, request):
-        """Obtener solo planes activos (para landing page)"""
-        planes = Plan.objects.filter(activo=True).order_by('precio')
-        serializer = self.get_serializer(planes, many=True)
-        return Response(serializer.data)
+        """Obtener solo planes activos (para landing page), desde el catálogo en memoria"""
+        return self._respuesta_catalogo(request, obtener_catalogo()['activos'])
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def plan_popular(self, request):
-        """Obtener el plan marcado como popular"""
-        plan = Plan.objects.filter(activo=True, es_popular=True).first()
+        """Obtener el plan marcado como popular, desde el catálogo en memoria"""
+        plan = obtener_catalogo()['popular']
         if plan:
-            serializer = self.get_serializer(plan)
-            return Response(serializer.data)
-        return Response({'detail': 'No hay plan popular configurado'}, status=404)
+            return self._respuesta_catalogo(request, plan)
+        return self._respuesta_catalogo(request, {'detail': 'No hay plan popular configurado'}, status_code=404)
 
 
 def _is_admin_or_entrenador(user):
@@ -78,6 +98,86 @@ def _is_admin_or_entrenador(user):
     return False
 
 
+# ?ordering= aceptados en los listados de cuotas (se ordena por la columna indexada)
+ORDENES_CUOTAS = {
+    'dias_restantes': ('fecha_vencimiento', 'id'),
+    '-dias_restantes': ('-fecha_vencimiento', '-id'),
+    'fecha_vencimiento': ('fecha_vencimiento', 'id'),
+    '-fecha_vencimiento': ('-fecha_vencimiento', '-id'),
+}
+
+
+class CuotasPagination(CursorPagination):
+    """
+    Paginación por cursor del listado de cuotas, sin OFFSET. Se usa solo si
+    el pedido trae ?page_size o ?cursor (sin ellos el listado sale completo).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-fecha_inicio', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return ORDENES_CUOTAS.get(request.query_params.get('ordering'), self.ordering)
+
+
+def _filtrar_cuotas(cuotas, params):
+    """
+    Aplica a un queryset de cuotas los filtros del listado:
+    - estado, plan (id), vence_desde / vence_hasta (YYYY-MM-DD, sobre fecha_vencimiento)
+    - search: username o email del socio que empiece con el texto
+    - ultima=1: solo la cuota más reciente de cada socio
+    - estado_calculado=activa|por_vencer|vencida y ordering=dias_restantes (o -dias_restantes)
+    Retorna (cuotas, error).
+    """
+    estado = params.get('estado')
+    if estado:
+        if estado not in dict(CuotaMensual.ESTADO_CHOICES):
+            return cuotas, 'estado inválido (opciones: activa, vencida)'
+        cuotas = cuotas.filter(estado=estado)
+
+    plan = params.get('plan')
+    if plan:
+        if not plan.isdigit():
+            return cuotas, 'plan debe ser el id de un plan'
+        cuotas = cuotas.filter(plan_id=int(plan))
+
+    for parametro, lookup in (('vence_desde', 'fecha_vencimiento__gte'), ('vence_hasta', 'fecha_vencimiento__lte')):
+        valor = params.get(parametro)
+        if valor:
+            try:
+                fecha = datetime.strptime(valor, '%Y-%m-%d').date()
+            except ValueError:
+                return cuotas, f'{parametro} debe tener el formato YYYY-MM-DD'
+            cuotas = cuotas.filter(**{lookup: fecha})
+
+    # Por prefijo: con la collation de MySQL usa el índice único de username
+    # y el de email (migración 0007_indice_email_socio)
+    busqueda = params.get('search', '').strip()
+    if busqueda:
+        cuotas = cuotas.filter(
+            Q(socio__username__istartswith=busqueda) | Q(socio__email__istartswith=busqueda)
+        )
+
+    if params.get('ultima') in ('1', 'true'):
+        cuotas = cuotas.ultimas_por_socio()
+
+    estado_calculado = params.get('estado_calculado')
+    if estado_calculado:
+        if estado_calculado not in CuotaMensualQuerySet.ESTADOS_CALCULADOS:
+            opciones = ', '.join(CuotaMensualQuerySet.ESTADOS_CALCULADOS)
+            return cuotas, f'estado_calculado inválido (opciones: {opciones})'
+        cuotas = cuotas.con_estado(estado_calculado)
+
+    ordering = params.get('ordering')
+    if ordering:
+        if ordering not in ORDENES_CUOTAS:
+            return cuotas, f'ordering inválido (opciones: {", ".join(ORDENES_CUOTAS)})'
+        cuotas = cuotas.order_by(*ORDENES_CUOTAS[ordering])
+
+    return cuotas, None
+
+
 class CuotaMensualViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar cuotas mensuales
@@ -102,30 +202,55 @@ class CuotaMensualViewSet(viewsets.ModelViewSet):
         
         # Admin o entrenador ven todas las cuotas
         if _is_admin_or_entrenador(user):
-            return CuotaMensual.objects.all().select_related('socio', 'plan')
+            return CuotaMensual.objects.con_estado_calculado().select_related('socio')
         
-        # Socio solo ve sus propias cuotas
-        return CuotaMensual.objects.filter(socio=user).select_related('plan')
+        # Socio solo ve sus propias cuotas (plan_info sale del catálogo de planes)
+        return CuotaMensual.objects.con_estado_calculado().filter(socio=user).select_related('socio')
     
     def list(self, request, *args, **kwargs):
         """
-        ✅ CORREGIDO: Listar cuotas con logging para debug
+        Listar cuotas con los filtros de _filtrar_cuotas.
+        
+        Con ?page_size (o ?cursor) se pagina por cursor con filas livianas:
+        cada cuota lleva el id del plan y los planes de la página van una sola
+        vez en 'planes' ({id: plan}). Sin paginar se mantiene el formato completo.
         """
-        user = request.user
-        print("=" * 60)
-        print(f"📋 LIST CUOTAS - Usuario: {user.username}")
-        print(f"   Is authenticated: {user.is_authenticated}")
-        print(f"   Has perfil: {hasattr(user, 'perfil')}")
-        if hasattr(user, 'perfil'):
-            print(f"   Rol: {user.perfil.rol}")
-        print(f"   Is admin/entrenador: {_is_admin_or_entrenador(user)}")
-        
-        queryset = self.get_queryset()
-        print(f"   Cuotas encontradas: {queryset.count()}")
-        print("=" * 60)
+        queryset, error = _filtrar_cuotas(self.get_queryset(), request.query_params)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        if 'page_size' not in request.query_params and 'cursor' not in request.query_params:
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+        
+        paginador = CuotasPagination()
+        pagina = paginador.paginate_queryset(
+            queryset, request, view=self
+        )
+        
+        respuesta = paginador.get_paginated_response(CuotaMensualListaSerializer(pagina, many=True).data)
+        # Los planes salen del catálogo en memoria, sin otra consulta
+        respuesta.data['planes'] = {
+            plan_id: plan_serializado(plan_id) for plan_id in {cuota.plan_id for cuota in pagina}
+        }
+        return respuesta
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def resumen(self, request):
+        """
+        Cantidad de cuotas por estado calculado ({total, activas, por_vencer,
+        vencidas}) con los mismos filtros que el listado, en una consulta.
+        """
+        if not _is_admin_or_entrenador(request.user):
+            return Response(
+                {'detail': 'No tienes permisos para esta acción'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        cuotas, error = _filtrar_cuotas(CuotaMensual.objects.all(), request.query_params)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(cuotas.order_by().contar_por_estado())
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def mi_cuota(self, request):
@@ -159,6 +284,7 @@ class CuotaMensualViewSet(viewsets.ModelViewSet):
     def cuotas_activas(self, request):
         """
         ✅ CORREGIDO: Usar función global
+        Acepta ?estado_calculado=por_vencer&ordering=dias_restantes
         """
         if not _is_admin_or_entrenador(request.user):
             return Response(
@@ -166,7 +292,10 @@ class CuotaMensualViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        cuotas = CuotaMensual.objects.filter(estado='activa').select_related('socio', 'plan')
+        cuotas = CuotaMensual.objects.con_estado_calculado().filter(estado='activa').select_related('socio')
+        cuotas, error = _filtrar_cuotas(cuotas, request.query_params)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
         serializer = CuotaMensualSerializer(cuotas, many=True)
         return Response(serializer.data)
     
@@ -174,6 +303,7 @@ class CuotaMensualViewSet(viewsets.ModelViewSet):
     def cuotas_vencidas(self, request):
         """
         ✅ CORREGIDO: Usar función global
+        Acepta ?ordering=dias_restantes
         """
         if not _is_admin_or_entrenador(request.user):
             return Response(
@@ -181,7 +311,10 @@ class CuotaMensualViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        cuotas = CuotaMensual.objects.filter(estado='vencida').select_related('socio', 'plan')
+        cuotas = CuotaMensual.objects.con_estado_calculado().filter(estado='vencida').select_related('socio')
+        cuotas, error = _filtrar_cuotas(cuotas, request.query_params)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
         serializer = CuotaMensualSerializer(cuotas, many=True)
         return Response(serializer.data)
     
@@ -450,16 +583,6 @@ class CuotaMensualViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def cuotas_activas(self, request):
-        es_admin_entrenador = self._is_admin_or_entrenador(request.user)
-        
-        if not es_admin_entrenador:
-            return Response(
-                {'error': f'Error al registrar en caja: {str()}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     @transaction.atomic
     def renovar(self, request, pk=None):
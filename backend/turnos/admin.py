@@ -1,4 +1,38 @@
 from django.contrib import admin
-from .models import Turno
+from .models import Turno, TurnoHistorico, FranjaHoraria, ProgresoTarea, HorarioPlantilla, AsistenciaSocio, OcupacionHora
 
 admin.site.register(Turno)
+admin.site.register(ProgresoTarea)
+
+
+@admin.register(FranjaHoraria)
+class FranjaHorariaAdmin(admin.ModelAdmin):
+    list_display = ['hora_inicio', 'capacidad', 'reservados', 'confirmados', 'bloqueada']
+    list_filter = ['bloqueada']
+    date_hierarchy = 'hora_inicio'
+
+
+@admin.register(HorarioPlantilla)
+class HorarioPlantillaAdmin(admin.ModelAdmin):
+    list_display = ['dia_semana', 'hora_desde', 'hora_hasta', 'capacidad', 'bloqueado', 'activo']
+    list_filter = ['dia_semana', 'bloqueado', 'activo']
+    list_editable = ['capacidad', 'bloqueado', 'activo']
+
+
+@admin.register(TurnoHistorico)
+class TurnoHistoricoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'hora_inicio', 'socio', 'estado']
+    list_filter = ['estado']
+    date_hierarchy = 'hora_inicio'
+
+
+@admin.register(AsistenciaSocio)
+class AsistenciaSocioAdmin(admin.ModelAdmin):
+    list_display = ['socio', 'asistencias', 'ausencias', 'ultima_ausencia']
+    ordering = ['-ausencias']
+
+
+@admin.register(OcupacionHora)
+class OcupacionHoraAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'hora', 'capacidad', 'reservados', 'confirmados', 'asistieron']
+    date_hierarchy = 'fecha'
@@ -0,0 +1,102 @@
+# turnos/archivo.py
+"""
+Archivo de turnos cerrados (finalizados, con asistencia o ausentes).
+
+La tabla Turno la recorren todas las consultas de reservas, así que solo
+guarda el horizonte de reservas: las horas futuras y los últimos
+TURNOS_ARCHIVAR_DESPUES_DE_DIAS días. Los turnos cerrados más viejos se
+mueven por lotes a TurnoHistorico (`manage.py archivar_turnos`, que también
+corre antes de `generar_cupos`).
+
+Los contadores de las franjas no se tocan: son horas pasadas y la franja
+se borra cuando ya no le quedan turnos.
+
+Los reportes de asistencia leen las dos tablas con `asistencias`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ESTADOS_ACTIVOS, ESTADOS_CERRADOS, Turno, TurnoHistorico
+
+DIAS_POR_DEFECTO = 30
+
+
+def fecha_corte(dias=None):
+    """Los turnos que empezaron antes de esta hora se archivan"""
+    if dias is None:
+        dias = getattr(settings, 'TURNOS_ARCHIVAR_DESPUES_DE_DIAS', DIAS_POR_DEFECTO)
+    return timezone.now() - timedelta(days=dias)
+
+
+def archivar_lote(corte, lote):
+    """
+    Mueve a TurnoHistorico un lote de turnos cerrados anteriores al
+    corte, de los más viejos. Retorna la cantidad de turnos archivados.
+    """
+    filas = list(
+        Turno.objects.filter(estado__in=ESTADOS_CERRADOS, hora_inicio__lt=corte)
+        .order_by('hora_inicio', 'id')
+        .values_list('id', 'socio_id', 'hora_inicio', 'estado')[:lote]
+    )
+    if not filas:
+        return 0
+
+    with transaction.atomic():
+        # ignore_conflicts: si un lote anterior se cortó después de copiar, no se duplica
+        TurnoHistorico.objects.bulk_create([
+            TurnoHistorico(id=pk, socio_id=socio_id, hora_inicio=hora_inicio, estado=estado)
+            for pk, socio_id, hora_inicio, estado in filas
+        ], ignore_conflicts=True)
+        Turno.objects.filter(pk__in=[pk for pk, _, _, _ in filas]).delete()
+
+    return len(filas)
+
+
+def archivar(dias=None, lote=500):
+    """Archiva todos los turnos finalizados viejos, de a lotes. Retorna el total"""
+    corte = fecha_corte(dias)
+    total = 0
+    while True:
+        archivados = archivar_lote(corte, lote)
+        total += archivados
+        if archivados < lote:
+            return total
+
+
+def asistencias(desde, hasta, socio_id=None, estados=None):
+    """
+    Turnos con socio entre dos horas (desde incluida, hasta excluida) leyendo
+    la tabla de turnos y la de archivados, ordenados por hora.
+    Retorna dicts con id, hora_inicio, estado, socio_id y socio (username).
+    """
+    filtros = {'hora_inicio__gte': desde, 'hora_inicio__lt': hasta, 'socio__isnull': False}
+    if socio_id is not None:
+        filtros['socio_id'] = socio_id
+    if estados is not None:
+        filtros['estado__in'] = estados
+
+    campos = ('id', 'hora_inicio', 'estado', 'socio_id', 'socio__username')
+    filas = list(Turno.objects.filter(**filtros).values(*campos))
+    filas += TurnoHistorico.objects.filter(**filtros).values(*campos)
+    filas.sort(key=lambda fila: (fila['hora_inicio'], fila['id']))
+
+    for fila in filas:
+        fila['socio'] = fila.pop('socio__username')
+    return filas
+
+
+def contar_asistencias(socio_id, desde, hasta):
+    """
+    Turnos del socio que ya empezaron entre dos horas, en las dos tablas,
+    sin contar las ausencias. Las reservas activas de horas pasadas cuentan
+    aunque el batch todavía no las haya finalizado (como Turno.calcular_estado).
+    """
+    hasta = min(hasta, timezone.now())
+    filtros = {'socio_id': socio_id, 'hora_inicio__gte': desde, 'hora_inicio__lt': hasta}
+    return (
+        Turno.objects.filter(estado__in=['FINALIZADO', 'ASISTIO', *ESTADOS_ACTIVOS], **filtros).count()
+        + TurnoHistorico.objects.filter(estado__in=['FINALIZADO', 'ASISTIO'], **filtros).count()
+    )
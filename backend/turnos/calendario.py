@@ -0,0 +1,296 @@
+# turnos/calendario.py
+"""
+Armado del calendario de turnos a partir de las franjas horarias.
+
+Los contadores de cada hora salen de una sola consulta sobre FranjaHoraria
+y el detalle de reservas de otra consulta con el socio ya unido, sin
+instanciar modelos ni tocar relaciones por fila. La parte común a todos
+los usuarios se cachea por versión de los días del rango.
+
+Con ?formato=compacto el mismo contenido va por columnas (un arreglo por
+contador en cada día y los socios en una tabla aparte), sin repetir las
+claves en cada hora.
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ESTADO_CHOICES, FranjaHoraria, Turno
+from .horarios import obtener_plantilla, version_plantilla
+
+ESTADOS_VISIBLES_SOCIO = ['RESERVADO', 'CONFIRMADO', 'FINALIZADO', 'ASISTIO', 'AUSENTE']
+ESTADOS_CANCELABLES = ('RESERVADO', 'CONFIRMADO')
+
+# Las claves incluyen la versión de los días y de la plantilla, el TTL solo limita la memoria
+DURACION_CACHE_CALENDARIO = 300
+
+
+def obtener_franjas(fecha_inicio, fecha_fin):
+    """Contadores por hora del rango: una fila por franja"""
+    return FranjaHoraria.objects.filter(
+        hora_inicio__gte=fecha_inicio,
+        hora_inicio__lte=fecha_fin
+    ).order_by('hora_inicio').values_list(
+        'id', 'hora_inicio', 'capacidad', 'reservados', 'confirmados', 'bloqueada'
+    )
+
+
+def obtener_turnos_visibles(fecha_inicio, fecha_fin, user):
+    """
+    Reservas del rango que el usuario puede ver en detalle:
+    staff ve todas, un socio solo las suyas y un anónimo ninguna.
+    """
+    if not user.is_authenticated:
+        return []
+
+    turnos = Turno.objects.filter(
+        hora_inicio__gte=fecha_inicio,
+        hora_inicio__lte=fecha_fin
+    )
+    if not user.is_staff:
+        turnos = turnos.filter(socio=user, estado__in=ESTADOS_VISIBLES_SOCIO)
+
+    return turnos.order_by('hora_inicio').values_list(
+        'id', 'hora_inicio', 'estado', 'socio_id', 'socio__username'
+    )
+
+
+def armar_horario(local, franja_id, capacidad, reservados, confirmados, bloqueada, plantilla):
+    """Entrada de una hora del calendario a partir de los contadores de su franja"""
+    # Una hora que la plantilla actual cierra o bloquea se muestra bloqueada
+    horario_plantilla = plantilla[local.weekday()].get(local.hour)
+    bloqueada = bloqueada or horario_plantilla is None or horario_plantilla[1]
+
+    return {
+        'hora': f"{local.hour:02d}:00",
+        'franja_id': franja_id,
+        'total_cupos': capacidad,
+        'cupos_disponibles': FranjaHoraria.calcular_disponibles(capacidad, reservados, confirmados, bloqueada),
+        'cupos_reservados': reservados,
+        'cupos_confirmados': confirmados,
+        'cupos_bloqueados': capacidad if bloqueada else 0,
+        'turnos': []
+    }
+
+
+def _armar_base(fecha_inicio, fecha_fin):
+    """
+    Días y horarios con sus contadores, sin reservas: es igual para
+    todos los usuarios, así que es la parte que se cachea.
+    """
+    tz = timezone.get_current_timezone()
+    plantilla = obtener_plantilla()
+    dias = {}
+
+    # Una entrada por franja (ya vienen ordenadas por hora)
+    for franja_id, hora_inicio, capacidad, reservados, confirmados, bloqueada in obtener_franjas(fecha_inicio, fecha_fin):
+        local = hora_inicio.astimezone(tz)
+        fecha_key = local.date().isoformat()
+
+        dia = dias.get(fecha_key)
+        if dia is None:
+            dia = dias[fecha_key] = {
+                'fecha': fecha_key,
+                'es_domingo': local.weekday() == 6,
+                'horarios': []
+            }
+
+        dia['horarios'].append(
+            armar_horario(local, franja_id, capacidad, reservados, confirmados, bloqueada, plantilla)
+        )
+
+    return list(dias.values())
+
+
+def _agregar_turnos(dias, turnos, user):
+    """Agrega a cada horario las reservas que el usuario puede ver"""
+    tz = timezone.get_current_timezone()
+    ahora = timezone.now()
+    limite_cancelacion = ahora + timedelta(hours=1)
+    user_id = user.id if user.is_authenticated else None
+
+    horarios = {
+        (dia['fecha'], horario['hora']): horario
+        for dia in dias
+        for horario in dia['horarios']
+    }
+
+    for turno_id, hora_inicio, estado, socio_id, socio_username in turnos:
+        local = hora_inicio.astimezone(tz)
+        horario = horarios.get((local.date().isoformat(), f"{local.hour:02d}:00"))
+        if horario is None:
+            continue
+
+        es_mio = socio_id is not None and socio_id == user_id
+        estado = Turno.calcular_estado(estado, hora_inicio, ahora)
+        horario['turnos'].append({
+            'id': turno_id,
+            'estado': estado,
+            'socio': socio_username,
+            'socio_id': socio_id,
+            'es_mio': es_mio,
+            'puede_cancelar': es_mio and estado in ESTADOS_CANCELABLES and hora_inicio > limite_cancelacion
+        })
+
+    return dias
+
+
+def construir_calendario(fecha_inicio, fecha_fin, user, version=None):
+    """
+    Devuelve la lista de días con sus horarios, con la misma forma que
+    espera el frontend: [{fecha, es_domingo, horarios: [...]}, ...]
+
+    Si se indica la versión de los días del rango (ver versiones.py) se
+    usa la caché: la parte común se guarda por (rango, audiencia) y las
+    reservas propias de un socio se agregan en cada request. Cualquier
+    cambio en un día del rango cambia la versión y por lo tanto la clave;
+    la clave también lleva la versión de la plantilla, que decide qué
+    horas se muestran bloqueadas.
+    """
+    if version is None:
+        dias = _armar_base(fecha_inicio, fecha_fin)
+        return _agregar_turnos(dias, obtener_turnos_visibles(fecha_inicio, fecha_fin, user), user)
+
+    # Staff ve todas las reservas, así que las guarda junto con la base
+    audiencia = 'staff' if user.is_staff else 'publico'
+    clave = (
+        f"calendario:{audiencia}:{fecha_inicio.isoformat()}:{fecha_fin.isoformat()}:"
+        f"{version}:{version_plantilla()}"
+    )
+
+    datos = cache.get(clave)
+    if datos is None:
+        dias = _armar_base(fecha_inicio, fecha_fin)
+        turnos = list(obtener_turnos_visibles(fecha_inicio, fecha_fin, user)) if user.is_staff else []
+        datos = (dias, turnos)
+        cache.set(clave, datos, DURACION_CACHE_CALENDARIO)
+
+    dias, turnos = datos
+    if not user.is_staff:
+        turnos = obtener_turnos_visibles(fecha_inicio, fecha_fin, user)
+    return _agregar_turnos(dias, turnos, user)
+
+
+# 🔹 Formato compacto (?formato=compacto)
+
+def _armar_base_compacta(fecha_inicio, fecha_fin):
+    """
+    Igual que _armar_base pero por columnas: cada día lleva un arreglo por
+    contador, alineados con 'horas'. Se arma directo de las filas de la consulta.
+    """
+    tz = timezone.get_current_timezone()
+    plantilla = obtener_plantilla()
+    dias = []
+    dia = None
+
+    for franja_id, hora_inicio, capacidad, reservados, confirmados, bloqueada in obtener_franjas(fecha_inicio, fecha_fin):
+        local = hora_inicio.astimezone(tz)
+        fecha_key = local.date().isoformat()
+
+        if dia is None or dia['fecha'] != fecha_key:
+            dia = {
+                'fecha': fecha_key,
+                'es_domingo': local.weekday() == 6,
+                'horas': [],
+                'franja_id': [],
+                'capacidad': [],
+                'disponibles': [],
+                'reservados': [],
+                'confirmados': [],
+                'bloqueada': [],
+            }
+            dias.append(dia)
+
+        # Misma regla que armar_horario
+        horario_plantilla = plantilla[local.weekday()].get(local.hour)
+        bloqueada = bloqueada or horario_plantilla is None or horario_plantilla[1]
+
+        dia['horas'].append(local.hour)
+        dia['franja_id'].append(franja_id)
+        dia['capacidad'].append(capacidad)
+        dia['disponibles'].append(FranjaHoraria.calcular_disponibles(capacidad, reservados, confirmados, bloqueada))
+        dia['reservados'].append(reservados)
+        dia['confirmados'].append(confirmados)
+        dia['bloqueada'].append(1 if bloqueada else 0)
+
+    return dias
+
+
+def _agregar_turnos_compactos(dias, turnos):
+    """
+    Agrega a cada día las reservas visibles como columnas. Estados y socios
+    van como índices a las tablas 'estados' y 'socios' de la respuesta.
+    """
+    tz = timezone.get_current_timezone()
+    ahora = timezone.now()
+    limite_cancelacion = ahora + timedelta(hours=1)
+
+    estados = [codigo for codigo, _ in ESTADO_CHOICES]
+    indice_estado = {codigo: i for i, codigo in enumerate(estados)}
+    socios = {'id': [], 'username': []}
+    indice_socio = {}
+    por_fecha = {}
+
+    for dia in dias:
+        dia['turnos'] = {'hora': [], 'id': [], 'estado': [], 'socio': [], 'cancelable': []}
+        por_fecha[dia['fecha']] = dia
+
+    for turno_id, hora_inicio, estado, socio_id, socio_username in turnos:
+        local = hora_inicio.astimezone(tz)
+        dia = por_fecha.get(local.date().isoformat())
+        if dia is None:
+            continue
+
+        socio = None
+        if socio_id is not None:
+            socio = indice_socio.get(socio_id)
+            if socio is None:
+                socio = indice_socio[socio_id] = len(socios['id'])
+                socios['id'].append(socio_id)
+                socios['username'].append(socio_username)
+
+        estado = Turno.calcular_estado(estado, hora_inicio, ahora)
+        columnas = dia['turnos']
+        columnas['hora'].append(local.hour)
+        columnas['id'].append(turno_id)
+        columnas['estado'].append(indice_estado[estado])
+        columnas['socio'].append(socio)
+        columnas['cancelable'].append(
+            1 if estado in ESTADOS_CANCELABLES and hora_inicio > limite_cancelacion else 0
+        )
+
+    return {'formato': 'compacto', 'estados': estados, 'socios': socios, 'dias': dias}
+
+
+def construir_calendario_compacto(fecha_inicio, fecha_fin, user, version=None):
+    """
+    Mismo contenido que construir_calendario en columnas:
+    {formato, estados, socios: {id, username}, dias: [{fecha, es_domingo,
+    horas, franja_id, capacidad, disponibles, reservados, confirmados,
+    bloqueada, turnos: {hora, id, estado, socio, cancelable}}]}
+
+    'cancelable' se calcula como puede_cancelar sin mirar de quién es el
+    turno: el cliente lo cruza con socios.id. Usa la caché igual que
+    construir_calendario, con claves propias.
+    """
+    if version is None:
+        dias = _armar_base_compacta(fecha_inicio, fecha_fin)
+        return _agregar_turnos_compactos(dias, obtener_turnos_visibles(fecha_inicio, fecha_fin, user))
+
+    audiencia = 'staff' if user.is_staff else 'publico'
+    clave = (
+        f"calendario_compacto:{audiencia}:{fecha_inicio.isoformat()}:{fecha_fin.isoformat()}:"
+        f"{version}:{version_plantilla()}"
+    )
+
+    datos = cache.get(clave)
+    if datos is None:
+        dias = _armar_base_compacta(fecha_inicio, fecha_fin)
+        turnos = list(obtener_turnos_visibles(fecha_inicio, fecha_fin, user)) if user.is_staff else []
+        datos = (dias, turnos)
+        cache.set(clave, datos, DURACION_CACHE_CALENDARIO)
+
+    dias, turnos = datos
+    if not user.is_staff:
+        turnos = obtener_turnos_visibles(fecha_inicio, fecha_fin, user)
+    return _agregar_turnos_compactos(dias, turnos)
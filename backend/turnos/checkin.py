@@ -0,0 +1,168 @@
+# turnos/checkin.py
+"""
+Check-in en el kiosco de la entrada con QR firmados.
+
+El socio pide un token (`token_checkin`) que lleva su id y el de su cuota
+activa, firmado con SECRET_KEY y con vencimiento. El kiosco lo manda a
+`checkin`, que lo verifica sin tocar la base y busca con una sola consulta
+su turno de ahora (con la cuota validada en la misma consulta).
+
+Las horas de ingreso no se escriben en cada request: se juntan en memoria y
+se guardan de a lotes con un solo UPDATE (RegistroIngresos), cada
+TURNOS_CHECKIN_INTERVALO segundos o al llegar a LOTE_INGRESOS. Con
+TURNOS_CHECKIN_EN_LOTE = False se guardan en el momento.
+
+Los pendientes se guardan también al terminar el proceso (atexit). Si el
+proceso muere sin apagarse (kill -9, caída del servidor) se pierden los
+ingresos del último intervalo: el turno queda sin hora de ingreso y
+marcar_asistencias lo cuenta como AUSENTE.
+"""
+import atexit
+import logging
+import threading
+import time as time_module
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from django.db.models import Case, Exists, OuterRef, Value, When
+from django.utils import timezone
+
+from cuotas_mensuales.models import CuotaMensual
+
+from .models import ESTADOS_ACTIVOS, Turno
+
+logger = logging.getLogger(__name__)
+
+SALT = 'turnos.checkin'
+# Segundos de validez del QR (el socio lo vuelve a pedir al vencer)
+VIGENCIA_POR_DEFECTO = 300
+# Se puede entrar hasta 30 minutos antes del turno y mientras dura la hora
+ANTICIPACION = timedelta(minutes=30)
+# Ingresos acumulados que fuerzan a guardar el lote
+LOTE_INGRESOS = 50
+
+
+class TokenInvalido(Exception):
+    pass
+
+
+def vigencia_token():
+    return getattr(settings, 'TURNOS_CHECKIN_VIGENCIA_SEGUNDOS', VIGENCIA_POR_DEFECTO)
+
+
+def generar_token(socio_id, cuota_id):
+    return signing.dumps([socio_id, cuota_id], salt=SALT)
+
+
+def leer_token(token):
+    """Retorna (socio_id, cuota_id). Lanza TokenInvalido si la firma no es válida o venció"""
+    try:
+        socio_id, cuota_id = signing.loads(token, salt=SALT, max_age=vigencia_token())
+    except signing.SignatureExpired:
+        raise TokenInvalido('El QR venció, generá uno nuevo.')
+    except (signing.BadSignature, TypeError, ValueError):
+        raise TokenInvalido('QR inválido.')
+    return socio_id, cuota_id
+
+
+def buscar_turno(socio_id, cuota_id, ahora):
+    """
+    Turno del socio en curso o por empezar, en una consulta. Trae el username
+    y si la cuota del token sigue activa. Retorna un dict o None.
+    """
+    cuota_activa = CuotaMensual.objects.filter(
+        pk=cuota_id,
+        socio_id=OuterRef('socio_id'),
+        estado='activa',
+        fecha_vencimiento__gte=timezone.localdate(ahora)
+    )
+    return Turno.objects.filter(
+        socio_id=socio_id,
+        # El batch puede haber finalizado el turno de la hora en curso
+        estado__in=[*ESTADOS_ACTIVOS, 'FINALIZADO'],
+        hora_inicio__gt=ahora - timedelta(hours=1),
+        hora_inicio__lte=ahora + ANTICIPACION
+    ).annotate(
+        cuota_activa=Exists(cuota_activa)
+    ).order_by('hora_inicio').values(
+        'id', 'hora_inicio', 'ingreso', 'socio__username', 'cuota_activa'
+    ).first()
+
+
+# 🔹 Escritura de los ingresos por lotes
+
+class RegistroIngresos:
+    """Horas de ingreso pendientes de guardar ({turno_id: hora})"""
+
+    def __init__(self):
+        self._pendientes = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def pendiente(self, turno_id):
+        with self._lock:
+            return self._pendientes.get(turno_id)
+
+    def agregar(self, turno_id, hora):
+        """Retorna la hora de ingreso registrada (la primera si ya estaba pendiente)"""
+        if not getattr(settings, 'TURNOS_CHECKIN_EN_LOTE', True):
+            guardar_ingresos({turno_id: hora})
+            return hora
+
+        with self._lock:
+            hora = self._pendientes.setdefault(turno_id, hora)
+            lleno = len(self._pendientes) >= LOTE_INGRESOS
+            if self._hilo is None or not self._hilo.is_alive():
+                if self._hilo is None:
+                    # El hilo es daemon: lo pendiente se guarda al apagar el proceso
+                    atexit.register(self._vaciar_al_salir)
+                self._hilo = threading.Thread(target=self._trabajar, name='checkin-ingresos', daemon=True)
+                self._hilo.start()
+        if lleno:
+            self.vaciar()
+        return hora
+
+    def vaciar(self):
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        if not pendientes:
+            return
+        try:
+            guardar_ingresos(pendientes)
+        except Exception:
+            # Se reintentan con el próximo lote
+            with self._lock:
+                for turno_id, hora in pendientes.items():
+                    self._pendientes.setdefault(turno_id, hora)
+            raise
+
+    def _trabajar(self):
+        intervalo = getattr(settings, 'TURNOS_CHECKIN_INTERVALO', 2)
+        while True:
+            time_module.sleep(intervalo)
+            try:
+                self.vaciar()
+            except Exception:
+                logger.exception("Error al guardar ingresos del kiosco")
+            finally:
+                close_old_connections()
+
+    def _vaciar_al_salir(self):
+        try:
+            self.vaciar()
+        except Exception:
+            logger.exception("No se pudieron guardar los ingresos pendientes al terminar el proceso")
+
+
+def guardar_ingresos(ingresos):
+    """Un UPDATE para todo el lote; no pisa un ingreso ya guardado (ej: por otro proceso)"""
+    guardados = Turno.objects.filter(pk__in=list(ingresos), ingreso__isnull=True).update(
+        ingreso=Case(*[When(pk=turno_id, then=Value(hora)) for turno_id, hora in ingresos.items()])
+    )
+    logger.debug("Kiosco: %s ingresos guardados", guardados)
+    return guardados
+
+
+registro_ingresos = RegistroIngresos()
@@ -0,0 +1,321 @@
+# turnos/eventos.py
+"""
+Eventos de disponibilidad en vivo (Server-Sent Events).
+
+Cuando se confirma una transacción que tocó franjas o reservas se publican
+eventos con el estado actual de cada hora afectada:
+
+- 'cupos': contadores de una hora, con la misma forma que un horario del
+  calendario (franja_id, cupos_disponibles, ...).
+- 'agenda': alta/cambio o baja de una reserva, con la forma de historial_dia.
+  Solo se envían al canal de staff.
+- 'recargar': cambió la estructura de un día (franjas nuevas o borradas)
+  y el cliente tiene que volver a pedir el calendario.
+
+El broker se elige con TURNOS_BROKER_EVENTOS en settings:
+
+- BrokerLocal (default): reparte los eventos en memoria a las conexiones
+  del mismo proceso.
+- BrokerBaseDatos: para varios procesos. Cada conexión consulta las
+  versiones de sus días (ver versiones.py) y calcula las diferencias.
+
+Antes de acumular nada se le pregunta al broker si necesita eventos
+(necesita_eventos): sin conexiones abiertas, o con BrokerBaseDatos, las
+reservas no hacen consultas extra al confirmar.
+"""
+import asyncio
+import threading
+from datetime import date, datetime, time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .calendario import armar_horario
+from .horarios import obtener_plantilla
+from .models import FranjaHoraria, Turno
+from .versiones import firma_rango
+
+# Segundos sin eventos tras los que se manda un latido (mantiene viva la conexión)
+LATIDO = 20
+# Eventos encolados por conexión antes de pedirle al cliente que recargue
+COLA_MAXIMA = 200
+# Segundos entre consultas de BrokerBaseDatos
+INTERVALO_CONSULTA = 2
+
+_pendientes = threading.local()
+
+
+# 🔹 Armado de eventos
+
+def eventos_cupos(franja_ids):
+    """Eventos 'cupos' con los contadores actuales de las franjas"""
+    tz = timezone.get_current_timezone()
+    plantilla = obtener_plantilla()
+    eventos = []
+    for franja_id, hora_inicio, capacidad, reservados, confirmados, bloqueada in FranjaHoraria.objects.filter(
+        pk__in=franja_ids
+    ).values_list('id', 'hora_inicio', 'capacidad', 'reservados', 'confirmados', 'bloqueada'):
+        local = hora_inicio.astimezone(tz)
+        horario = armar_horario(local, franja_id, capacidad, reservados, confirmados, bloqueada, plantilla)
+        del horario['turnos']
+        horario['fecha'] = local.date().isoformat()
+        eventos.append({'tipo': 'cupos', 'fecha': horario['fecha'], 'datos': horario})
+    return eventos
+
+
+def eventos_agenda(turnos):
+    """
+    Eventos 'agenda' para {turno_id: hora_inicio}. Se lee el estado real de
+    cada reserva: si ya no existe se informa la baja.
+    """
+    tz = timezone.get_current_timezone()
+    ahora = timezone.now()
+    existentes = {
+        turno_id: (hora_inicio, estado, socio_id, socio_username)
+        for turno_id, hora_inicio, estado, socio_id, socio_username in Turno.objects.filter(
+            pk__in=list(turnos), socio__isnull=False
+        ).values_list('id', 'hora_inicio', 'estado', 'socio_id', 'socio__username')
+    }
+
+    eventos = []
+    for turno_id, hora_inicio in turnos.items():
+        fila = existentes.get(turno_id)
+        if fila:
+            hora_inicio, estado, socio_id, socio_username = fila
+            datos = {
+                'accion': 'guardado',
+                'id': turno_id,
+                'hora_inicio': hora_inicio.isoformat(),
+                'socio': socio_username,
+                'socio_id': socio_id,
+                'estado': Turno.calcular_estado(estado, hora_inicio, ahora),
+            }
+        else:
+            datos = {'accion': 'eliminado', 'id': turno_id, 'hora_inicio': hora_inicio.isoformat()}
+        fecha = hora_inicio.astimezone(tz).date().isoformat()
+        eventos.append({'tipo': 'agenda', 'fecha': fecha, 'datos': datos})
+    return eventos
+
+
+# 🔹 Publicación al confirmar la transacción
+
+def _pendiente():
+    pendiente = getattr(_pendientes, 'datos', None)
+    if pendiente is None:
+        pendiente = _pendientes.datos = {'franjas': set(), 'turnos': {}, 'recargar': set()}
+    return pendiente
+
+
+def _es_pasado(hora_inicio):
+    # Los días anteriores a hoy no tienen vistas en vivo
+    return timezone.localtime(hora_inicio).date() < timezone.localdate()
+
+
+def _sin_oyentes():
+    return not obtener_broker().necesita_eventos()
+
+
+def registrar_turno(turno):
+    """La reserva (y el contador de su franja) cambió en esta transacción"""
+    if _sin_oyentes() or _es_pasado(turno.hora_inicio):
+        return
+    pendiente = _pendiente()
+    pendiente['franjas'].add(turno.franja_id)
+    pendiente['turnos'][turno.pk] = turno.hora_inicio
+    transaction.on_commit(_publicar_pendientes)
+
+
+def registrar_franja(franja_id, hora_inicio):
+    """Cambiaron los contadores o la capacidad de una franja"""
+    if _sin_oyentes() or _es_pasado(hora_inicio):
+        return
+    _pendiente()['franjas'].add(franja_id)
+    transaction.on_commit(_publicar_pendientes)
+
+
+def registrar_recarga(*horas):
+    """Se crearon o borraron franjas: los clientes de esos días deben recargar"""
+    if _sin_oyentes():
+        return
+    fechas = {timezone.localtime(hora).date() for hora in horas if not _es_pasado(hora)}
+    if not fechas:
+        return
+    _pendiente()['recargar'].update(fechas)
+    transaction.on_commit(_publicar_pendientes)
+
+
+def publicar_recarga_general():
+    """Cambió algo que afecta a todos los días (ej: la plantilla de horarios)"""
+    if _sin_oyentes():
+        return
+    transaction.on_commit(
+        lambda: obtener_broker().publicar([{'tipo': 'recargar', 'fecha': None, 'datos': {}}])
+    )
+
+
+def _publicar_pendientes():
+    """
+    Publica lo acumulado en el hilo. Si una transacción anterior se revirtió,
+    sus pendientes salen con esta: como los eventos se arman con el estado
+    real de la base, a lo sumo se envía una hora sin cambios.
+    """
+    pendiente = getattr(_pendientes, 'datos', None)
+    if not pendiente or not any(pendiente.values()):
+        return
+    _pendientes.datos = None
+    # La última conexión pudo cerrarse antes del commit
+    if _sin_oyentes():
+        return
+
+    eventos = [
+        {'tipo': 'recargar', 'fecha': fecha.isoformat(), 'datos': {'fecha': fecha.isoformat()}}
+        for fecha in sorted(pendiente['recargar'])
+    ]
+    if pendiente['franjas']:
+        eventos += eventos_cupos(pendiente['franjas'])
+    if pendiente['turnos']:
+        eventos += eventos_agenda(pendiente['turnos'])
+
+    if eventos:
+        obtener_broker().publicar(eventos)
+
+
+# 🔹 Brokers
+
+class BrokerLocal:
+    """Reparte los eventos a las conexiones abiertas en este proceso"""
+
+    def __init__(self):
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+
+    def necesita_eventos(self):
+        """Solo si hay alguna conexión abierta en este proceso"""
+        return bool(self._suscriptores)
+
+    def publicar(self, eventos):
+        """Se puede llamar desde cualquier hilo"""
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+
+        for suscripcion in suscriptores:
+            loop, cola = suscripcion
+            try:
+                loop.call_soon_threadsafe(self._encolar, cola, eventos)
+            except RuntimeError:
+                # El event loop de la conexión ya se cerró
+                with self._lock:
+                    self._suscriptores.discard(suscripcion)
+
+    @staticmethod
+    def _encolar(cola, eventos):
+        if cola.full():
+            # Cliente lento: se descarta lo pendiente y se le pide recargar todo
+            while not cola.empty():
+                cola.get_nowait()
+            eventos = [{'tipo': 'recargar', 'fecha': None, 'datos': {}}]
+        cola.put_nowait(eventos)
+
+    async def escuchar(self, fecha_desde, fecha_hasta):
+        """
+        Genera listas de eventos de los días del rango (fechas ISO).
+        Genera una lista vacía cada LATIDO segundos sin eventos.
+        """
+        suscripcion = (asyncio.get_running_loop(), asyncio.Queue(maxsize=COLA_MAXIMA))
+        with self._lock:
+            self._suscriptores.add(suscripcion)
+
+        try:
+            while True:
+                try:
+                    eventos = await asyncio.wait_for(suscripcion[1].get(), timeout=LATIDO)
+                except asyncio.TimeoutError:
+                    yield []
+                    continue
+                yield [
+                    evento for evento in eventos
+                    if evento['fecha'] is None or fecha_desde <= evento['fecha'] <= fecha_hasta
+                ]
+        finally:
+            with self._lock:
+                self._suscriptores.discard(suscripcion)
+
+
+class BrokerBaseDatos:
+    """
+    Para varios procesos: cada conexión consulta la versión de sus días y,
+    cuando cambia, compara los contadores y reservas con lo último enviado.
+    No necesita publicar nada (los cambios ya quedaron en la base).
+    """
+
+    def necesita_eventos(self):
+        return False
+
+    def publicar(self, eventos):
+        pass
+
+    @staticmethod
+    def _estado_rango(fecha_desde, fecha_hasta):
+        tz = timezone.get_current_timezone()
+        desde = timezone.make_aware(datetime.combine(date.fromisoformat(fecha_desde), time.min), tz)
+        hasta = timezone.make_aware(datetime.combine(date.fromisoformat(fecha_hasta), time.max), tz)
+
+        franja_ids = list(FranjaHoraria.objects.filter(
+            hora_inicio__gte=desde, hora_inicio__lte=hasta
+        ).values_list('id', flat=True))
+        cupos = {evento['datos']['franja_id']: evento for evento in eventos_cupos(franja_ids)}
+
+        turnos = dict(Turno.objects.filter(
+            franja_id__in=franja_ids, socio__isnull=False
+        ).values_list('id', 'hora_inicio'))
+        agenda = {evento['datos']['id']: evento for evento in eventos_agenda(turnos)}
+        return cupos, agenda
+
+    async def escuchar(self, fecha_desde, fecha_hasta):
+        estado_rango = sync_to_async(self._estado_rango)
+        version = sync_to_async(firma_rango)
+
+        firma = await version(fecha_desde, fecha_hasta)
+        cupos, agenda = await estado_rango(fecha_desde, fecha_hasta)
+        sin_cambios = 0
+
+        while True:
+            await asyncio.sleep(INTERVALO_CONSULTA)
+            nueva_firma = await version(fecha_desde, fecha_hasta)
+            if nueva_firma['total'] == firma['total']:
+                sin_cambios += INTERVALO_CONSULTA
+                if sin_cambios >= LATIDO:
+                    sin_cambios = 0
+                    yield []
+                continue
+
+            firma, sin_cambios = nueva_firma, 0
+            nuevos_cupos, nueva_agenda = await estado_rango(fecha_desde, fecha_hasta)
+
+            eventos = [evento for clave, evento in nuevos_cupos.items() if cupos.get(clave) != evento]
+            eventos += [evento for clave, evento in nueva_agenda.items() if agenda.get(clave) != evento]
+            for clave, evento in agenda.items():
+                if clave not in nueva_agenda:
+                    datos = {'accion': 'eliminado', 'id': clave, 'hora_inicio': evento['datos']['hora_inicio']}
+                    eventos.append({'tipo': 'agenda', 'fecha': evento['fecha'], 'datos': datos})
+            # Franjas nuevas o borradas: esos días se recargan
+            fechas = {cupos[clave]['fecha'] for clave in cupos.keys() - nuevos_cupos.keys()}
+            fechas |= {nuevos_cupos[clave]['fecha'] for clave in nuevos_cupos.keys() - cupos.keys()}
+            eventos += [{'tipo': 'recargar', 'fecha': fecha, 'datos': {'fecha': fecha}} for fecha in sorted(fechas)]
+
+            cupos, agenda = nuevos_cupos, nueva_agenda
+            yield eventos
+
+
+_broker = None
+
+
+def obtener_broker():
+    global _broker
+    if _broker is None:
+        clase = getattr(settings, 'TURNOS_BROKER_EVENTOS', 'turnos.eventos.BrokerLocal')
+        _broker = import_string(clase)()
+    return _broker
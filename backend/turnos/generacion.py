@@ -0,0 +1,89 @@
+# turnos/generacion.py
+"""
+Generación masiva e idempotente de franjas horarias.
+
+Lee las franjas existentes del rango en una sola consulta y crea las
+faltantes con un bulk_create por semana, así el costo depende de la
+cantidad de semanas y no de la cantidad de cupos.
+"""
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+from .models import FranjaHoraria
+from .horarios import horarios_del_dia
+from .versiones import marcar_cambio
+from .eventos import registrar_recarga
+
+
+def planificar_franjas(fecha_desde, fecha_hasta):
+    """
+    Franjas que deberían existir entre ambas fechas (inclusive) según la
+    plantilla de horarios, sin las ya pasadas
+    """
+    tz = timezone.get_current_timezone()
+    ahora = timezone.now()
+    plan = []
+
+    fecha = fecha_desde
+    while fecha <= fecha_hasta:
+        for hora, (capacidad, bloqueada) in horarios_del_dia(fecha).items():
+            hora_inicio = timezone.make_aware(datetime.combine(fecha, time(hora, 0)), tz)
+            if hora_inicio >= ahora:
+                plan.append(FranjaHoraria(
+                    hora_inicio=hora_inicio,
+                    capacidad=capacidad,
+                    bloqueada=bloqueada
+                ))
+        fecha += timedelta(days=1)
+
+    plan.sort(key=lambda franja: franja.hora_inicio)
+    return plan
+
+
+def generar_franjas(fecha_desde, fecha_hasta, dry_run=False):
+    """
+    Crea las franjas faltantes del rango. Con dry_run=True solo calcula
+    la diferencia sin escribir nada.
+    """
+    plan = planificar_franjas(fecha_desde, fecha_hasta)
+    resumen = {
+        'franjas_nuevas': [],
+        'franjas_existentes': 0,
+        'cupos_nuevos': 0,
+        'cupos_existentes': 0,
+        'bloqueadas_nuevas': 0,
+    }
+    if not plan:
+        return resumen
+
+    # Una sola consulta para todo el rango
+    existentes = dict(FranjaHoraria.objects.filter(
+        hora_inicio__gte=plan[0].hora_inicio,
+        hora_inicio__lte=plan[-1].hora_inicio
+    ).values_list('hora_inicio', 'capacidad'))
+
+    nuevas_por_semana = {}
+    for franja in plan:
+        if franja.hora_inicio in existentes:
+            resumen['franjas_existentes'] += 1
+            resumen['cupos_existentes'] += existentes[franja.hora_inicio]
+            continue
+
+        resumen['franjas_nuevas'].append(franja)
+        if franja.bloqueada:
+            resumen['bloqueadas_nuevas'] += 1
+        else:
+            resumen['cupos_nuevos'] += franja.capacidad
+
+        semana = timezone.localtime(franja.hora_inicio).isocalendar()[:2]
+        nuevas_por_semana.setdefault(semana, []).append(franja)
+
+    if not dry_run:
+        # Un INSERT por semana; ignore_conflicts mantiene la operación idempotente
+        for franjas in nuevas_por_semana.values():
+            FranjaHoraria.objects.bulk_create(franjas, batch_size=len(franjas), ignore_conflicts=True)
+        # bulk_create no dispara señales
+        marcar_cambio(*(franja.hora_inicio for franja in resumen['franjas_nuevas']))
+        registrar_recarga(*(franja.hora_inicio for franja in resumen['franjas_nuevas']))
+
+    return resumen
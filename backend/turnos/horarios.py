@@ -0,0 +1,93 @@
+# turnos/horarios.py
+"""
+Plantilla de horarios compilada en memoria.
+
+Las filas de HorarioPlantilla se compilan en una tabla por día de la
+semana {hora: (capacidad, bloqueado)} que se reutiliza entre requests.
+Se invalida con las señales de HorarioPlantilla y, como respaldo para
+otros procesos, se recarga cada DURACION_CACHE segundos.
+
+La versión es un hash de la tabla compilada: todos los procesos con la
+misma plantilla dan la misma versión, y cambia aunque los días afectados
+no tengan todavía franjas ni VersionDia (ver versiones.py).
+"""
+import hashlib
+import time
+
+from .models import HorarioPlantilla, CAPACIDAD_POR_HORA
+
+DURACION_CACHE = 60
+
+DIAS_SEMANA = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+
+# (dia_semana, hora_desde, hora_hasta, capacidad, bloqueado)
+# Se usa si la tabla está vacía
+PLANTILLA_POR_DEFECTO = (
+    [(dia, 8, 23, CAPACIDAD_POR_HORA, False) for dia in range(5)]
+    + [
+        (5, 8, 13, CAPACIDAD_POR_HORA, False),
+        (5, 13, 17, CAPACIDAD_POR_HORA, True),
+        (5, 17, 23, CAPACIDAD_POR_HORA, False),
+    ]
+)
+
+_cache = {'tabla': None, 'version': '', 'cargada': 0.0}
+
+
+def _compilar():
+    filas = list(
+        HorarioPlantilla.objects.filter(activo=True).values_list(
+            'dia_semana', 'hora_desde', 'hora_hasta', 'capacidad', 'bloqueado'
+        )
+    ) or PLANTILLA_POR_DEFECTO
+
+    tabla = [{} for _ in range(7)]
+    # Primero los rangos abiertos y después los bloqueos, que los pisan
+    for dia, desde, hasta, capacidad, bloqueado in sorted(filas, key=lambda fila: fila[4]):
+        for hora in range(desde, hasta):
+            tabla[dia][hora] = (capacidad, bloqueado)
+    return tabla
+
+
+def obtener_plantilla():
+    """Tabla compilada: lista de 7 dicts {hora: (capacidad, bloqueado)}"""
+    tabla = _cache['tabla']
+    if tabla is None or time.monotonic() - _cache['cargada'] > DURACION_CACHE:
+        tabla = _compilar()
+        contenido = repr([sorted(horas.items()) for horas in tabla])
+        _cache['version'] = hashlib.md5(contenido.encode()).hexdigest()
+        _cache['tabla'] = tabla
+        _cache['cargada'] = time.monotonic()
+    return tabla
+
+
+def version_plantilla():
+    """Hash de la plantilla compilada, para las claves de caché y los ETag"""
+    obtener_plantilla()
+    return _cache['version']
+
+
+def invalidar_plantilla():
+    _cache['tabla'] = None
+
+
+def consultar_horario(hora_local):
+    """(capacidad, bloqueado) para una hora local, o None si el gimnasio está cerrado"""
+    return obtener_plantilla()[hora_local.weekday()].get(hora_local.hour)
+
+
+def horarios_del_dia(fecha):
+    """Horas del día según la plantilla: {hora: (capacidad, bloqueado)}"""
+    return obtener_plantilla()[fecha.weekday()]
+
+
+def describir_dia(dia_semana):
+    """Rangos abiertos del día en texto, ej: '08:00 a 13:00 y de 17:00 a 23:00'"""
+    horas = sorted(hora for hora, (_, bloqueado) in obtener_plantilla()[dia_semana].items() if not bloqueado)
+    rangos = []
+    for hora in horas:
+        if rangos and rangos[-1][1] == hora:
+            rangos[-1][1] = hora + 1
+        else:
+            rangos.append([hora, hora + 1])
+    return ' y de '.join(f'{desde:02d}:00 a {hasta:02d}:00' for desde, hasta in rangos)
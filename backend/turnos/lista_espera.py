@@ -0,0 +1,214 @@
+# turnos/lista_espera.py
+"""
+Lista de espera de las horas completas.
+
+Cuando se libera un cupo (cancelación, baja de una reserva o más capacidad)
+se avisa al promotor al confirmarse la transacción. El promotor toma al
+primero de la lista de esa franja y le reserva el turno en una transacción,
+volviendo a validar cuota, límite del plan y clases restantes. Si el socio
+ya no puede reservar se lo quita de la lista y se pasa al siguiente.
+
+Cada alta, baja, promoción o descarte queda en EventoListaEspera para que
+el frontend le avise al socio.
+
+El promotor es un hilo de fondo del proceso (TURNOS_LISTA_ESPERA_EN_SEGUNDO_PLANO).
+`manage.py promover_lista_espera` recorre todas las franjas con cupo y
+lista de espera: sirve como cron con varios procesos o si el hilo está apagado.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from cuotas_mensuales.models import CuotaMensual
+
+from .models import EventoListaEspera, FranjaHoraria, ListaEspera, Turno, UsoPlan
+
+logger = logging.getLogger(__name__)
+
+
+def registrar_evento(socio_id, hora_inicio, tipo, detalle='', turno=None):
+    return EventoListaEspera.objects.create(
+        socio_id=socio_id,
+        hora_inicio=hora_inicio,
+        tipo=tipo,
+        detalle=detalle,
+        turno=turno
+    )
+
+
+class _SinCupo(Exception):
+    pass
+
+
+def _reservar_para(socio, franja):
+    """
+    Reserva el turno del socio con las mismas reglas que `reservar`.
+    Lanza ValidationError si el socio ya no puede reservar.
+    """
+    cuota = CuotaMensual.objects.filter(
+        socio=socio,
+        estado='activa',
+        fecha_vencimiento__gte=timezone.now().date()
+    ).select_related('plan').order_by('-fecha_vencimiento').first()
+
+    if not cuota:
+        raise ValidationError('No tienes una cuota mensual activa.')
+
+    plan = cuota.plan
+    # Misma regla que reservar: solo se descuentan clases en los planes semanales 2x/3x
+    descuenta_clase = (plan.tipo_limite == 'semanal' and plan.cantidad_limite in (2, 3))
+    if descuenta_clase and cuota.clases_restantes <= 0:
+        raise ValidationError('No tienes clases disponibles este mes.')
+
+    if UsoPlan.ocupar(socio.pk, franja.hora_inicio, UsoPlan.limites_de_plan(plan)):
+        raise ValidationError(f"Alcanzaste el límite de turnos de tu plan '{plan.nombre}'.")
+
+    if not franja.reclamar_cupo():
+        raise _SinCupo()
+
+    turno = Turno(
+        franja=franja,
+        socio=socio,
+        hora_inicio=franja.hora_inicio,
+        estado='CONFIRMADO',
+        fecha_reserva=timezone.now()
+    )
+    try:
+        with transaction.atomic():
+            turno.save()
+    except IntegrityError:
+        raise ValidationError('Ya tienes un turno en este horario.')
+
+    if descuenta_clase and not cuota.descontar_clase():
+        raise ValidationError('No tienes clases disponibles este mes.')
+    return turno
+
+
+def promover_siguiente(franja_id):
+    """
+    Intenta pasar al primero de la lista de espera de la franja a un turno.
+    Retorna 'promovido', 'descartado' (el socio ya no podía reservar y se lo
+    quitó de la lista) o None si no hay nadie esperando o no queda cupo.
+    """
+    with transaction.atomic():
+        # Bloquear la franja: una promoción a la vez por hora
+        franja = FranjaHoraria.objects.select_for_update().filter(pk=franja_id).first()
+        if franja is None:
+            return None
+
+        entrada = franja.lista_espera.select_related('socio').order_by('creado', 'id').first()
+        if entrada is None:
+            return None
+
+        if franja.hora_inicio <= timezone.now():
+            vencer_listas(franja_ids=[franja.pk])
+            return None
+
+        if franja.cupos_disponibles <= 0:
+            return None
+
+        socio = entrada.socio
+        try:
+            with transaction.atomic():
+                turno = _reservar_para(socio, franja)
+        except _SinCupo:
+            return None
+        except ValidationError as e:
+            logger.debug("Lista de espera: %s descartado (%s)", socio.username, ' '.join(e.messages))
+            entrada.delete()
+            registrar_evento(socio.pk, franja.hora_inicio, 'descartado', ' '.join(e.messages))
+            return 'descartado'
+
+        entrada.delete()
+        registrar_evento(socio.pk, franja.hora_inicio, 'promovido', 'Se liberó un cupo y tu turno quedó confirmado.', turno)
+        logger.debug("Lista de espera: %s promovido al turno %s", socio.username, turno.pk)
+        return 'promovido'
+
+
+def promover_franja(franja_id):
+    """Promueve socios de la lista mientras la franja tenga cupos. Retorna los promovidos"""
+    promovidos = 0
+    while True:
+        resultado = promover_siguiente(franja_id)
+        if resultado is None:
+            return promovidos
+        if resultado == 'promovido':
+            promovidos += 1
+
+
+def vencer_listas(franja_ids=None):
+    """Quita de la lista de espera a los anotados en horas que ya empezaron"""
+    vencidas = ListaEspera.objects.filter(franja__hora_inicio__lte=timezone.now())
+    if franja_ids is not None:
+        vencidas = vencidas.filter(franja_id__in=franja_ids)
+
+    filas = list(vencidas.values_list('id', 'socio_id', 'franja__hora_inicio'))
+    if not filas:
+        return 0
+    with transaction.atomic():
+        EventoListaEspera.objects.bulk_create([
+            EventoListaEspera(socio_id=socio_id, hora_inicio=hora_inicio, tipo='descartado',
+                              detalle='El horario empezó sin que se liberara un cupo.')
+            for _, socio_id, hora_inicio in filas
+        ])
+        ListaEspera.objects.filter(pk__in=[pk for pk, _, _ in filas]).delete()
+    return len(filas)
+
+
+def promover_pendientes():
+    """Recorre las franjas futuras con cupo libre y gente esperando"""
+    vencer_listas()
+    franja_ids = list(
+        FranjaHoraria.objects.filter(
+            hora_inicio__gt=timezone.now(),
+            bloqueada=False,
+            capacidad__gt=F('reservados') + F('confirmados'),
+            lista_espera__isnull=False
+        ).distinct().values_list('id', flat=True)
+    )
+    return sum(promover_franja(franja_id) for franja_id in franja_ids)
+
+
+# 🔹 Promotor en segundo plano
+
+class PromotorLocal:
+    """Hilo del proceso que atiende las franjas con cupos liberados, de a una"""
+
+    def __init__(self):
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def avisar(self, franja_id):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name='promotor-lista-espera', daemon=True)
+                self._hilo.start()
+        self._cola.put(franja_id)
+
+    def _trabajar(self):
+        while True:
+            franja_id = self._cola.get()
+            try:
+                if ListaEspera.objects.filter(franja_id=franja_id).exists():
+                    promover_franja(franja_id)
+            except Exception:
+                logger.exception("Error en la lista de espera de la franja %s", franja_id)
+            finally:
+                close_old_connections()
+
+
+_promotor = PromotorLocal()
+
+
+def avisar_cupo_liberado(franja_id):
+    """Se liberó (o se agregó) un cupo en la franja: promover al confirmar la transacción"""
+    if not getattr(settings, 'TURNOS_LISTA_ESPERA_EN_SEGUNDO_PLANO', True):
+        return
+    transaction.on_commit(lambda: _promotor.avisar(franja_id))
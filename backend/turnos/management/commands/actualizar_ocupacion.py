@@ -0,0 +1,20 @@
+# turnos/management/commands/actualizar_ocupacion.py
+from django.core.management.base import BaseCommand
+
+from turnos.ocupacion import actualizar_ocupacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Actualiza la tabla de ocupación por hora (estadísticas) con los días que '
+        'cambiaron desde la corrida anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Recalcular todos los días')
+
+    def handle(self, *args, **options):
+        dias, filas = actualizar_ocupacion(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Ocupación actualizada: {dias} días recalculados, {filas} filas cambiadas.'
+        ))
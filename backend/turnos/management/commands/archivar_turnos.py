@@ -0,0 +1,26 @@
+# turnos/management/commands/archivar_turnos.py
+from django.core.management.base import BaseCommand
+
+from turnos.archivo import archivar, fecha_corte
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve por lotes los turnos finalizados más viejos que N días a la tabla '
+        'de turnos archivados (TurnoHistorico).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Días que quedan en la tabla de turnos (default TURNOS_ARCHIVAR_DESPUES_DE_DIAS o 30)'
+        )
+        parser.add_argument('--lote', type=int, default=500, help='Turnos por lote (default 500)')
+
+    def handle(self, *args, **options):
+        corte = fecha_corte(options['dias'])
+        total = archivar(options['dias'], options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total} turnos archivados (anteriores a {corte:%Y-%m-%d %H:%M}).'
+        ))
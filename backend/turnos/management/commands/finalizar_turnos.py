@@ -0,0 +1,86 @@
+# turnos/management/commands/finalizar_turnos.py
+import time as time_module
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from turnos.models import Turno, FranjaHoraria, ProgresoTarea, UsoPlan
+from turnos.versiones import marcar_cambio
+
+NOMBRE_TAREA = 'finalizar_turnos'
+
+
+def finalizar_lote(progreso, lote, ahora):
+    """
+    Marca como FINALIZADO un lote de reservas cuya hora ya pasó.
+    Retorna la cantidad de turnos finalizados.
+    """
+    pendientes = Turno.objects.filter(
+        hora_inicio__lt=ahora,
+        estado__in=['RESERVADO', 'CONFIRMADO']
+    )
+    # Todo lo anterior a la marca ya fue procesado en corridas previas
+    if progreso.marca:
+        pendientes = pendientes.filter(hora_inicio__gte=progreso.marca)
+
+    filas = list(pendientes.order_by('hora_inicio', 'id').values_list('id', 'hora_inicio', 'socio_id')[:lote])
+    if not filas:
+        return 0
+
+    ids = [pk for pk, _, _ in filas]
+    with transaction.atomic():
+        # Los RESERVADO pasan al contador de confirmados de su franja
+        reservados = (
+            Turno.objects.filter(id__in=ids, estado='RESERVADO')
+            .values('franja_id')
+            .annotate(cantidad=Count('id'))
+        )
+        for fila in reservados:
+            FranjaHoraria.objects.filter(pk=fila['franja_id']).update(
+                reservados=F('reservados') - fila['cantidad'],
+                confirmados=F('confirmados') + fila['cantidad']
+            )
+
+        finalizados = Turno.objects.filter(id__in=ids).update(estado='FINALIZADO')
+        # Los finalizados ya no cuentan para el límite del plan
+        UsoPlan.liberar([(socio_id, hora) for _, hora, socio_id in filas])
+        marcar_cambio(*(hora for _, hora, _ in filas))
+        progreso.registrar(filas[-1][1], finalizados)
+
+    return finalizados
+
+
+class Command(BaseCommand):
+    help = 'Finaliza en lotes los turnos cuya hora ya pasó (una vez o cada N segundos).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Turnos por lote (default 500)')
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help='Segundos entre corridas. 0 = ejecutar una sola vez (para cron)'
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        intervalo = options['intervalo']
+
+        while True:
+            progreso = ProgresoTarea.obtener(NOMBRE_TAREA)
+            ahora = timezone.now()
+            total = 0
+
+            while True:
+                finalizados = finalizar_lote(progreso, lote, ahora)
+                total += finalizados
+                if finalizados < lote:
+                    break
+
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {total} turnos finalizados. Procesado hasta: {progreso.marca or "-"}'
+            ))
+
+            if not intervalo:
+                break
+            time_module.sleep(intervalo)
@@ -1,69 +1,55 @@
 # turnos/management/commands/generar_cupos.py
 from django.core.management.base import BaseCommand
-from turnos.models import Turno
+from turnos.models import FranjaHoraria
+from turnos.generacion import generar_franjas
+from turnos.archivo import archivar
 from django.utils import timezone
 from datetime import timedelta
 
+LOTE_BORRADO = 500
+
+
 class Command(BaseCommand):
-    help = 'Genera cupos de turnos de 1 hora para las próximas 4 semanas (L-S).'
+    help = 'Genera las franjas de turnos de 1 hora para las próximas semanas (L-S).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semanas', type=int, default=4, help='Semanas a generar (default 4)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo mostrar lo que se crearía')
 
     def handle(self, *args, **options):
         now = timezone.now().date()
-        end_date = now + timedelta(weeks=4)
+        end_date = now + timedelta(weeks=options['semanas'])
+        dry_run = options['dry_run']
         
-        # Eliminar cupos antiguos (opcional, para limpieza)
-        Turno.objects.filter(hora_inicio__lt=timezone.now()).delete()
+        # Archivar los turnos finalizados viejos y borrar las franjas pasadas que
+        # quedaron sin turnos (las que todavía tienen turnos se borran más adelante)
+        if not dry_run:
+            archivados = archivar()
+            franjas_borradas = 0
+            while True:
+                ids = list(
+                    FranjaHoraria.objects.filter(hora_inicio__lt=timezone.now(), turnos__isnull=True)
+                    .values_list('id', flat=True)[:LOTE_BORRADO]
+                )
+                if not ids:
+                    break
+                FranjaHoraria.objects.filter(pk__in=ids).delete()
+                franjas_borradas += len(ids)
+            self.stdout.write(f"🗄️ {archivados} turnos archivados y {franjas_borradas} franjas pasadas borradas.")
         
-        turnos_creados = 0
+        resumen = generar_franjas(now, end_date, dry_run=dry_run)
         
-        # Iterar sobre las fechas
-        current_date = now
-        while current_date <= end_date:
-            # 0=Lunes, 5=Sábado, 6=Domingo
-            weekday = current_date.weekday()
-            
-            # --- LUNES a VIERNES (0 a 4) ---
-            if 0 <= weekday <= 4:
-                # Horario: 08:00 a 22:30 (slots de 08:00 a 21:00)
-                start_hour = 8
-                end_hour = 22 # El último turno empieza a las 21:00 (termina 22:00)
-
-            # --- SÁBADO (5) ---
-            elif weekday == 5:
-                # Horario: 09:00 a 13:00 (slots de 09:00 a 12:00)
-                start_hour = 9
-                end_hour = 13 # El último turno empieza a las 12:00 (termina 13:00)
-                
-            # --- DOMINGO (6) ---
-            else:
-                current_date += timedelta(days=1)
-                continue
-
-            # Generar slots de 1 hora
-            for hour in range(start_hour, end_hour):
-                # Crear el objeto datetime para la hora de inicio del turno
-                hora_inicio = timezone.make_aware(
-                    timezone.datetime(
-                        current_date.year, current_date.month, current_date.day, hour, 0, 0
-                    )
-                )
-
-                # Si el turno ya pasó, saltarlo
-                if hora_inicio < timezone.now():
-                    continue
-
-                # Crear el turno si no existe (unique=True en models.py previene duplicados)
-                try:
-                    Turno.objects.create(
-                        hora_inicio=hora_inicio,
-                        estado='SOLICITUD',
-                        socio=None
-                    )
-                    turnos_creados += 1
-                except Exception as e:
-                    # Capturar errores si el slot ya existía (ignoramos)
-                    pass 
-            
-            current_date += timedelta(days=1)
+        if dry_run:
+            for franja in resumen['franjas_nuevas']:
+                estado = 'bloqueada' if franja.bloqueada else f'{franja.capacidad} cupos'
+                self.stdout.write(f"  + {timezone.localtime(franja.hora_inicio):%Y-%m-%d %H:%M} ({estado})")
+            self.stdout.write(self.style.WARNING(
+                f"🔍 Simulación: se crearían {len(resumen['franjas_nuevas'])} franjas "
+                f"({resumen['cupos_nuevos']} cupos). {resumen['franjas_existentes']} ya existen."
+            ))
+            return
 
-        self.stdout.write(self.style.SUCCESS(f'✅ Proceso finalizado. {turnos_creados} nuevos cupos generados.'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Proceso finalizado. {resumen['cupos_nuevos']} nuevos cupos generados "
+            f"en {len(resumen['franjas_nuevas'])} franjas."
+        ))
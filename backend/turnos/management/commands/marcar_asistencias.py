@@ -0,0 +1,97 @@
+# turnos/management/commands/marcar_asistencias.py
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from turnos.models import Turno, ProgresoTarea, AsistenciaSocio, ESTADOS_ACTIVOS
+from turnos.versiones import marcar_cambio
+
+NOMBRE_TAREA = 'marcar_asistencias'
+
+
+def inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min), timezone.get_current_timezone())
+
+
+def marcar_dia(progreso, fecha):
+    """
+    Cierra la asistencia de un día: los FINALIZADO con check-in pasan a
+    ASISTIO y el resto a AUSENTE, y se suman los contadores de cada socio.
+    Siempre las mismas sentencias, sin importar cuántos turnos tenga el día.
+    Retorna (asistieron, ausentes).
+    """
+    desde = inicio_del_dia(fecha)
+    hasta = inicio_del_dia(fecha + timedelta(days=1))
+    del_dia = Turno.objects.filter(hora_inicio__gte=desde, hora_inicio__lt=hasta)
+
+    with transaction.atomic():
+        finalizados = del_dia.filter(estado='FINALIZADO')
+        asistieron = finalizados.filter(ingreso__isnull=False).update(estado='ASISTIO')
+        ausentes = finalizados.filter(ingreso__isnull=True).update(estado='AUSENTE')
+
+        # El día se procesa una sola vez (la marca avanza en esta transacción),
+        # así que se puede contar todo lo marcado del día
+        conteos = list(
+            del_dia.filter(socio__isnull=False, estado__in=['ASISTIO', 'AUSENTE'])
+            .values('socio_id')
+            .annotate(
+                asistencias=Count('id', filter=Q(estado='ASISTIO')),
+                ausencias=Count('id', filter=Q(estado='AUSENTE')),
+                ultima_ausencia=Max('hora_inicio', filter=Q(estado='AUSENTE')),
+            )
+            .order_by()
+        )
+        AsistenciaSocio.sumar(conteos)
+
+        if asistieron or ausentes:
+            marcar_cambio(desde)
+        progreso.registrar(hasta, asistieron + ausentes)
+
+    return asistieron, ausentes
+
+
+class Command(BaseCommand):
+    help = (
+        'Marca como ASISTIO (con check-in) o AUSENTE los turnos finalizados de los días '
+        'ya cerrados y suma las ausencias de cada socio. Correr después de finalizar_turnos.'
+    )
+
+    def handle(self, *args, **options):
+        progreso = ProgresoTarea.obtener(NOMBRE_TAREA)
+        hoy = timezone.localdate()
+
+        if progreso.marca:
+            fecha = timezone.localtime(progreso.marca).date()
+        else:
+            primero = Turno.objects.filter(estado='FINALIZADO').order_by('hora_inicio').values_list('hora_inicio', flat=True).first()
+            if primero is None:
+                self.stdout.write(self.style.SUCCESS('✅ No hay turnos finalizados para marcar.'))
+                return
+            fecha = timezone.localtime(primero).date()
+
+        total_asistieron = total_ausentes = 0
+        while fecha < hoy:
+            desde = inicio_del_dia(fecha)
+            # Un día con reservas sin finalizar todavía no se puede cerrar
+            if Turno.objects.filter(
+                hora_inicio__gte=desde,
+                hora_inicio__lt=inicio_del_dia(fecha + timedelta(days=1)),
+                estado__in=ESTADOS_ACTIVOS
+            ).exists():
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ El {fecha} tiene turnos sin finalizar: correr finalizar_turnos primero.'
+                ))
+                break
+
+            asistieron, ausentes = marcar_dia(progreso, fecha)
+            total_asistieron += asistieron
+            total_ausentes += ausentes
+            fecha += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total_asistieron} asistencias y {total_ausentes} ausencias marcadas. '
+            f'Procesado hasta: {progreso.marca or "-"}'
+        ))
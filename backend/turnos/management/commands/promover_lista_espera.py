@@ -0,0 +1,27 @@
+# turnos/management/commands/promover_lista_espera.py
+import time as time_module
+
+from django.core.management.base import BaseCommand
+
+from turnos.lista_espera import promover_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Promueve a turno a los socios en lista de espera de las horas con cupos libres.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help='Segundos entre corridas. 0 = ejecutar una sola vez (para cron)'
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+
+        while True:
+            promovidos = promover_pendientes()
+            self.stdout.write(self.style.SUCCESS(f'✅ {promovidos} socios promovidos desde la lista de espera'))
+
+            if not intervalo:
+                break
+            time_module.sleep(intervalo)
@@ -0,0 +1,407 @@
+# turnos/management/commands/prueba_carga_reservas.py
+"""
+Prueba de carga de reservar/cancelar con chequeo de invariantes.
+
+Crea N socios de prueba con cuota activa, levanta un servidor HTTP local
+(o usa --url) y dispara reservas concurrentes desde un pool de hilos
+sobre unas pocas franjas de una semana futura. Al final informa
+throughput, latencias, tasa de conflictos y las violaciones encontradas:
+franjas sobrevendidas, contadores desfasados, socios duplicados en una
+franja, clases negativas o mal descontadas, límites de plan excedidos y
+uso de los planes (UsoPlan) desfasado.
+
+Usa la base configurada en settings (SQLite local o MySQL). En SQLite
+las escrituras concurrentes se serializan y aparecen errores de
+"database is locked": reservar y cancelar los responden con 503 y
+Retry-After, y la prueba reintenta como lo haría el cliente (--reintentos).
+Los 5xx que quedan y los requests sin respuesta se informan como errores
+y hacen fallar el comando, igual que las violaciones de invariantes.
+"""
+import contextlib
+import json
+import logging
+import os
+import random
+import statistics
+import threading
+import time as time_module
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Perfil
+from cuotas_mensuales.models import Plan, CuotaMensual
+from turnos.generacion import generar_franjas
+from turnos.models import FranjaHoraria, Turno, UsoPlan, ESTADOS_CERRADOS
+
+PREFIJO_SOCIOS = 'carga_'
+NOMBRE_PLAN = 'Prueba de carga 3x'
+ESTADOS_ACTIVOS = ['RESERVADO', 'CONFIRMADO']
+
+
+class _HandlerSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga concurrente de reservas con detección de doble reserva e invariantes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socios', type=int, default=50, help='Socios de prueba (default 50)')
+        parser.add_argument('--hilos', type=int, default=16, help='Requests concurrentes (default 16)')
+        parser.add_argument('--intentos', type=int, default=4, help='Reservas que intenta cada socio (default 4)')
+        parser.add_argument('--franjas', type=int, default=4, help='Franjas en disputa (default 4)')
+        parser.add_argument(
+            '--cancelar', type=float, default=0.25,
+            help='Probabilidad de cancelar una reserva recién hecha (default 0.25)'
+        )
+        parser.add_argument(
+            '--fecha', type=str,
+            help='Lunes de la semana a usar (YYYY-MM-DD). Default: dentro de 8 semanas'
+        )
+        parser.add_argument(
+            '--reintentos', type=int, default=5,
+            help='Reintentos de un request que respondió 503 por contención (default 5)'
+        )
+        parser.add_argument('--url', type=str, help='Servidor ya levantado (ej: http://127.0.0.1:8000). Default: uno local')
+        parser.add_argument('--semilla', type=int, help='Semilla para repetir la misma secuencia')
+        parser.add_argument('--conservar', action='store_true', help='No borrar los datos de prueba al terminar')
+        parser.add_argument('--verbose', action='store_true', help='Mostrar los print de las vistas')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['semilla'])
+
+        if options['fecha']:
+            try:
+                lunes = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        else:
+            lunes = timezone.localdate() + timedelta(weeks=8)
+        lunes -= timedelta(days=lunes.weekday())
+
+        self.stdout.write(f"🔧 Base de datos: {connection.vendor} | Semana: {lunes}")
+
+        self._limpiar_socios()
+        socios = self._crear_socios(options['socios'])
+        franjas_creadas, objetivos = self._preparar_franjas(lunes, options['franjas'])
+        if not objetivos:
+            self._limpiar(socios, franjas_creadas)
+            raise CommandError('No hay franjas abiertas en la semana elegida')
+
+        tareas = [
+            (socio, token, self.rng.choice(objetivos))
+            for socio, token in socios
+            for _ in range(options['intentos'])
+        ]
+        # Mezcladas: el mismo socio puede tener varias reservas en vuelo a la vez
+        self.rng.shuffle(tareas)
+
+        try:
+            resultados, duracion = self._ejecutar(tareas, options)
+            errores = self._informar(resultados, duracion, len(tareas))
+            violaciones = self._verificar_invariantes(socios, [franja.pk for franja in objetivos], lunes)
+        finally:
+            if options['conservar']:
+                self.stdout.write(self.style.WARNING(f'⚠️ Datos de prueba conservados (socios {PREFIJO_SOCIOS}*)'))
+            else:
+                self._limpiar(socios, franjas_creadas)
+
+        fallas = []
+        if violaciones:
+            fallas.append(f'{len(violaciones)} violaciones de invariantes detectadas')
+        if errores:
+            fallas.append(f'{errores} requests con error (5xx o sin respuesta)')
+        if fallas:
+            raise CommandError(' y '.join(fallas))
+        self.stdout.write(self.style.SUCCESS('✅ Sin violaciones de invariantes ni errores'))
+
+    # 🔹 Preparación
+
+    def _crear_socios(self, cantidad):
+        plan, _ = Plan.objects.get_or_create(
+            nombre=NOMBRE_PLAN,
+            defaults={
+                'precio': 0,
+                'frecuencia': '3 veces por semana',
+                'tipo_limite': 'semanal',
+                'cantidad_limite': 3,
+                'activo': False,
+            }
+        )
+        User.objects.bulk_create([User(username=f'{PREFIJO_SOCIOS}{i:04d}') for i in range(cantidad)])
+        usuarios = list(User.objects.filter(username__startswith=PREFIJO_SOCIOS).order_by('username'))
+        Perfil.objects.bulk_create([Perfil(user=usuario, rol='socio') for usuario in usuarios])
+
+        vencimiento = timezone.localdate() + timedelta(days=30)
+        for usuario in usuarios:
+            # save() calcula las clases del plan
+            CuotaMensual.objects.create(socio=usuario, plan=plan, fecha_vencimiento=vencimiento)
+
+        self.stdout.write(f"👥 {len(usuarios)} socios de prueba creados con plan '{plan.nombre}'")
+        return [(usuario, str(AccessToken.for_user(usuario))) for usuario in usuarios]
+
+    def _preparar_franjas(self, lunes, cantidad):
+        tz = timezone.get_current_timezone()
+        desde = timezone.make_aware(datetime.combine(lunes, time.min), tz)
+        hasta = timezone.make_aware(datetime.combine(lunes + timedelta(days=6), time.max), tz)
+
+        existentes = set(FranjaHoraria.objects.filter(
+            hora_inicio__gte=desde, hora_inicio__lte=hasta
+        ).values_list('id', flat=True))
+        generar_franjas(lunes, lunes + timedelta(days=6))
+
+        franjas = FranjaHoraria.objects.filter(hora_inicio__gte=desde, hora_inicio__lte=hasta)
+        creadas = list(franjas.exclude(id__in=existentes).values_list('id', flat=True))
+        objetivos = list(franjas.filter(bloqueada=False).order_by('hora_inicio')[:cantidad])
+
+        for franja in objetivos:
+            self.stdout.write(
+                f"🎯 Franja {franja.pk}: {timezone.localtime(franja.hora_inicio):%a %d/%m %H:%M} "
+                f"({franja.cupos_disponibles}/{franja.capacidad} libres)"
+            )
+        return creadas, objetivos
+
+    # 🔹 Ejecución
+
+    def _ejecutar(self, tareas, options):
+        servidor = None
+        url = options['url']
+        if not url:
+            servidor = ThreadedWSGIServer(('127.0.0.1', 0), _HandlerSilencioso)
+            servidor.set_app(get_internal_wsgi_application())
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            url = f'http://127.0.0.1:{servidor.server_address[1]}'
+        self.base_url = url.rstrip('/')
+        self.reintentos = options['reintentos']
+        self.stdout.write(f"🚀 {len(tareas)} reservas con {options['hilos']} hilos contra {self.base_url}")
+
+        salida = contextlib.nullcontext() if options['verbose'] else open(os.devnull, 'w')
+        logger_requests = logging.getLogger('django.request')
+        nivel_anterior = logger_requests.level
+        if not options['verbose']:
+            # Los 400/409 esperables no se loguean como warnings
+            logger_requests.setLevel(logging.ERROR)
+        try:
+            with salida as destino:
+                silencio = contextlib.nullcontext() if destino is None else contextlib.redirect_stdout(destino)
+                with silencio:
+                    inicio = time_module.perf_counter()
+                    with ThreadPoolExecutor(max_workers=options['hilos']) as pool:
+                        resultados = list(pool.map(
+                            lambda tarea: self._reservar(*tarea, options['cancelar']), tareas
+                        ))
+                    duracion = time_module.perf_counter() - inicio
+        finally:
+            logger_requests.setLevel(nivel_anterior)
+            if servidor:
+                servidor.shutdown()
+                servidor.server_close()
+
+        return [r for lista in resultados for r in lista], duracion
+
+    def _post(self, ruta, token, datos=None):
+        """
+        POST JSON, repitiendo los 503 por contención como haría el cliente.
+        Retorna (status, cuerpo, segundos, reintentos); status 0 = sin respuesta
+        """
+        inicio = time_module.perf_counter()
+        reintentos = 0
+        while True:
+            codigo, cuerpo = self._enviar(ruta, token, datos)
+            if codigo != 503 or cuerpo.get('error_code') != 'reintentar' or reintentos >= self.reintentos:
+                return codigo, cuerpo, time_module.perf_counter() - inicio, reintentos
+            reintentos += 1
+            # Retry-After es de 1s: en la prueba alcanza con una espera corta y al azar
+            time_module.sleep(self.rng.uniform(0.05, 0.2) * reintentos)
+
+    def _enviar(self, ruta, token, datos):
+        request = urllib.request.Request(
+            f'{self.base_url}{ruta}',
+            data=json.dumps(datos or {}).encode(),
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as respuesta:
+                codigo, cuerpo = respuesta.status, respuesta.read()
+        except urllib.error.HTTPError as e:
+            codigo, cuerpo = e.code, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            return 0, {'detail': str(e)}
+
+        try:
+            return codigo, json.loads(cuerpo or b'{}')
+        except ValueError:
+            return codigo, {}
+
+    def _reservar(self, socio, token, franja, prob_cancelar):
+        """Una reserva (por id o por hora) y, a veces, su cancelación"""
+        if self.rng.random() < 0.5:
+            datos = {'franja_id': franja.pk}
+        else:
+            datos = {'hora_inicio': franja.hora_inicio.isoformat()}
+
+        codigo, cuerpo, segundos, reintentos = self._post('/api/turnos/turno/reservar/', token, datos)
+        resultados = [('reservar', codigo, self._motivo(cuerpo), segundos, reintentos)]
+
+        turno_id = cuerpo.get('turno_id')
+        if codigo == 200 and turno_id and self.rng.random() < prob_cancelar:
+            codigo, cuerpo, segundos, reintentos = self._post(f'/api/turnos/turno/{turno_id}/cancelar/', token)
+            resultados.append(('cancelar', codigo, self._motivo(cuerpo), segundos, reintentos))
+        return resultados
+
+    @staticmethod
+    def _motivo(cuerpo):
+        """error_code de la respuesta, o el campo de la ValidationError"""
+        if cuerpo.get('error_code'):
+            return cuerpo['error_code']
+        detalle = cuerpo.get('detail')
+        if isinstance(detalle, dict) and detalle:
+            return next(iter(detalle))
+        return None
+
+    # 🔹 Resultados
+
+    def _informar(self, resultados, duracion, intentos):
+        """Imprime el resumen y retorna la cantidad de errores (5xx o sin respuesta)"""
+        self.stdout.write('')
+        self.stdout.write(f"⏱️ {len(resultados)} requests en {duracion:.2f}s ({len(resultados) / duracion:.1f} req/s)")
+
+        for endpoint in ('reservar', 'cancelar'):
+            filas = [r for r in resultados if r[0] == endpoint]
+            if not filas:
+                continue
+            latencias = [r[3] * 1000 for r in filas]
+            self.stdout.write(
+                f"   {endpoint}: {len(filas)} | p50 {_percentil(latencias, 50):.0f}ms "
+                f"p95 {_percentil(latencias, 95):.0f}ms p99 {_percentil(latencias, 99):.0f}ms"
+            )
+
+        reservas = [r for r in resultados if r[0] == 'reservar']
+        conflictos = sum(1 for r in reservas if r[1] == 409)
+        self.stdout.write(f"⚔️ Conflictos de cupo: {conflictos}/{intentos} ({conflictos * 100 / intentos:.1f}%)")
+
+        reintentados = sum(1 for r in resultados if r[4])
+        self.stdout.write(
+            f"🔁 Reintentados por contención: {reintentados}/{len(resultados)} "
+            f"({sum(r[4] for r in resultados)} reintentos)"
+        )
+
+        errores = sum(1 for r in resultados if r[1] == 0 or r[1] >= 500)
+        estilo_errores = self.style.ERROR if errores else self.style.SUCCESS
+        self.stdout.write(estilo_errores(
+            f"💥 Errores (5xx o sin respuesta): {errores}/{len(resultados)} ({errores * 100 / len(resultados):.1f}%)"
+        ))
+
+        respuestas = Counter((r[0], r[1], r[2]) for r in resultados)
+        for (endpoint, codigo, motivo), cantidad in sorted(respuestas.items(), key=lambda x: (x[0][0], x[0][1])):
+            detalle = f" ({motivo})" if motivo else ''
+            estilo = self.style.ERROR if codigo == 0 or codigo >= 500 else (lambda texto: texto)
+            self.stdout.write(estilo(f"   {endpoint} {codigo or 'sin respuesta'}{detalle}: {cantidad}"))
+        return errores
+
+    def _verificar_invariantes(self, socios, franja_ids, lunes):
+        violaciones = []
+        socio_ids = [socio.pk for socio, _ in socios]
+
+        # 1. Franjas sobrevendidas o con contadores que no coinciden con sus reservas
+        franjas = FranjaHoraria.objects.filter(pk__in=franja_ids).annotate(
+            activos_reservados=Count('turnos', filter=Q(turnos__estado='RESERVADO')),
+            activos_confirmados=Count('turnos', filter=Q(turnos__estado__in=['CONFIRMADO', *ESTADOS_CERRADOS])),
+        )
+        for franja in franjas:
+            ocupados = franja.activos_reservados + franja.activos_confirmados
+            if ocupados > franja.capacidad:
+                violaciones.append(f'Franja {franja.pk} sobrevendida: {ocupados}/{franja.capacidad}')
+            if (franja.reservados, franja.confirmados) != (franja.activos_reservados, franja.activos_confirmados):
+                violaciones.append(
+                    f'Franja {franja.pk} con contadores desfasados: '
+                    f'{franja.reservados}/{franja.confirmados} vs reales '
+                    f'{franja.activos_reservados}/{franja.activos_confirmados}'
+                )
+
+        # 2. Un socio dos veces en la misma franja
+        duplicados = (
+            Turno.objects.filter(socio_id__in=socio_ids)
+            .values('franja_id', 'socio_id')
+            .annotate(cantidad=Count('id'))
+            .filter(cantidad__gt=1)
+        )
+        for fila in duplicados:
+            violaciones.append(f"Socio {fila['socio_id']} {fila['cantidad']} veces en la franja {fila['franja_id']}")
+
+        # 3. Clases negativas o que no coinciden con las reservas hechas
+        activos = dict(
+            Turno.objects.filter(socio_id__in=socio_ids, estado__in=ESTADOS_ACTIVOS)
+            .values('socio_id').annotate(cantidad=Count('id')).values_list('socio_id', 'cantidad')
+        )
+        for cuota in CuotaMensual.objects.filter(socio_id__in=socio_ids).select_related('plan'):
+            if cuota.clases_restantes < 0:
+                violaciones.append(f'Cuota {cuota.pk} con clases negativas: {cuota.clases_restantes}')
+            usadas = cuota.clases_totales - cuota.clases_restantes
+            if usadas != activos.get(cuota.socio_id, 0):
+                violaciones.append(
+                    f'Cuota {cuota.pk}: {usadas} clases descontadas para {activos.get(cuota.socio_id, 0)} reservas'
+                )
+
+            # 4. Límite semanal del plan (todas las franjas son de la misma semana)
+            if cuota.plan.tipo_limite == 'semanal' and activos.get(cuota.socio_id, 0) > cuota.plan.cantidad_limite:
+                violaciones.append(
+                    f'Socio {cuota.socio_id} excede su plan: '
+                    f'{activos[cuota.socio_id]}/{cuota.plan.cantidad_limite} en la semana del {lunes}'
+                )
+
+        # 5. Uso de los planes igual a las reservas activas
+        esperado = UsoPlan.calcular(socio_ids)
+        for socio_id, periodo, inicio, usados in UsoPlan.objects.filter(
+            socio_id__in=socio_ids
+        ).values_list('socio_id', 'periodo', 'inicio', 'usados'):
+            reservas = esperado.pop((socio_id, periodo, inicio), 0)
+            if usados != reservas:
+                violaciones.append(f'Socio {socio_id}: uso del plan ({periodo} {inicio}) en {usados} para {reservas} reservas')
+        for (socio_id, periodo, inicio), usados in esperado.items():
+            violaciones.append(f'Socio {socio_id}: falta el uso del plan ({periodo} {inicio}) de {usados} reservas')
+
+        self.stdout.write('')
+        if violaciones:
+            self.stdout.write(self.style.ERROR(f'❌ {len(violaciones)} violaciones:'))
+            for violacion in violaciones:
+                self.stdout.write(self.style.ERROR(f'   - {violacion}'))
+        return violaciones
+
+    # 🔹 Limpieza
+
+    def _limpiar_socios(self):
+        """Borra socios de prueba que hayan quedado de una corrida anterior"""
+        restos = User.objects.filter(username__startswith=PREFIJO_SOCIOS)
+        if restos.exists():
+            franja_ids = set(Turno.objects.filter(socio__in=restos).values_list('franja_id', flat=True))
+            Turno.objects.filter(socio__in=restos).delete()
+            for franja in FranjaHoraria.objects.filter(pk__in=franja_ids):
+                franja.recalcular_contadores()
+            restos.delete()
+
+    def _limpiar(self, socios, franjas_creadas):
+        self._limpiar_socios()
+        FranjaHoraria.objects.filter(pk__in=franjas_creadas).delete()
+        self.stdout.write(f'🧹 Datos de prueba eliminados ({len(socios)} socios, {len(franjas_creadas)} franjas)')
@@ -0,0 +1,60 @@
+# turnos/management/commands/reconciliar_uso_planes.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from turnos.models import UsoPlan
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye el uso de los planes (reservas activas por socio, semana y día) '
+        'a partir de los turnos. Conviene correrlo con poco tráfico de reservas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo mostrar las diferencias')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        with transaction.atomic():
+            # Una consulta agrupada sobre Turno y otra sobre el uso guardado
+            esperado = UsoPlan.calcular()
+            actuales = {
+                (uso.socio_id, uso.periodo, uso.inicio): uso
+                for uso in UsoPlan.objects.select_for_update()
+            }
+
+            nuevos = []
+            modificados = []
+            for clave, usados in esperado.items():
+                uso = actuales.get(clave)
+                if uso is None:
+                    socio_id, periodo, inicio = clave
+                    nuevos.append(UsoPlan(socio_id=socio_id, periodo=periodo, inicio=inicio, usados=usados))
+                elif uso.usados != usados:
+                    if dry_run:
+                        self.stdout.write(f"  ~ socio {clave[0]} {clave[1]} {clave[2]}: {uso.usados} -> {usados}")
+                    uso.usados = usados
+                    modificados.append(uso)
+
+            # Periodos sin reservas activas (pasados o cancelados)
+            sobrantes = [uso.pk for clave, uso in actuales.items() if clave not in esperado]
+
+            if dry_run:
+                for uso in nuevos:
+                    self.stdout.write(f"  + socio {uso.socio_id} {uso.periodo} {uso.inicio}: {uso.usados}")
+                self.stdout.write(self.style.WARNING(
+                    f"🔍 Simulación: {len(nuevos)} filas nuevas, {len(modificados)} corregidas "
+                    f"y {len(sobrantes)} sin reservas para borrar."
+                ))
+                return
+
+            UsoPlan.objects.bulk_create(nuevos, batch_size=1000)
+            UsoPlan.objects.bulk_update(modificados, ['usados'], batch_size=1000)
+            UsoPlan.objects.filter(pk__in=sobrantes).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Uso de planes reconciliado: {len(nuevos)} filas nuevas, {len(modificados)} corregidas "
+            f"y {len(sobrantes)} borradas."
+        ))
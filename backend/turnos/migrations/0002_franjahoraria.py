@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FranjaHoraria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora_inicio', models.DateTimeField(unique=True)),
+                ('capacidad', models.PositiveSmallIntegerField(default=10)),
+                ('reservados', models.PositiveSmallIntegerField(default=0)),
+                ('confirmados', models.PositiveSmallIntegerField(default=0)),
+                ('bloqueada', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Franja horaria',
+                'verbose_name_plural': 'Franjas horarias',
+                'ordering': ['hora_inicio'],
+            },
+        ),
+        migrations.AddField(
+            model_name='turno',
+            name='franja',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='turnos', to='turnos.franjahoraria'),
+        ),
+    ]
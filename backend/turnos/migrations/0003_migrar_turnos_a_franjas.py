@@ -0,0 +1,70 @@
+from django.db import migrations
+
+CAPACIDAD_POR_HORA = 10
+ESTADOS_CON_SOCIO = ('RESERVADO', 'CONFIRMADO', 'FINALIZADO')
+
+
+def migrar_turnos_a_franjas(apps, schema_editor):
+    """
+    Agrupa los cupos existentes (10 filas por hora, separadas por segundos)
+    en una FranjaHoraria por hora. Las reservas con socio se conservan como
+    Turno apuntando a su franja; los cupos vacíos se eliminan.
+    """
+    Turno = apps.get_model('turnos', 'Turno')
+    FranjaHoraria = apps.get_model('turnos', 'FranjaHoraria')
+
+    franjas = {}
+    reservas = []
+    vacios = []
+
+    for turno in Turno.objects.order_by('hora_inicio').iterator():
+        inicio = turno.hora_inicio.replace(minute=0, second=0, microsecond=0)
+        datos = franjas.setdefault(inicio, {
+            'capacidad': 0,
+            'reservados': 0,
+            'confirmados': 0,
+            'bloqueos': 0,
+        })
+
+        if turno.estado == 'BLOQUEADO':
+            datos['bloqueos'] += 1
+        else:
+            datos['capacidad'] += 1
+
+        if turno.socio_id and turno.estado in ESTADOS_CON_SOCIO:
+            if turno.estado == 'RESERVADO':
+                datos['reservados'] += 1
+            else:
+                datos['confirmados'] += 1
+            reservas.append((turno.pk, inicio))
+        else:
+            vacios.append(turno.pk)
+
+    FranjaHoraria.objects.bulk_create([
+        FranjaHoraria(
+            hora_inicio=inicio,
+            capacidad=datos['capacidad'] or CAPACIDAD_POR_HORA,
+            reservados=datos['reservados'],
+            confirmados=datos['confirmados'],
+            bloqueada=datos['capacidad'] == 0 and datos['bloqueos'] > 0,
+        )
+        for inicio, datos in franjas.items()
+    ], batch_size=500)
+
+    ids_franja = dict(FranjaHoraria.objects.values_list('hora_inicio', 'id'))
+    for pk, inicio in reservas:
+        Turno.objects.filter(pk=pk).update(franja_id=ids_franja[inicio], hora_inicio=inicio)
+
+    for i in range(0, len(vacios), 500):
+        Turno.objects.filter(pk__in=vacios[i:i + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0002_franjahoraria'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrar_turnos_a_franjas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0003_migrar_turnos_a_franjas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='turno',
+            name='franja',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnos', to='turnos.franjahoraria'),
+        ),
+    ]
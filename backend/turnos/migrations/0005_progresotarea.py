@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0004_alter_turno_franja'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgresoTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('marca', models.DateTimeField(blank=True, null=True)),
+                ('procesados', models.PositiveIntegerField(default=0)),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Progreso de tarea',
+                'verbose_name_plural': 'Progreso de tareas',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+def cargar_plantilla_inicial(apps, schema_editor):
+    """Horario vigente: L-V 8 a 23, sábados 8 a 13 y 17 a 23 (13 a 17 bloqueado)"""
+    HorarioPlantilla = apps.get_model('turnos', 'HorarioPlantilla')
+    filas = [(dia, 8, 23, False) for dia in range(5)] + [
+        (5, 8, 13, False),
+        (5, 13, 17, True),
+        (5, 17, 23, False),
+    ]
+    HorarioPlantilla.objects.bulk_create([
+        HorarioPlantilla(dia_semana=dia, hora_desde=desde, hora_hasta=hasta, capacidad=10, bloqueado=bloqueado)
+        for dia, desde, hasta, bloqueado in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0005_progresotarea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioPlantilla',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('hora_desde', models.PositiveSmallIntegerField(help_text='Primera hora de inicio (0-23)')),
+                ('hora_hasta', models.PositiveSmallIntegerField(help_text='Hora de cierre, no incluida (1-24)')),
+                ('capacidad', models.PositiveSmallIntegerField(default=10, help_text='Cupos por hora')),
+                ('bloqueado', models.BooleanField(default=False, help_text='Rango sin turnos (ej: siesta del sábado)')),
+                ('activo', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Horario de plantilla',
+                'verbose_name_plural': 'Plantilla de horarios',
+                'ordering': ['dia_semana', 'hora_desde'],
+            },
+        ),
+        migrations.RunPython(cargar_plantilla_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+
+
+def eliminar_reservas_duplicadas(apps, schema_editor):
+    """
+    Deja una sola reserva por (franja, socio) antes de crear la restricción
+    y recalcula los contadores de las franjas afectadas.
+    """
+    Turno = apps.get_model('turnos', 'Turno')
+    FranjaHoraria = apps.get_model('turnos', 'FranjaHoraria')
+
+    duplicados = (
+        Turno.objects.filter(socio__isnull=False)
+        .values('franja_id', 'socio_id')
+        .annotate(cantidad=Count('id'), primero=Min('id'))
+        .filter(cantidad__gt=1)
+    )
+
+    franjas_afectadas = set()
+    for fila in duplicados:
+        Turno.objects.filter(
+            franja_id=fila['franja_id'],
+            socio_id=fila['socio_id']
+        ).exclude(pk=fila['primero']).delete()
+        franjas_afectadas.add(fila['franja_id'])
+
+    for franja in FranjaHoraria.objects.filter(pk__in=franjas_afectadas):
+        conteo = Turno.objects.filter(franja_id=franja.pk).aggregate(
+            reservados=Count('id', filter=Q(estado='RESERVADO')),
+            confirmados=Count('id', filter=Q(estado__in=['CONFIRMADO', 'FINALIZADO'])),
+        )
+        franja.reservados = conteo['reservados']
+        franja.confirmados = conteo['confirmados']
+        franja.save(update_fields=['reservados', 'confirmados'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0006_horarioplantilla'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_reservas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='turno',
+            constraint=models.UniqueConstraint(fields=('franja', 'socio'), name='turno_unico_por_franja_y_socio'),
+        ),
+    ]
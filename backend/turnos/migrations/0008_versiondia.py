@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0007_turno_unico_por_franja_y_socio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Versión de día',
+                'verbose_name_plural': 'Versiones de días',
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:20
+
+from collections import Counter
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def cargar_uso_actual(apps, schema_editor):
+    """Carga el uso por semana y por día a partir de las reservas activas"""
+    Turno = apps.get_model('turnos', 'Turno')
+    UsoPlan = apps.get_model('turnos', 'UsoPlan')
+
+    uso = Counter()
+    for socio_id, hora_inicio, cantidad in (
+        Turno.objects.filter(socio__isnull=False, estado__in=['RESERVADO', 'CONFIRMADO'])
+        .values('socio_id', 'hora_inicio')
+        .annotate(cantidad=Count('id'))
+        .values_list('socio_id', 'hora_inicio', 'cantidad')
+        .order_by()
+    ):
+        fecha = timezone.localtime(hora_inicio).date()
+        uso[(socio_id, 'semana', fecha - timedelta(days=fecha.weekday()))] += cantidad
+        uso[(socio_id, 'dia', fecha)] += cantidad
+
+    UsoPlan.objects.bulk_create([
+        UsoPlan(socio_id=socio_id, periodo=periodo, inicio=inicio, usados=usados)
+        for (socio_id, periodo, inicio), usados in uso.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0008_versiondia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsoPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('semana', 'Semana'), ('dia', 'Día')], max_length=10)),
+                ('inicio', models.DateField(help_text='Lunes de la semana o fecha del día')),
+                ('usados', models.PositiveSmallIntegerField(default=0)),
+                ('socio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uso_plan', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Uso del plan',
+                'verbose_name_plural': 'Uso de los planes',
+                'constraints': [models.UniqueConstraint(fields=('socio', 'periodo', 'inicio'), name='uso_plan_unico_por_periodo')],
+            },
+        ),
+        migrations.RunPython(cargar_uso_actual, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0009_usoplan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['socio', 'estado', 'hora_inicio'], name='turnos_turn_socio_i_33ff0c_idx'),
+        ),
+    ]
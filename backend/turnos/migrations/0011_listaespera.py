@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0010_turno_indice_socio_estado_hora'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora_inicio', models.DateTimeField()),
+                ('tipo', models.CharField(choices=[('alta', 'Se anotó'), ('baja', 'Salió de la lista'), ('promovido', 'Obtuvo el turno'), ('descartado', 'Quitado de la lista')], max_length=20)),
+                ('detalle', models.CharField(blank=True, max_length=255)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('socio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_lista_espera', to=settings.AUTH_USER_MODEL)),
+                ('turno', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='turnos.turno')),
+            ],
+            options={
+                'verbose_name': 'Evento de lista de espera',
+                'verbose_name_plural': 'Eventos de lista de espera',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('franja', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lista_espera', to='turnos.franjahoraria')),
+                ('socio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listas_espera', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lista de espera',
+                'verbose_name_plural': 'Listas de espera',
+                'ordering': ['creado', 'id'],
+                'indexes': [models.Index(fields=['franja', 'creado'], name='turnos_list_franja__f7e92e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('franja', 'socio'), name='lista_espera_unica_por_franja_y_socio')],
+            },
+        ),
+    ]
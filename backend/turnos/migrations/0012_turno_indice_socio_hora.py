@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0011_listaespera'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['socio', 'hora_inicio'], name='turnos_turn_socio_i_4c3020_idx'),
+        ),
+    ]
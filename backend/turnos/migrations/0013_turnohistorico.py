@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0012_turno_indice_socio_hora'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurnoHistorico',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('hora_inicio', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('DISPONIBLE', 'Cupo Disponible'), ('RESERVADO', 'Reservado - Pendiente de Confirmación'), ('CONFIRMADO', 'Confirmado'), ('CANCELADO', 'Cancelado/Liberado'), ('FINALIZADO', 'Finalizado'), ('BLOQUEADO', 'Bloqueado')], max_length=20)),
+                ('socio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='turnos_historicos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Turno archivado',
+                'verbose_name_plural': 'Turnos archivados',
+                'ordering': ['hora_inicio'],
+                'indexes': [models.Index(fields=['hora_inicio'], name='turnos_turn_hora_in_149702_idx'), models.Index(fields=['socio', 'hora_inicio'], name='turnos_turn_socio_i_378f2b_idx')],
+            },
+        ),
+    ]
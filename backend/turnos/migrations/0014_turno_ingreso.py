@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0013_turnohistorico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turno',
+            name='ingreso',
+            field=models.DateTimeField(blank=True, help_text='Check-in en el kiosco de la entrada', null=True),
+        ),
+    ]
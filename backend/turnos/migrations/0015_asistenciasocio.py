@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0014_turno_ingreso'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='turno',
+            name='estado',
+            field=models.CharField(choices=[('DISPONIBLE', 'Cupo Disponible'), ('RESERVADO', 'Reservado - Pendiente de Confirmación'), ('CONFIRMADO', 'Confirmado'), ('CANCELADO', 'Cancelado/Liberado'), ('FINALIZADO', 'Finalizado'), ('ASISTIO', 'Asistió'), ('AUSENTE', 'Ausente'), ('BLOQUEADO', 'Bloqueado')], default='DISPONIBLE', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='turnohistorico',
+            name='estado',
+            field=models.CharField(choices=[('DISPONIBLE', 'Cupo Disponible'), ('RESERVADO', 'Reservado - Pendiente de Confirmación'), ('CONFIRMADO', 'Confirmado'), ('CANCELADO', 'Cancelado/Liberado'), ('FINALIZADO', 'Finalizado'), ('ASISTIO', 'Asistió'), ('AUSENTE', 'Ausente'), ('BLOQUEADO', 'Bloqueado')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='AsistenciaSocio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asistencias', models.PositiveIntegerField(default=0)),
+                ('ausencias', models.PositiveIntegerField(default=0)),
+                ('ultima_ausencia', models.DateTimeField(blank=True, null=True)),
+                ('socio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='asistencia', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Asistencia de socio',
+                'verbose_name_plural': 'Asistencia de socios',
+            },
+        ),
+    ]
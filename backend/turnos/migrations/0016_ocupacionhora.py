@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0015_asistenciasocio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('capacidad', models.PositiveSmallIntegerField(default=0)),
+                ('reservados', models.PositiveSmallIntegerField(default=0)),
+                ('confirmados', models.PositiveSmallIntegerField(default=0)),
+                ('asistieron', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ocupación por hora',
+                'verbose_name_plural': 'Ocupación por hora',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'hora'), name='ocupacion_unica_por_hora')],
+            },
+        ),
+    ]
@@ -1,9 +1,11 @@
 # turnos/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import Q, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from collections import Counter, defaultdict
 from datetime import timedelta, time
 
 User = get_user_model()
@@ -14,10 +16,169 @@ ESTADO_CHOICES = (
     ('CONFIRMADO', 'Confirmado'),
     ('CANCELADO', 'Cancelado/Liberado'),
     ('FINALIZADO', 'Finalizado'),
+    ('ASISTIO', 'Asistió'),
+    ('AUSENTE', 'Ausente'),
     ('BLOQUEADO', 'Bloqueado'),
 )
 
+# Cupos por hora que se generan por defecto
+CAPACIDAD_POR_HORA = 10
+
+# Estados de reserva que cuentan para el límite del plan
+ESTADOS_ACTIVOS = ['RESERVADO', 'CONFIRMADO']
+
+# Turnos que ya pasaron: FINALIZADO hasta que `marcar_asistencias` los pasa
+# a ASISTIO (con check-in) o AUSENTE
+ESTADOS_CERRADOS = ['FINALIZADO', 'ASISTIO', 'AUSENTE']
+
+# Contador de la franja que ocupa cada estado de reserva.
+# Los turnos finalizados siguen ocupando el cupo que usaron.
+CONTADOR_POR_ESTADO = {
+    'RESERVADO': 'reservados',
+    'CONFIRMADO': 'confirmados',
+    'FINALIZADO': 'confirmados',
+    'ASISTIO': 'confirmados',
+    'AUSENTE': 'confirmados',
+}
+
+
+def validar_horario(hora_inicio):
+    """Valida que la hora caiga dentro del horario de apertura del gimnasio"""
+    from .horarios import consultar_horario, describir_dia, DIAS_SEMANA
+
+    # ✅ Convertir a hora local antes de validar
+    hora_local = timezone.localtime(hora_inicio)
+    
+    # Validar que sea hora en punto
+    if hora_local.minute != 0:
+        raise ValidationError({
+            'hora_inicio': 'La hora de inicio debe ser una hora en punto (ej: 08:00, 09:00, etc.).'
+        })
+    
+    # Validar contra la plantilla de horarios (búsqueda O(1))
+    horario = consultar_horario(hora_local)
+    if horario is None or horario[1]:
+        dia = DIAS_SEMANA[hora_local.weekday()]
+        rangos = describir_dia(hora_local.weekday())
+        if not rangos:
+            mensaje = f'No se pueden crear turnos los {dia}s.'
+        else:
+            mensaje = f'Los {dia}s los turnos son de {rangos}.'
+        raise ValidationError({'hora_inicio': mensaje})
+
+
+class HorarioPlantilla(models.Model):
+    """
+    Rango horario de un día de la semana con su capacidad por hora.
+    Los rangos bloqueados tienen prioridad sobre los abiertos.
+    """
+    DIA_CHOICES = [
+        (0, 'Lunes'),
+        (1, 'Martes'),
+        (2, 'Miércoles'),
+        (3, 'Jueves'),
+        (4, 'Viernes'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+
+    dia_semana = models.PositiveSmallIntegerField(choices=DIA_CHOICES)
+    hora_desde = models.PositiveSmallIntegerField(help_text="Primera hora de inicio (0-23)")
+    hora_hasta = models.PositiveSmallIntegerField(help_text="Hora de cierre, no incluida (1-24)")
+    capacidad = models.PositiveSmallIntegerField(default=CAPACIDAD_POR_HORA, help_text="Cupos por hora")
+    bloqueado = models.BooleanField(default=False, help_text="Rango sin turnos (ej: siesta del sábado)")
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Horario de plantilla"
+        verbose_name_plural = "Plantilla de horarios"
+        ordering = ['dia_semana', 'hora_desde']
+
+    def __str__(self):
+        estado = "bloqueado" if self.bloqueado else f"{self.capacidad} cupos"
+        return f"{self.get_dia_semana_display()} {self.hora_desde:02d}:00-{self.hora_hasta:02d}:00 ({estado})"
+
+    def clean(self):
+        super().clean()
+        if self.hora_desde is not None and self.hora_hasta is not None:
+            if not (0 <= self.hora_desde < self.hora_hasta <= 24):
+                raise ValidationError('El rango debe cumplir 0 <= hora_desde < hora_hasta <= 24.')
+
+
+class FranjaHoraria(models.Model):
+    """
+    Franja de 1 hora: una sola fila por hora con su capacidad y
+    contadores de ocupación. Cada reserva de un socio es un Turno
+    que apunta a su franja.
+    """
+    hora_inicio = models.DateTimeField(unique=True)
+    capacidad = models.PositiveSmallIntegerField(default=CAPACIDAD_POR_HORA)
+    reservados = models.PositiveSmallIntegerField(default=0)
+    confirmados = models.PositiveSmallIntegerField(default=0)
+    bloqueada = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Franja horaria"
+        verbose_name_plural = "Franjas horarias"
+        ordering = ['hora_inicio']
+
+    def __str__(self):
+        return (
+            f"Franja {timezone.localtime(self.hora_inicio).strftime('%Y-%m-%d %H:%M')} "
+            f"({self.cupos_disponibles}/{self.capacidad})"
+        )
+
+    @property
+    def hora_fin(self):
+        return self.hora_inicio + timedelta(hours=1)
+
+    @staticmethod
+    def calcular_disponibles(capacidad, reservados, confirmados, bloqueada):
+        """Cupos libres a partir de los contadores (0 si está bloqueada)"""
+        if bloqueada:
+            return 0
+        return max(capacidad - reservados - confirmados, 0)
+
+    @property
+    def cupos_disponibles(self):
+        """Cupos libres de la franja (0 si está bloqueada)"""
+        return self.calcular_disponibles(self.capacidad, self.reservados, self.confirmados, self.bloqueada)
+
+    def reclamar_cupo(self):
+        """
+        Suma una reserva confirmada con un UPDATE condicional: la base bloquea
+        la fila y solo suma si todavía hay lugar, así dos reservas simultáneas
+        no pueden sobrevender la hora. Retorna False si no quedaba cupo.
+        """
+        return bool(FranjaHoraria.objects.filter(
+            pk=self.pk,
+            bloqueada=False,
+            capacidad__gt=F('reservados') + F('confirmados')
+        ).update(confirmados=F('confirmados') + 1))
+
+    def clean(self):
+        super().clean()
+        if self.hora_inicio:
+            validar_horario(self.hora_inicio)
+
+    def recalcular_contadores(self):
+        """Recalcula los contadores a partir de las reservas de la franja"""
+        conteo = self.turnos.aggregate(
+            reservados=models.Count('id', filter=Q(estado='RESERVADO')),
+            confirmados=models.Count('id', filter=Q(estado__in=['CONFIRMADO', *ESTADOS_CERRADOS])),
+        )
+        self.reservados = conteo['reservados']
+        self.confirmados = conteo['confirmados']
+        self.save(update_fields=['reservados', 'confirmados'])
+
+
 class Turno(models.Model):
+    """Reserva de un socio dentro de una franja horaria"""
+    franja = models.ForeignKey(
+        FranjaHoraria,
+        on_delete=models.CASCADE,
+        related_name='turnos'
+    )
     socio = models.ForeignKey(
         User, 
         on_delete=models.SET_NULL, 
@@ -33,6 +194,7 @@ class Turno(models.Model):
         default='DISPONIBLE'
     )
     fecha_reserva = models.DateTimeField(null=True, blank=True)
+    ingreso = models.DateTimeField(null=True, blank=True, help_text="Check-in en el kiosco de la entrada")
 
     class Meta:
         verbose_name = "Turno/Cupo de 1 hora"
@@ -40,8 +202,16 @@ class Turno(models.Model):
         ordering = ['hora_inicio']
         indexes = [
             models.Index(fields=['hora_inicio', 'estado']),
+            # Chequeo de solapamiento y turnos de un socio
+            models.Index(fields=['socio', 'estado', 'hora_inicio']),
+            # mis_turnos paginado (próximos / pasados)
+            models.Index(fields=['socio', 'hora_inicio']),
         ]
-        
+        constraints = [
+            # Un socio no puede ocupar dos cupos de la misma franja (ni con dos requests simultáneos)
+            models.UniqueConstraint(fields=['franja', 'socio'], name='turno_unico_por_franja_y_socio'),
+        ]
+
     def __str__(self):
         socio_nombre = self.socio.username if self.socio else "Cupo Libre"
         return f"Cupo {self.hora_inicio.strftime('%Y-%m-%d %H:%M')} - {socio_nombre}"
@@ -51,6 +221,20 @@ class Turno(models.Model):
         """Propiedad calculada: 1 hora después de la hora de inicio."""
         return self.hora_inicio + timedelta(hours=1)
     
+    @staticmethod
+    def calcular_estado(estado, hora_inicio, ahora):
+        """
+        Estado visible de una reserva: si ya empezó se considera finalizada
+        aunque el proceso batch todavía no la haya marcado.
+        """
+        if estado in ['RESERVADO', 'CONFIRMADO'] and hora_inicio < ahora:
+            return 'FINALIZADO'
+        return estado
+
+    @property
+    def estado_efectivo(self):
+        return self.calcular_estado(self.estado, self.hora_inicio, timezone.now())
+
     @property
     def puede_cancelar(self):
         """Verifica si el turno puede ser cancelado (más de 1 hora antes)"""
@@ -61,69 +245,434 @@ class Turno(models.Model):
     def clean(self):
         super().clean()
         
-        # ✅ Convertir a hora local antes de validar
-        hora_local = timezone.localtime(self.hora_inicio)
-        
-        # Validar que no sea domingo
-        if hora_local.weekday() == 6:
-            raise ValidationError({
-                'hora_inicio': 'No se pueden crear turnos los domingos.'
-            })
-        
-        # Usar hora_local para todas las validaciones
-        hora_int = hora_local.hour
-        minuto_int = hora_local.minute
-        es_sabado = hora_local.weekday() == 5
-        
-        # Validar que sea hora en punto
-        if minuto_int != 0:
-            raise ValidationError({
-                'hora_inicio': 'La hora de inicio debe ser una hora en punto (ej: 08:00, 09:00, etc.).'
-            })
+        validar_horario(self.hora_inicio)
         
-        # Validar horarios según el día
-        if es_sabado:
-            # Sábados: 8-12 y 17-22
-            if not ((8 <= hora_int <= 12) or (17 <= hora_int <= 22)):
-                raise ValidationError({
-                    'hora_inicio': 'Los sábados los turnos son de 08:00 a 12:00 y de 17:00 a 22:00.'
-                })
-        else:
-            # Lunes a viernes: 8-22
-            if not (8 <= hora_int <= 22):
-                raise ValidationError({
-                    'hora_inicio': 'Los turnos solo pueden ser entre las 08:00 y las 22:00.'
-                })
-        
-        # ✅ CORREGIDO: Normalizar y validar solapamiento
-        if self.socio and self.estado in ['RESERVADO', 'CONFIRMADO']:
+        # ✅ Solapamiento: una sola consulta por rango (índice socio, estado, hora_inicio)
+        if self.socio_id and self.estado in ESTADOS_ACTIVOS:
             # Normalizar a minutos (ignorar segundos/microsegundos)
             nuevo_inicio = self.hora_inicio.replace(second=0, microsecond=0)
-            nuevo_fin = nuevo_inicio + timedelta(hours=1)
             
-            # Buscar turnos del mismo socio que se solapen
+            # Dos turnos de 1 hora se solapan si empiezan a menos de 1 hora de distancia
             solapados = Turno.objects.filter(
-                socio=self.socio,
-                estado__in=['RESERVADO', 'CONFIRMADO']
+                socio_id=self.socio_id,
+                estado__in=ESTADOS_ACTIVOS,
+                hora_inicio__gt=nuevo_inicio - timedelta(hours=1),
+                hora_inicio__lt=nuevo_inicio + timedelta(hours=1)
             )
-            
             if self.pk:
                 solapados = solapados.exclude(pk=self.pk)
             
-            # Verificar manualmente cada turno
-            for turno_existente in solapados:
-                # Normalizar turno existente también
-                existente_inicio = turno_existente.hora_inicio.replace(second=0, microsecond=0)
-                existente_fin = existente_inicio + timedelta(hours=1)
-                
-                # Hay solapamiento SI:
-                # El nuevo empieza antes de que termine el existente Y
-                # El nuevo termina después de que empiece el existente
-                if nuevo_inicio < existente_fin and nuevo_fin > existente_inicio:
-                    raise ValidationError({
-                        'socio': 'Ya tienes un turno confirmado o reservado que se solapa con este horario.'
-                    })
+            if solapados.exists():
+                raise ValidationError({
+                    'socio': 'Ya tienes un turno confirmado o reservado que se solapa con este horario.'
+                })
         
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+    def save(self, *args, validar=True, **kwargs):
+        """
+        Valida con full_clean() antes de guardar. Los procesos masivos o del
+        sistema que ya garantizan horario y solapamiento (o usan update /
+        bulk_create) pueden pasar validar=False para evitar las consultas.
+        """
+        if validar:
+            self.full_clean()
+        super().save(*args, **kwargs)
+
+    def liberar(self):
+        """
+        Elimina la reserva y devuelve el cupo a su franja. Retorna False si
+        otro request ya la había liberado (el contador no se toca dos veces)
+        """
+        campo = CONTADOR_POR_ESTADO.get(self.estado)
+        with transaction.atomic():
+            _, borrados = Turno.objects.filter(pk=self.pk).delete()
+            if not borrados.get(Turno._meta.label):
+                return False
+            if campo:
+                FranjaHoraria.objects.filter(pk=self.franja_id).update(**{campo: F(campo) - 1})
+            if self.socio_id and self.estado in ESTADOS_ACTIVOS:
+                UsoPlan.liberar([(self.socio_id, self.hora_inicio)])
+        return True
+
+
+class TurnoHistorico(models.Model):
+    """
+    Turno cerrado pasado a la tabla fría (ver archivo.py). Conserva el id
+    del Turno original, así archivar un lote dos veces no duplica filas.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    socio = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='turnos_historicos'
+    )
+    hora_inicio = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES)
+
+    class Meta:
+        verbose_name = "Turno archivado"
+        verbose_name_plural = "Turnos archivados"
+        ordering = ['hora_inicio']
+        indexes = [
+            # historial_dia
+            models.Index(fields=['hora_inicio']),
+            # Asistencias de un socio
+            models.Index(fields=['socio', 'hora_inicio']),
+        ]
+
+    def __str__(self):
+        return f"{self.socio_id} {timezone.localtime(self.hora_inicio):%Y-%m-%d %H:%M} {self.estado}"
+
+
+class ProgresoTarea(models.Model):
+    """Punto de avance de un proceso batch (hasta qué hora procesó y cuántas filas)"""
+    nombre = models.CharField(max_length=50, unique=True)
+    marca = models.DateTimeField(null=True, blank=True)
+    procesados = models.PositiveIntegerField(default=0)
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Progreso de tarea"
+        verbose_name_plural = "Progreso de tareas"
+
+    def __str__(self):
+        return f"{self.nombre} - {self.procesados} procesados"
+
+    @classmethod
+    def obtener(cls, nombre):
+        progreso, _ = cls.objects.get_or_create(nombre=nombre)
+        return progreso
+
+    def registrar(self, marca, procesados):
+        """Guarda el avance de un lote"""
+        if marca is not None:
+            self.marca = marca
+        self.procesados += procesados
+        self.ultima_ejecucion = timezone.now()
+        self.save(update_fields=['marca', 'procesados', 'ultima_ejecucion'])
+
+
+class VersionDia(models.Model):
+    """
+    Versión de los turnos de un día. Se incrementa cada vez que cambia una
+    franja o una reserva de ese día y se usa para armar el ETag de los
+    listados sin tener que recalcularlos.
+    """
+    fecha = models.DateField(unique=True)
+    version = models.PositiveIntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Versión de día"
+        verbose_name_plural = "Versiones de días"
+
+    def __str__(self):
+        return f"{self.fecha} v{self.version}"
+
+
+class UsoPlan(models.Model):
+    """
+    Reservas activas (RESERVADO/CONFIRMADO) de un socio en una semana y en
+    un día. Se actualiza en la misma transacción que la reserva, así el
+    límite del plan se controla con un UPDATE condicional sobre una fila en
+    lugar de contar turnos. Se reconstruye con `manage.py reconciliar_uso_planes`.
+    """
+    PERIODO_CHOICES = [
+        ('semana', 'Semana'),
+        ('dia', 'Día'),
+    ]
+
+    socio = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uso_plan')
+    periodo = models.CharField(max_length=10, choices=PERIODO_CHOICES)
+    inicio = models.DateField(help_text="Lunes de la semana o fecha del día")
+    usados = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Uso del plan"
+        verbose_name_plural = "Uso de los planes"
+        constraints = [
+            models.UniqueConstraint(fields=['socio', 'periodo', 'inicio'], name='uso_plan_unico_por_periodo'),
+        ]
+
+    def __str__(self):
+        return f"{self.socio_id} {self.periodo} {self.inicio}: {self.usados}"
+
+    @staticmethod
+    def limites_de_plan(plan):
+        """{periodo: cantidad} que controla el plan ({} = pase libre)"""
+        if plan.tipo_limite == 'semanal':
+            return {'semana': plan.cantidad_limite}
+        if plan.tipo_limite == 'diario':
+            return {'dia': plan.cantidad_limite}
+        return {}
+
+    @staticmethod
+    def periodos(hora_inicio):
+        """{periodo: inicio} de la semana y el día (hora local) de una reserva"""
+        fecha = timezone.localtime(hora_inicio).date()
+        return {
+            'semana': fecha - timedelta(days=fecha.weekday()),
+            'dia': fecha,
+        }
+
+    @classmethod
+    def ocupar(cls, socio_id, hora_inicio, limites=None):
+        """
+        Suma una reserva al uso del socio. `limites` es {periodo: cantidad}:
+        en esos periodos solo se suma si todavía no se llegó a la cantidad
+        (la base bloquea la fila, dos reservas simultáneas no pasan las dos).
+        Retorna el periodo cuyo límite se alcanzó, o None. Debe llamarse
+        dentro de transaction.atomic() para revertir lo ya sumado.
+        """
+        limites = limites or {}
+        periodos = cls.periodos(hora_inicio)
+        cls.objects.bulk_create(
+            [cls(socio_id=socio_id, periodo=periodo, inicio=inicio) for periodo, inicio in periodos.items()],
+            ignore_conflicts=True
+        )
+
+        for periodo, inicio in periodos.items():
+            filas = cls.objects.filter(socio_id=socio_id, periodo=periodo, inicio=inicio)
+            if limites.get(periodo) is not None:
+                filas = filas.filter(usados__lt=limites[periodo])
+            if not filas.update(usados=F('usados') + 1):
+                return periodo
+        return None
+
+    @classmethod
+    def bloquear(cls, socio_id, horas):
+        """
+        Crea (si faltan) y bloquea hasta el fin de la transacción las filas de
+        uso de las semanas y días de varias horas. Retorna {(periodo, inicio): usados}
+        """
+        return {
+            (periodo, inicio): usados
+            for (_, periodo, inicio), usados in cls.bloquear_varios([(socio_id, hora) for hora in horas]).items()
+        }
+
+    @classmethod
+    def bloquear_varios(cls, reservas):
+        """
+        Como `bloquear` para reservas [(socio_id, hora_inicio)] de varios
+        socios, con dos consultas. Retorna {(socio_id, periodo, inicio): usados}
+        """
+        claves = {
+            (socio_id, periodo, inicio)
+            for socio_id, hora in reservas
+            for periodo, inicio in cls.periodos(hora).items()
+        }
+        if not claves:
+            return {}
+        cls.objects.bulk_create(
+            [cls(socio_id=socio_id, periodo=periodo, inicio=inicio) for socio_id, periodo, inicio in claves],
+            ignore_conflicts=True
+        )
+        filtro = Q()
+        for socio_id, periodo, inicio in claves:
+            filtro |= Q(socio_id=socio_id, periodo=periodo, inicio=inicio)
+        return {
+            (socio_id, periodo, inicio): usados
+            for socio_id, periodo, inicio, usados in cls.objects.select_for_update().filter(
+                filtro
+            ).values_list('socio_id', 'periodo', 'inicio', 'usados')
+        }
+
+    @classmethod
+    def sumar(cls, socio_id, cantidades, limites=None):
+        """
+        Suma varias reservas de una vez: {(periodo, inicio): cantidad}, un UPDATE
+        condicional por fila. Retorna False si alguna fila pasaría su límite
+        (la transacción debe revertirse: las filas anteriores ya se sumaron).
+        """
+        limites = limites or {}
+        for (periodo, inicio), cantidad in cantidades.items():
+            filas = cls.objects.filter(socio_id=socio_id, periodo=periodo, inicio=inicio)
+            if limites.get(periodo) is not None:
+                filas = filas.filter(usados__lte=limites[periodo] - cantidad)
+            if not filas.update(usados=F('usados') + cantidad):
+                return False
+        return True
+
+    @classmethod
+    def liberar(cls, reservas):
+        """
+        Resta reservas [(socio_id, hora_inicio)] del uso de sus socios.
+        Hace un UPDATE por cada cantidad distinta a restar.
+        """
+        cantidades = Counter()
+        for socio_id, hora_inicio in reservas:
+            if socio_id:
+                for periodo, inicio in cls.periodos(hora_inicio).items():
+                    cantidades[(socio_id, periodo, inicio)] += 1
+
+        claves_por_cantidad = defaultdict(list)
+        for clave, cantidad in cantidades.items():
+            claves_por_cantidad[cantidad].append(clave)
+
+        for cantidad, claves in claves_por_cantidad.items():
+            filtro = Q()
+            for socio_id, periodo, inicio in claves:
+                filtro |= Q(socio_id=socio_id, periodo=periodo, inicio=inicio)
+            cls.objects.filter(filtro, usados__gte=cantidad).update(usados=F('usados') - cantidad)
+
+    @classmethod
+    def calcular(cls, socio_ids=None):
+        """
+        Uso real a partir de las reservas activas, en una sola consulta
+        agrupada: {(socio_id, periodo, inicio): usados}
+        """
+        reservas = Turno.objects.filter(socio__isnull=False, estado__in=ESTADOS_ACTIVOS)
+        if socio_ids is not None:
+            reservas = reservas.filter(socio_id__in=socio_ids)
+
+        uso = Counter()
+        for socio_id, hora_inicio, cantidad in (
+            reservas.values('socio_id', 'hora_inicio')
+            .annotate(cantidad=models.Count('id'))
+            .values_list('socio_id', 'hora_inicio', 'cantidad')
+            .order_by()
+        ):
+            for periodo, inicio in cls.periodos(hora_inicio).items():
+                uso[(socio_id, periodo, inicio)] += cantidad
+        return uso
+
+
+class AsistenciaSocio(models.Model):
+    """
+    Asistencias y ausencias (turnos reservados sin check-in) de un socio,
+    para aplicar políticas de no-show. Las suma `manage.py marcar_asistencias`
+    al cerrar cada día.
+    """
+    socio = models.OneToOneField(User, on_delete=models.CASCADE, related_name='asistencia')
+    asistencias = models.PositiveIntegerField(default=0)
+    ausencias = models.PositiveIntegerField(default=0)
+    ultima_ausencia = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Asistencia de socio"
+        verbose_name_plural = "Asistencia de socios"
+
+    def __str__(self):
+        return f"{self.socio_id}: {self.asistencias} asistencias, {self.ausencias} ausencias"
+
+    @classmethod
+    def sumar(cls, conteos):
+        """
+        Suma [{socio_id, asistencias, ausencias, ultima_ausencia}] a los
+        contadores: un INSERT de las filas que faltan y un solo UPDATE.
+        """
+        if not conteos:
+            return
+        cls.objects.bulk_create([cls(socio_id=fila['socio_id']) for fila in conteos], ignore_conflicts=True)
+
+        asistencias = []
+        ausencias = []
+        ultima_ausencia = []
+        for fila in conteos:
+            asistencias.append(models.When(socio_id=fila['socio_id'], then=F('asistencias') + fila['asistencias']))
+            ausencias.append(models.When(socio_id=fila['socio_id'], then=F('ausencias') + fila['ausencias']))
+            if fila['ultima_ausencia']:
+                ultima_ausencia.append(models.When(socio_id=fila['socio_id'], then=models.Value(fila['ultima_ausencia'])))
+
+        cambios = {
+            'asistencias': models.Case(*asistencias, default=F('asistencias'), output_field=models.PositiveIntegerField()),
+            'ausencias': models.Case(*ausencias, default=F('ausencias'), output_field=models.PositiveIntegerField()),
+        }
+        if ultima_ausencia:
+            cambios['ultima_ausencia'] = models.Case(*ultima_ausencia, default=F('ultima_ausencia'))
+        cls.objects.filter(socio_id__in=[fila['socio_id'] for fila in conteos]).update(**cambios)
+
+
+class OcupacionHora(models.Model):
+    """
+    Ocupación de una hora de un día (hora local), precalculada para las
+    estadísticas: `manage.py actualizar_ocupacion` recalcula los días que
+    cambiaron (ver ocupacion.py). Las horas bloqueadas tienen capacidad 0.
+    """
+    fecha = models.DateField()
+    hora = models.PositiveSmallIntegerField()
+    capacidad = models.PositiveSmallIntegerField(default=0)
+    reservados = models.PositiveSmallIntegerField(default=0)
+    confirmados = models.PositiveSmallIntegerField(default=0)
+    asistieron = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Ocupación por hora"
+        verbose_name_plural = "Ocupación por hora"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'hora'], name='ocupacion_unica_por_hora'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.hora:02d}:00 {self.reservados + self.confirmados}/{self.capacidad}"
+
+
+class ListaEspera(models.Model):
+    """
+    Socio anotado para una hora completa. Cuando se libera un cupo se
+    promueve al primero de la lista (ver lista_espera.py).
+    """
+    franja = models.ForeignKey(FranjaHoraria, on_delete=models.CASCADE, related_name='lista_espera')
+    socio = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listas_espera')
+    creado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Lista de espera"
+        verbose_name_plural = "Listas de espera"
+        ordering = ['creado', 'id']
+        indexes = [
+            models.Index(fields=['franja', 'creado']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['franja', 'socio'], name='lista_espera_unica_por_franja_y_socio'),
+        ]
+
+    def __str__(self):
+        return f"{self.socio_id} espera {timezone.localtime(self.franja.hora_inicio):%Y-%m-%d %H:%M}"
+
+    def posicion(self):
+        """Lugar en la lista (1 = el próximo en ser promovido)"""
+        return ListaEspera.objects.filter(
+            Q(creado__lt=self.creado) | Q(creado=self.creado, id__lt=self.id),
+            franja_id=self.franja_id
+        ).count() + 1
+
+    @staticmethod
+    def con_posicion(entradas):
+        """
+        Anota `posicion_actual` en cada entrada con una subconsulta correlacionada,
+        así listar varias entradas no hace un COUNT por cada una
+        """
+        anteriores = ListaEspera.objects.filter(
+            Q(creado__lt=OuterRef('creado')) | Q(creado=OuterRef('creado'), id__lt=OuterRef('id')),
+            franja_id=OuterRef('franja_id')
+        ).order_by().values('franja_id').annotate(cantidad=models.Count('id')).values('cantidad')
+        return entradas.annotate(
+            posicion_actual=Coalesce(Subquery(anteriores), 0) + 1
+        )
+
+
+class EventoListaEspera(models.Model):
+    """Altas, bajas y promociones de la lista de espera, para avisarle al socio"""
+    TIPO_CHOICES = [
+        ('alta', 'Se anotó'),
+        ('baja', 'Salió de la lista'),
+        ('promovido', 'Obtuvo el turno'),
+        ('descartado', 'Quitado de la lista'),
+    ]
+
+    socio = models.ForeignKey(User, on_delete=models.CASCADE, related_name='eventos_lista_espera')
+    hora_inicio = models.DateTimeField()
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    detalle = models.CharField(max_length=255, blank=True)
+    turno = models.ForeignKey(Turno, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    creado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Evento de lista de espera"
+        verbose_name_plural = "Eventos de lista de espera"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.socio_id} {self.tipo} {timezone.localtime(self.hora_inicio):%Y-%m-%d %H:%M}"
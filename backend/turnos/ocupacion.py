@@ -0,0 +1,236 @@
+# turnos/ocupacion.py
+"""
+Estadísticas de ocupación por día de la semana y hora.
+
+OcupacionHora guarda una fila por hora de cada día con la capacidad, las
+reservas y las asistencias. `manage.py actualizar_ocupacion` recalcula solo
+los días cuya VersionDia cambió desde la corrida anterior (reservas,
+cancelaciones, finalización, asistencias) leyendo los contadores de las
+franjas y los turnos con asistencia (también los archivados).
+
+Las franjas pasadas se borran al archivar sus turnos: en los días pasados
+se conserva la fila de las horas que ya no tienen franja.
+
+`resumen_ocupacion` arma el mapa de calor y la tendencia semanal de un rango
+a partir de esa tabla. Si NumPy está instalado las sumas se hacen
+vectorizadas; si no, con un recorrido en Python (mismo resultado).
+"""
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import FranjaHoraria, OcupacionHora, ProgresoTarea, Turno, TurnoHistorico, VersionDia
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+NOMBRE_TAREA = 'actualizar_ocupacion'
+# Días que se recalculan por consulta
+DIAS_POR_LOTE = 31
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+# 🔹 Actualización de la tabla
+
+def _inicio_del_dia(fecha, tz):
+    return timezone.make_aware(datetime.combine(fecha, time.min), tz)
+
+
+def _recalcular_lote(fechas, hoy):
+    """Recalcula las horas de unas fechas con un número fijo de consultas"""
+    tz = timezone.get_current_timezone()
+    desde = _inicio_del_dia(fechas[0], tz)
+    hasta = _inicio_del_dia(fechas[-1] + timedelta(days=1), tz)
+    incluidas = set(fechas)
+
+    def clave(hora_inicio):
+        local = timezone.localtime(hora_inicio, tz)
+        return (local.date(), local.hour)
+
+    franjas = {}
+    for hora_inicio, capacidad, reservados, confirmados, bloqueada in FranjaHoraria.objects.filter(
+        hora_inicio__gte=desde, hora_inicio__lt=hasta
+    ).values_list('hora_inicio', 'capacidad', 'reservados', 'confirmados', 'bloqueada'):
+        franjas[clave(hora_inicio)] = (0 if bloqueada else capacidad, reservados, confirmados)
+
+    asistieron = Counter()
+    for modelo in (Turno, TurnoHistorico):
+        for hora_inicio, cantidad in (
+            modelo.objects.filter(estado='ASISTIO', hora_inicio__gte=desde, hora_inicio__lt=hasta)
+            .values('hora_inicio').annotate(cantidad=Count('id'))
+            .values_list('hora_inicio', 'cantidad').order_by()
+        ):
+            asistieron[clave(hora_inicio)] += cantidad
+
+    existentes = {(fila.fecha, fila.hora): fila for fila in OcupacionHora.objects.filter(fecha__in=fechas)}
+
+    nuevas, modificadas, sobrantes = [], [], []
+    for (fecha, hora), (capacidad, reservados, confirmados) in franjas.items():
+        if fecha not in incluidas:
+            continue
+        valores = {
+            'capacidad': capacidad,
+            'reservados': reservados,
+            'confirmados': confirmados,
+            'asistieron': asistieron[(fecha, hora)],
+        }
+        fila = existentes.pop((fecha, hora), None)
+        if fila is None:
+            nuevas.append(OcupacionHora(fecha=fecha, hora=hora, **valores))
+        elif any(getattr(fila, campo) != valor for campo, valor in valores.items()):
+            for campo, valor in valores.items():
+                setattr(fila, campo, valor)
+            modificadas.append(fila)
+
+    # Horas sin franja: en días pasados la franja se borró al archivar (se
+    # conserva la fila), en hoy o días futuros la franja se eliminó
+    for (fecha, hora), fila in existentes.items():
+        if fecha >= hoy:
+            sobrantes.append(fila.pk)
+        elif fila.asistieron != asistieron[(fecha, hora)]:
+            fila.asistieron = asistieron[(fecha, hora)]
+            modificadas.append(fila)
+
+    OcupacionHora.objects.bulk_create(nuevas, batch_size=1000)
+    OcupacionHora.objects.bulk_update(
+        modificadas, ['capacidad', 'reservados', 'confirmados', 'asistieron'], batch_size=1000
+    )
+    OcupacionHora.objects.filter(pk__in=sobrantes).delete()
+    return len(nuevas) + len(modificadas) + len(sobrantes)
+
+
+def recalcular_dias(fechas):
+    """Recalcula la ocupación de las fechas dadas. Retorna las filas cambiadas"""
+    fechas = sorted(set(fechas))
+    hoy = timezone.localdate()
+    return sum(
+        _recalcular_lote(fechas[i:i + DIAS_POR_LOTE], hoy)
+        for i in range(0, len(fechas), DIAS_POR_LOTE)
+    )
+
+
+def actualizar_ocupacion(completo=False):
+    """
+    Recalcula los días modificados desde la corrida anterior (o todos con
+    completo=True). Retorna (días recalculados, filas cambiadas).
+    """
+    progreso = ProgresoTarea.obtener(NOMBRE_TAREA)
+    # Lo que cambie mientras corre entra en la próxima corrida
+    inicio = timezone.now()
+
+    if completo or not progreso.marca:
+        horas = set(FranjaHoraria.objects.values_list('hora_inicio', flat=True))
+        horas |= set(TurnoHistorico.objects.filter(estado='ASISTIO').values_list('hora_inicio', flat=True).distinct())
+        fechas = {timezone.localtime(hora).date() for hora in horas}
+    else:
+        fechas = set(VersionDia.objects.filter(actualizado__gte=progreso.marca).values_list('fecha', flat=True))
+
+    cambiadas = recalcular_dias(fechas) if fechas else 0
+    progreso.registrar(inicio, cambiadas)
+    return len(fechas), cambiadas
+
+
+# 🔹 Resumen para el endpoint
+
+def _acumular_numpy(filas):
+    datos = np.array(filas, dtype=np.int64).reshape(-1, 6)
+    ordinal, hora, capacidad, ocupados, asistieron = (
+        datos[:, 0], datos[:, 1], datos[:, 2], datos[:, 3] + datos[:, 4], datos[:, 5]
+    )
+    # date(1, 1, 1) fue lunes: el día de la semana sale del ordinal
+    dia_semana = (ordinal - 1) % 7
+    celda = (dia_semana, hora)
+
+    mapa = {}
+    for nombre, valores in (('capacidad', capacidad), ('ocupados', ocupados),
+                            ('asistieron', asistieron), ('dias', (capacidad > 0).astype(np.int64))):
+        matriz = np.zeros((7, 24), dtype=np.int64)
+        np.add.at(matriz, celda, valores)
+        mapa[nombre] = matriz.tolist()
+
+    semanas, indice = np.unique(ordinal - dia_semana, return_inverse=True)
+    tendencia = {
+        int(semana): [int(total) for total in totales]
+        for semana, *totales in zip(
+            semanas,
+            np.bincount(indice, weights=capacidad, minlength=len(semanas)),
+            np.bincount(indice, weights=ocupados, minlength=len(semanas)),
+            np.bincount(indice, weights=asistieron, minlength=len(semanas)),
+        )
+    }
+    return mapa, tendencia
+
+
+def _acumular_python(filas):
+    mapa = {nombre: [[0] * 24 for _ in range(7)] for nombre in ('capacidad', 'ocupados', 'asistieron', 'dias')}
+    tendencia = {}
+    for ordinal, hora, capacidad, reservados, confirmados, asistieron in filas:
+        dia_semana = (ordinal - 1) % 7
+        ocupados = reservados + confirmados
+        mapa['capacidad'][dia_semana][hora] += capacidad
+        mapa['ocupados'][dia_semana][hora] += ocupados
+        mapa['asistieron'][dia_semana][hora] += asistieron
+        mapa['dias'][dia_semana][hora] += 1 if capacidad > 0 else 0
+        totales = tendencia.setdefault(ordinal - dia_semana, [0, 0, 0])
+        totales[0] += capacidad
+        totales[1] += ocupados
+        totales[2] += asistieron
+    return mapa, dict(sorted(tendencia.items()))
+
+
+def _porcentaje(parte, total):
+    return round(parte * 100 / total, 1) if total else None
+
+
+def resumen_ocupacion(desde, hasta):
+    """
+    Mapa de calor (día de la semana x hora) y tendencia semanal entre dos
+    fechas, leyendo solo OcupacionHora (una consulta).
+    """
+    filas = [
+        (fecha.toordinal(), hora, capacidad, reservados, confirmados, asistieron)
+        for fecha, hora, capacidad, reservados, confirmados, asistieron in OcupacionHora.objects.filter(
+            fecha__gte=desde, fecha__lte=hasta
+        ).values_list('fecha', 'hora', 'capacidad', 'reservados', 'confirmados', 'asistieron').order_by()
+    ]
+
+    acumular = _acumular_numpy if np is not None and filas else _acumular_python
+    mapa, tendencia = acumular(filas)
+
+    # Solo las horas en las que hubo capacidad algún día
+    horas = [hora for hora in range(24) if any(mapa['capacidad'][dia][hora] for dia in range(7))]
+
+    def matriz(calcular):
+        return [[calcular(dia, hora) for hora in horas] for dia in range(7)]
+
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'dias': DIAS_SEMANA,
+        'horas': horas,
+        'mapa_calor': {
+            # % de la capacidad ocupada por reservas
+            'ocupacion': matriz(lambda d, h: _porcentaje(mapa['ocupados'][d][h], mapa['capacidad'][d][h])),
+            # % de la capacidad con check-in
+            'asistencia': matriz(lambda d, h: _porcentaje(mapa['asistieron'][d][h], mapa['capacidad'][d][h])),
+            # Reservas promedio por día abierto
+            'promedio_reservas': matriz(
+                lambda d, h: round(mapa['ocupados'][d][h] / mapa['dias'][d][h], 1) if mapa['dias'][d][h] else None
+            ),
+        },
+        'tendencia': [
+            {
+                'semana': date.fromordinal(semana).isoformat(),
+                'capacidad': capacidad,
+                'ocupados': ocupados,
+                'asistieron': asistieron,
+                'ocupacion': _porcentaje(ocupados, capacidad),
+                'asistencia': _porcentaje(asistieron, capacidad),
+            }
+            for semana, (capacidad, ocupados, asistieron) in tendencia.items()
+        ],
+    }
@@ -14,11 +14,13 @@ class UserSerializer(serializers.ModelSerializer):
 class TurnoSerializer(serializers.ModelSerializer):
     """Serializador usado por los Socios."""
     socio_info = UserSerializer(source='socio', read_only=True)
+    estado = serializers.CharField(source='estado_efectivo', read_only=True)
     
     class Meta:
         model = Turno
         fields = (
             'id', 
+            'franja',
             'hora_inicio', 
             'hora_fin', 
             'estado', 
@@ -26,7 +28,7 @@ class TurnoSerializer(serializers.ModelSerializer):
             'socio_info',
             'fecha_reserva',
         )
-        read_only_fields = ('socio', 'estado', 'socio_info', 'fecha_reserva') 
+        read_only_fields = ('franja', 'socio', 'estado', 'socio_info', 'fecha_reserva') 
         
     def get_hora_fin(self, obj):
         # Asegura que la hora_fin calculada se incluya en la respuesta serializada
@@ -42,6 +44,7 @@ class TurnoStaffSerializer(serializers.ModelSerializer):
         model = Turno
         fields = (
             'id', 
+            'franja',
             'hora_inicio', 
             'hora_fin', 
             'estado', 
@@ -49,4 +52,4 @@ class TurnoStaffSerializer(serializers.ModelSerializer):
             'socio_info',
             'fecha_reserva',
         )
-        read_only_fields = ('socio_info', 'hora_fin')
\ No newline at end of file
+        read_only_fields = ('franja', 'socio_info', 'hora_fin')
\ No newline at end of file
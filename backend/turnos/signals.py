@@ -0,0 +1,55 @@
+# turnos/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import HorarioPlantilla, FranjaHoraria, Turno
+from .horarios import invalidar_plantilla
+from .versiones import marcar_cambio, incrementar_versiones
+from .eventos import registrar_turno, registrar_franja, registrar_recarga, publicar_recarga_general
+from .lista_espera import avisar_cupo_liberado
+
+
+@receiver([post_save, post_delete], sender=HorarioPlantilla)
+def invalidar_plantilla_horarios(sender, **kwargs):
+    """Descartar la plantilla compilada cuando cambia un horario"""
+    invalidar_plantilla()
+    # La plantilla decide qué horas se muestran bloqueadas en todos los días
+    transaction.on_commit(incrementar_versiones)
+    publicar_recarga_general()
+
+
+@receiver([post_save, post_delete], sender=FranjaHoraria)
+@receiver([post_save, post_delete], sender=Turno)
+def versionar_dia(sender, instance, **kwargs):
+    """Nueva versión del día de la franja o reserva modificada"""
+    marcar_cambio(instance.hora_inicio)
+
+
+@receiver([post_save, post_delete], sender=Turno)
+def publicar_turno(sender, instance, **kwargs):
+    registrar_turno(instance)
+
+
+@receiver(post_delete, sender=Turno)
+def promover_lista_espera(sender, instance, **kwargs):
+    """Se liberó un cupo: el primero de la lista de espera puede ocuparlo"""
+    # Los turnos pasados (ej: archivados) no liberan nada
+    if instance.hora_inicio > timezone.now():
+        avisar_cupo_liberado(instance.franja_id)
+
+
+@receiver(post_save, sender=FranjaHoraria)
+def publicar_franja(sender, instance, created, **kwargs):
+    if created:
+        registrar_recarga(instance.hora_inicio)
+    else:
+        registrar_franja(instance.pk, instance.hora_inicio)
+        # Más capacidad, desbloqueo o contadores recalculados
+        avisar_cupo_liberado(instance.pk)
+
+
+@receiver(post_delete, sender=FranjaHoraria)
+def publicar_franja_borrada(sender, instance, **kwargs):
+    registrar_recarga(instance.hora_inicio)
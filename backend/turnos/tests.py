@@ -1,3 +1,1386 @@
-from django.test import TestCase
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Perfil
+from cuotas_mensuales.models import CuotaMensual, Plan
+
+from .archivo import archivar
+from .checkin import SALT, RegistroIngresos, vigencia_token
+from .generacion import generar_franjas
+from .horarios import invalidar_plantilla, obtener_plantilla
+from .lista_espera import promover_franja, promover_siguiente
+from .management.commands.finalizar_turnos import finalizar_lote
+from .models import (
+    validar_horario,
+    AsistenciaSocio, EventoListaEspera, FranjaHoraria, HorarioPlantilla, ListaEspera, OcupacionHora, ProgresoTarea,
+    Turno, TurnoHistorico, UsoPlan, VersionDia
+)
+from .ocupacion import actualizar_ocupacion, np, resumen_ocupacion
+from .versiones import marcar_cambio
+
+
+def proximo_lunes():
+    hoy = timezone.localdate()
+    return hoy + timedelta(days=7 - hoy.weekday())
+
+
+# El promotor de la lista de espera se llama a mano en los tests (sin hilo de fondo)
+@override_settings(TURNOS_LISTA_ESPERA_EN_SEGUNDO_PLANO=False)
+class TurnosTestCase(TestCase):
+    """Socio con plan 2x semanal y cuota vigente, y franjas de la semana que viene"""
+
+    def setUp(self):
+        invalidar_plantilla()
+        cache.clear()
+        self.plan = Plan.objects.create(
+            nombre='2x Semanal', precio=1, frecuencia='2', tipo_limite='semanal', cantidad_limite=2
+        )
+        self.socio = self.crear_socio('socio')
+        self.lunes = proximo_lunes()
+        self.client = APIClient()
+
+    def crear_socio(self, username, plan=None):
+        socio = User.objects.create_user(username, password='x')
+        Perfil.objects.create(user=socio, rol='socio')
+        CuotaMensual.objects.create(
+            socio=socio,
+            plan=plan or self.plan,
+            fecha_vencimiento=timezone.localdate() + timedelta(days=30)
+        )
+        return socio
+
+    def crear_staff(self, username='staff'):
+        staff = User.objects.create_user(username, password='x', is_staff=True)
+        Perfil.objects.create(user=staff, rol='admin')
+        return staff
+
+    def crear_franja(self, dia=0, hora=10, capacidad=10):
+        hora_inicio = timezone.make_aware(datetime.combine(self.lunes + timedelta(days=dia), time(hora)))
+        return FranjaHoraria.objects.create(hora_inicio=hora_inicio, capacidad=capacidad)
+
+    def reservar(self, socio, franja):
+        self.client.force_authenticate(socio)
+        return self.client.post('/api/turnos/turno/reservar/', {'franja_id': franja.pk}, format='json')
+
+    def cancelar(self, socio, turno):
+        self.client.force_authenticate(socio)
+        return self.client.post(f'/api/turnos/turno/{turno.pk}/cancelar/')
+
+
+class FranjaHorariaTests(TurnosTestCase):
+
+    def test_cupos_disponibles(self):
+        franja = FranjaHoraria(capacidad=10, reservados=2, confirmados=3)
+        self.assertEqual(franja.cupos_disponibles, 5)
+
+        franja.confirmados = 9
+        self.assertEqual(franja.cupos_disponibles, 0)
+
+        franja.confirmados = 0
+        franja.bloqueada = True
+        self.assertEqual(franja.cupos_disponibles, 0)
+
+    def test_recalcular_contadores_por_estado(self):
+        franja = self.crear_franja()
+        for i, estado in enumerate(['RESERVADO', 'CONFIRMADO', 'FINALIZADO', 'AUSENTE']):
+            Turno.objects.create(
+                franja=franja, socio=self.crear_socio(f'socio{i}'), hora_inicio=franja.hora_inicio, estado=estado
+            )
+        FranjaHoraria.objects.filter(pk=franja.pk).update(reservados=7, confirmados=7)
+        franja.refresh_from_db()
+
+        franja.recalcular_contadores()
+
+        franja.refresh_from_db()
+        self.assertEqual((franja.reservados, franja.confirmados), (1, 3))
+
+    def test_franja_fuera_del_horario_no_valida(self):
+        domingo = timezone.make_aware(datetime.combine(self.lunes + timedelta(days=6), time(10)))
+        with self.assertRaises(ValidationError):
+            FranjaHoraria(hora_inicio=domingo).full_clean()
+
+    def test_staff_reserva_y_cancela_para_un_socio(self):
+        franja = self.crear_franja(capacidad=1)
+        self.client.force_authenticate(self.crear_staff())
+
+        respuesta = self.client.post(
+            '/api/turnos/turno/reservar_para_socio/', {'franja_id': franja.pk, 'socio_id': self.socio.pk}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        turno = Turno.objects.get()
+        self.assertEqual((turno.franja, turno.socio, turno.estado), (franja, self.socio, 'CONFIRMADO'))
+        franja.refresh_from_db()
+        self.assertEqual(franja.cupos_disponibles, 0)
+
+        respuesta = self.client.post(f'/api/turnos/turno/{turno.pk}/cancelar_para_socio/')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertFalse(Turno.objects.exists())
+        franja.refresh_from_db()
+        self.assertEqual(franja.cupos_disponibles, 1)
+
+
+class FinalizarTurnosTests(TurnosTestCase):
+
+    def crear_turno(self, franja, estado='CONFIRMADO', socio=None):
+        turno = Turno.objects.create(
+            franja=franja, socio=socio or self.socio, hora_inicio=franja.hora_inicio, estado=estado
+        )
+        FranjaHoraria.objects.filter(pk=franja.pk).update(**{
+            'reservados' if estado == 'RESERVADO' else 'confirmados': 1
+        })
+        return turno
+
+    def test_finaliza_los_turnos_pasados(self):
+        # Lunes de hace dos semanas
+        franja = self.crear_franja(dia=-14)
+        self.crear_turno(franja, estado='RESERVADO')
+        futuro = self.crear_turno(self.crear_franja())
+
+        call_command('finalizar_turnos', stdout=StringIO())
+
+        self.assertEqual(Turno.objects.get(franja=franja).estado, 'FINALIZADO')
+        self.assertEqual(Turno.objects.get(pk=futuro.pk).estado, 'CONFIRMADO')
+        # El RESERVADO pasa al contador de confirmados
+        franja.refresh_from_db()
+        self.assertEqual((franja.reservados, franja.confirmados), (0, 1))
+        progreso = ProgresoTarea.objects.get(nombre='finalizar_turnos')
+        self.assertEqual((progreso.marca, progreso.procesados), (franja.hora_inicio, 1))
+
+    def test_retoma_desde_la_marca(self):
+        franjas = [self.crear_franja(hora=hora) for hora in (10, 11, 12)]
+        turnos = [self.crear_turno(franja, socio=self.crear_socio(f'socio{i}')) for i, franja in enumerate(franjas)]
+        ahora = franjas[-1].hora_inicio + timedelta(hours=1)
+
+        # Un lote y el proceso se corta
+        self.assertEqual(finalizar_lote(ProgresoTarea.obtener('finalizar_turnos'), 2, ahora), 2)
+
+        progreso = ProgresoTarea.obtener('finalizar_turnos')
+        self.assertEqual(progreso.marca, franjas[1].hora_inicio)
+        self.assertEqual(finalizar_lote(progreso, 2, ahora), 1)
+        self.assertEqual(finalizar_lote(progreso, 2, ahora), 0)
+
+        self.assertEqual(
+            list(Turno.objects.filter(pk__in=[t.pk for t in turnos]).values_list('estado', flat=True)),
+            ['FINALIZADO'] * 3
+        )
+        progreso.refresh_from_db()
+        self.assertEqual((progreso.marca, progreso.procesados), (franjas[2].hora_inicio, 3))
+
+    def test_lo_anterior_a_la_marca_no_se_vuelve_a_recorrer(self):
+        franja = self.crear_franja(hora=12)
+        self.crear_turno(franja)
+        progreso = ProgresoTarea.obtener('finalizar_turnos')
+        finalizar_lote(progreso, 10, franja.hora_inicio + timedelta(hours=1))
+
+        anterior = self.crear_turno(self.crear_franja(hora=10), socio=self.crear_socio('otro'))
+        self.assertEqual(finalizar_lote(progreso, 10, franja.hora_inicio + timedelta(hours=2)), 0)
+        self.assertEqual(Turno.objects.get(pk=anterior.pk).estado, 'CONFIRMADO')
+
+
+class GenerarFranjasTests(TurnosTestCase):
+    # Plantilla por defecto: lunes a viernes de 8 a 23 y sábados de 8 a 23 con 13 a 17 bloqueado
+    FRANJAS_POR_SEMANA = 15 * 6
+    BLOQUEADAS_POR_SEMANA = 4
+
+    def setUp(self):
+        super().setUp()
+        self.domingo = self.lunes + timedelta(days=6)
+
+    def test_genera_la_semana_segun_la_plantilla(self):
+        resumen = generar_franjas(self.lunes, self.domingo)
+
+        self.assertEqual(len(resumen['franjas_nuevas']), self.FRANJAS_POR_SEMANA)
+        self.assertEqual(resumen['bloqueadas_nuevas'], self.BLOQUEADAS_POR_SEMANA)
+        self.assertEqual(FranjaHoraria.objects.count(), self.FRANJAS_POR_SEMANA)
+        self.assertEqual(FranjaHoraria.objects.filter(bloqueada=True).count(), self.BLOQUEADAS_POR_SEMANA)
+
+    def test_es_idempotente(self):
+        generar_franjas(self.lunes, self.domingo)
+        self.reservar(self.socio, FranjaHoraria.objects.filter(bloqueada=False).first())
+
+        resumen = generar_franjas(self.lunes, self.domingo)
+
+        self.assertEqual(resumen['franjas_nuevas'], [])
+        self.assertEqual(resumen['franjas_existentes'], self.FRANJAS_POR_SEMANA)
+        self.assertEqual(FranjaHoraria.objects.count(), self.FRANJAS_POR_SEMANA)
+        self.assertEqual(Turno.objects.count(), 1)
+
+    def test_dry_run_informa_solo_las_faltantes(self):
+        generar_franjas(self.lunes, self.domingo)
+        faltantes = list(FranjaHoraria.objects.filter(hora_inicio__week_day=3).order_by('hora_inicio'))
+        FranjaHoraria.objects.filter(pk__in=[franja.pk for franja in faltantes]).delete()
+
+        resumen = generar_franjas(self.lunes, self.domingo + timedelta(weeks=1), dry_run=True)
+
+        nuevas = [franja.hora_inicio for franja in resumen['franjas_nuevas']]
+        self.assertEqual(nuevas[:len(faltantes)], [franja.hora_inicio for franja in faltantes])
+        self.assertEqual(len(nuevas), len(faltantes) + self.FRANJAS_POR_SEMANA)
+        self.assertEqual(resumen['franjas_existentes'], self.FRANJAS_POR_SEMANA - len(faltantes))
+        self.assertEqual(FranjaHoraria.objects.count(), self.FRANJAS_POR_SEMANA - len(faltantes))
+
+    def test_endpoint_de_varias_semanas(self):
+        self.client.force_authenticate(self.crear_staff())
+        datos = {'fecha_inicio': str(self.lunes + timedelta(days=2)), 'semanas': 2}
+
+        simulacion = self.client.post('/api/turnos/turno/generar_turnos_semana/', {**datos, 'dry_run': True}, format='json')
+        self.assertEqual(simulacion.status_code, 200)
+        self.assertEqual(len(simulacion.data['franjas_nuevas']), 2 * self.FRANJAS_POR_SEMANA)
+        self.assertFalse(FranjaHoraria.objects.exists())
+
+        respuesta = self.client.post('/api/turnos/turno/generar_turnos_semana/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['turnos_creados'], simulacion.data['turnos_creados'])
+        # Ajustado al lunes de la semana indicada
+        self.assertEqual(timezone.localtime(FranjaHoraria.objects.first().hora_inicio).date(), self.lunes)
+        self.assertEqual(FranjaHoraria.objects.count(), 2 * self.FRANJAS_POR_SEMANA)
+
+    def test_socio_no_puede_generar(self):
+        self.client.force_authenticate(self.socio)
+        respuesta = self.client.post(
+            '/api/turnos/turno/generar_turnos_semana/', {'fecha_inicio': str(self.lunes)}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 403)
+
+
+class HorarioPlantillaTests(TurnosTestCase):
+
+    def hora(self, dia, hora, minuto=0):
+        return timezone.make_aware(datetime.combine(self.lunes + timedelta(days=dia), time(hora, minuto)))
+
+    def assertValida(self, hora_inicio):
+        validar_horario(hora_inicio)
+
+    def assertInvalida(self, hora_inicio):
+        with self.assertRaises(ValidationError):
+            validar_horario(hora_inicio)
+
+    def reemplazar_plantilla(self, *rangos):
+        """Deja solo los rangos dados: (dia_semana, hora_desde, hora_hasta, capacidad, bloqueado)"""
+        HorarioPlantilla.objects.all().delete()
+        for dia, desde, hasta, capacidad, bloqueado in rangos:
+            HorarioPlantilla.objects.create(
+                dia_semana=dia, hora_desde=desde, hora_hasta=hasta, capacidad=capacidad, bloqueado=bloqueado
+            )
+
+    def test_plantilla_inicial(self):
+        self.assertValida(self.hora(0, 8))
+        self.assertValida(self.hora(5, 12))
+        self.assertInvalida(self.hora(0, 7))
+        self.assertInvalida(self.hora(0, 10, 30))
+        # Sábado a la siesta bloqueado y domingo cerrado
+        self.assertInvalida(self.hora(5, 14))
+        self.assertInvalida(self.hora(6, 10))
+
+    def test_tabla_vacia_usa_la_plantilla_por_defecto(self):
+        self.reemplazar_plantilla()
+
+        self.assertValida(self.hora(0, 8))
+        self.assertInvalida(self.hora(5, 14))
+        self.assertInvalida(self.hora(6, 10))
+
+    def test_bloqueo_pisa_el_rango_abierto(self):
+        self.reemplazar_plantilla((0, 8, 12, 5, False), (0, 10, 11, 5, True))
+
+        self.assertValida(self.hora(0, 9))
+        self.assertInvalida(self.hora(0, 10))
+        self.assertValida(self.hora(0, 11))
+        self.assertInvalida(self.hora(0, 12))
+        # Con filas en la tabla los días sin rangos quedan cerrados
+        self.assertInvalida(self.hora(1, 9))
+
+    def test_rangos_inactivos_no_cuentan(self):
+        self.reemplazar_plantilla((0, 8, 12, 5, False), (0, 10, 11, 5, True))
+        rango = HorarioPlantilla.objects.get(bloqueado=True)
+        rango.activo = False
+        rango.save()
+
+        self.assertValida(self.hora(0, 10))
+
+    def test_reserva_en_hora_bloqueada_rechazada(self):
+        franja = self.crear_franja(hora=10)
+        HorarioPlantilla.objects.create(dia_semana=0, hora_desde=10, hora_hasta=11, bloqueado=True)
+
+        self.assertEqual(self.reservar(self.socio, franja).status_code, 400)
+        self.assertFalse(Turno.objects.exists())
+
+    def test_generacion_usa_la_plantilla(self):
+        self.reemplazar_plantilla((0, 8, 10, 4, False), (0, 9, 10, 4, True))
+
+        generar_franjas(self.lunes, self.lunes + timedelta(days=6))
+
+        self.assertEqual(
+            list(FranjaHoraria.objects.values_list('capacidad', 'bloqueada')),
+            [(4, False), (4, True)]
+        )
+
+    def test_rango_invalido(self):
+        with self.assertRaises(ValidationError):
+            HorarioPlantilla(dia_semana=0, hora_desde=12, hora_hasta=10).full_clean()
+
+
+class SolapamientoTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.franja = self.crear_franja(hora=10)
+
+    def turno(self, hora=10, estado='CONFIRMADO', socio=None, guardar=True):
+        franja = self.franja if hora == 10 else self.crear_franja(hora=hora)
+        turno = Turno(franja=franja, socio=socio or self.socio, hora_inicio=franja.hora_inicio, estado=estado)
+        if guardar:
+            turno.save(validar=False)
+        return turno
+
+    def test_misma_hora_se_solapa(self):
+        self.turno()
+        # Otra franja de la misma hora (ej: cargada a mano)
+        nuevo = Turno(
+            franja=self.crear_franja(hora=11), socio=self.socio, hora_inicio=self.franja.hora_inicio, estado='RESERVADO'
+        )
+
+        with self.assertRaises(ValidationError) as error:
+            nuevo.full_clean()
+        self.assertIn('socio', error.exception.message_dict)
+
+    def test_horas_contiguas_no_se_solapan(self):
+        self.turno(hora=9)
+        self.turno(hora=11)
+
+        self.turno(guardar=False).full_clean()
+
+    def test_turnos_cerrados_y_de_otros_socios_no_cuentan(self):
+        self.turno(estado='FINALIZADO')
+        self.turno(socio=self.crear_socio('otro'))
+
+        Turno(
+            franja=self.crear_franja(hora=11), socio=self.socio, hora_inicio=self.franja.hora_inicio, estado='CONFIRMADO'
+        ).full_clean()
+
+    def test_volver_a_guardar_el_mismo_turno(self):
+        turno = self.turno()
+        turno.estado = 'RESERVADO'
+        turno.save()
+
+    def test_una_consulta_sin_importar_las_reservas_del_socio(self):
+        for hora in range(12, 22):
+            self.turno(hora=hora)
+        nuevo = self.turno(guardar=False)
+        obtener_plantilla()
+
+        with self.assertNumQueries(1):
+            nuevo.clean()
+
+
+class ReclamarCupoTests(TurnosTestCase):
+
+    def test_reclama_hasta_la_capacidad(self):
+        franja = self.crear_franja(capacidad=2)
+
+        self.assertTrue(franja.reclamar_cupo())
+        self.assertTrue(franja.reclamar_cupo())
+        self.assertFalse(franja.reclamar_cupo())
+
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 2)
+        self.assertEqual(franja.cupos_disponibles, 0)
+
+    def test_instancia_desactualizada_no_sobrevende(self):
+        franja = self.crear_franja(capacidad=1)
+        # Dos requests que leyeron la franja antes de que cualquiera reservara
+        primera = FranjaHoraria.objects.get(pk=franja.pk)
+        segunda = FranjaHoraria.objects.get(pk=franja.pk)
+
+        self.assertTrue(primera.reclamar_cupo())
+        self.assertFalse(segunda.reclamar_cupo())
+
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 1)
+
+    def test_reservados_cuentan_para_la_capacidad(self):
+        franja = self.crear_franja(capacidad=2)
+        FranjaHoraria.objects.filter(pk=franja.pk).update(reservados=1)
+
+        self.assertTrue(franja.reclamar_cupo())
+        self.assertFalse(franja.reclamar_cupo())
+
+    def test_franja_bloqueada_no_se_reclama(self):
+        franja = self.crear_franja()
+        FranjaHoraria.objects.filter(pk=franja.pk).update(bloqueada=True)
+
+        self.assertFalse(franja.reclamar_cupo())
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 0)
+
+
+class ReservaTests(TurnosTestCase):
+
+    def test_reservar_hasta_completar_la_franja(self):
+        franja = self.crear_franja(capacidad=2)
+        otro = self.crear_socio('otro')
+        tercero = self.crear_socio('tercero')
+
+        self.assertEqual(self.reservar(self.socio, franja).status_code, 200)
+        self.assertEqual(self.reservar(otro, franja).status_code, 200)
+        respuesta = self.reservar(tercero, franja)
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.data['error_code'], 'sin_cupo')
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 2)
+        self.assertEqual(franja.turnos.count(), 2)
+
+    def test_cancelar_devuelve_el_cupo(self):
+        franja = self.crear_franja(capacidad=1)
+        self.assertEqual(self.reservar(self.socio, franja).status_code, 200)
+        turno = Turno.objects.get(socio=self.socio)
+
+        respuesta = self.cancelar(self.socio, turno)
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 0)
+        self.assertEqual(franja.cupos_disponibles, 1)
+        self.assertFalse(Turno.objects.exists())
+        # El cupo devuelto se puede volver a reservar
+        self.assertEqual(self.reservar(self.crear_socio('otro'), franja).status_code, 200)
+
+    def test_liberar_resta_el_contador_del_estado(self):
+        franja = self.crear_franja()
+        turno = Turno.objects.create(
+            franja=franja, socio=self.socio, hora_inicio=franja.hora_inicio, estado='RESERVADO'
+        )
+        FranjaHoraria.objects.filter(pk=franja.pk).update(reservados=1)
+
+        self.assertTrue(turno.liberar())
+        # Un segundo request sobre la misma reserva no toca el contador
+        self.assertFalse(turno.liberar())
+
+        franja.refresh_from_db()
+        self.assertEqual(franja.reservados, 0)
+        self.assertEqual(franja.confirmados, 0)
+
+    def test_reserva_duplicada_rechazada(self):
+        franja = self.crear_franja()
+        self.assertEqual(self.reservar(self.socio, franja).status_code, 200)
+
+        respuesta = self.reservar(self.socio, franja)
+
+        self.assertEqual(respuesta.status_code, 400)
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 1)
+        self.assertEqual(Turno.objects.filter(franja=franja, socio=self.socio).count(), 1)
+
+    def test_constraint_impide_duplicar_la_reserva(self):
+        franja = self.crear_franja()
+        Turno.objects.create(franja=franja, socio=self.socio, hora_inicio=franja.hora_inicio, estado='CONFIRMADO')
+
+        # Sin validar, como dos requests que pasaron el chequeo a la vez
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Turno(
+                franja=franja, socio=self.socio, hora_inicio=franja.hora_inicio, estado='CONFIRMADO'
+            ).save(validar=False)
+
+    def test_contencion_al_reservar_pide_reintentar(self):
+        franja = self.crear_franja()
+        with mock.patch.object(UsoPlan, 'ocupar', side_effect=OperationalError('database is locked')):
+            respuesta = self.reservar(self.socio, franja)
+
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(respuesta.data['error_code'], 'reintentar')
+        self.assertEqual(respuesta['Retry-After'], '1')
+        self.assertFalse(Turno.objects.exists())
+
+    def test_contencion_al_cancelar_pide_reintentar(self):
+        franja = self.crear_franja()
+        self.reservar(self.socio, franja)
+        turno = Turno.objects.get()
+
+        with mock.patch.object(Turno, 'liberar', side_effect=OperationalError('database is locked')):
+            respuesta = self.cancelar(self.socio, turno)
+
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(respuesta.data['error_code'], 'reintentar')
+        # El reintento cancela normalmente
+        self.assertEqual(self.cancelar(self.socio, turno).status_code, 200)
+        franja.refresh_from_db()
+        self.assertEqual(franja.confirmados, 0)
+
+
+class UsoPlanTests(TurnosTestCase):
+
+    def usados(self, socio, periodo, inicio):
+        uso = UsoPlan.objects.filter(socio=socio, periodo=periodo, inicio=inicio).first()
+        return uso.usados if uso else 0
+
+    def test_reservar_hasta_el_limite_del_plan(self):
+        franjas = [self.crear_franja(dia=dia) for dia in range(3)]
+
+        self.assertEqual(self.reservar(self.socio, franjas[0]).status_code, 200)
+        self.assertEqual(self.reservar(self.socio, franjas[1]).status_code, 200)
+        respuesta = self.reservar(self.socio, franjas[2])
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data['error_code'], 'limite_plan')
+        self.assertEqual(self.usados(self.socio, 'semana', self.lunes), 2)
+        # El rechazo no tocó la franja
+        franjas[2].refresh_from_db()
+        self.assertEqual(franjas[2].confirmados, 0)
+
+    def test_cancelar_libera_el_uso(self):
+        franjas = [self.crear_franja(dia=dia) for dia in range(3)]
+        self.reservar(self.socio, franjas[0])
+        self.reservar(self.socio, franjas[1])
+
+        self.assertEqual(self.cancelar(self.socio, Turno.objects.get(franja=franjas[0])).status_code, 200)
+
+        self.assertEqual(self.usados(self.socio, 'semana', self.lunes), 1)
+        self.assertEqual(self.usados(self.socio, 'dia', self.lunes), 0)
+        self.assertEqual(self.reservar(self.socio, franjas[2]).status_code, 200)
+
+    def test_finalizar_turnos_libera_el_uso(self):
+        franja = self.crear_franja()
+        self.reservar(self.socio, franja)
+        progreso = ProgresoTarea.obtener('finalizar_turnos')
+
+        finalizados = finalizar_lote(progreso, 500, franja.hora_inicio + timedelta(hours=1))
+
+        self.assertEqual(finalizados, 1)
+        self.assertEqual(Turno.objects.get().estado, 'FINALIZADO')
+        self.assertEqual(self.usados(self.socio, 'semana', self.lunes), 0)
+        self.assertEqual(self.usados(self.socio, 'dia', self.lunes), 0)
+
+    def test_reconciliar_corrige_el_uso_desfasado(self):
+        franja = self.crear_franja()
+        self.reservar(self.socio, franja)
+        UsoPlan.objects.filter(socio=self.socio, periodo='semana').update(usados=2)
+        # Uso de una semana sin reservas activas
+        UsoPlan.objects.create(socio=self.socio, periodo='semana', inicio=self.lunes + timedelta(days=7), usados=1)
+
+        call_command('reconciliar_uso_planes', '--dry-run', stdout=StringIO())
+        self.assertEqual(self.usados(self.socio, 'semana', self.lunes), 2)
+
+        call_command('reconciliar_uso_planes', stdout=StringIO())
+
+        self.assertEqual(self.usados(self.socio, 'semana', self.lunes), 1)
+        self.assertEqual(self.usados(self.socio, 'dia', self.lunes), 1)
+        self.assertFalse(UsoPlan.objects.filter(inicio=self.lunes + timedelta(days=7)).exists())
+        # Con el uso corregido el socio vuelve a tener su segundo turno de la semana
+        self.assertEqual(self.reservar(self.socio, self.crear_franja(dia=1)).status_code, 200)
+
+
+class ReservarParaSociosTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.staff = self.crear_staff()
+        self.franja = self.crear_franja(capacidad=2)
+
+    def reservar_lote(self, reservas, **datos):
+        self.client.force_authenticate(self.staff)
+        return self.client.post(
+            '/api/turnos/turno/reservar_para_socios/', {'reservas': reservas, **datos}, format='json'
+        )
+
+    def estados(self, respuesta):
+        return [resultado['estado'] for resultado in respuesta.data['resultados']]
+
+    def test_resultado_parcial(self):
+        otro, tercero = self.crear_socio('otro'), self.crear_socio('tercero')
+        martes = self.crear_franja(dia=1)
+        miercoles = self.crear_franja(dia=2)
+
+        respuesta = self.reservar_lote([
+            {'socio_id': self.socio.pk, 'franja_id': self.franja.pk},
+            {'socio_id': otro.pk, 'franja_id': self.franja.pk},
+            {'socio_id': tercero.pk, 'franja_id': self.franja.pk},
+            {'socio_id': self.socio.pk, 'franja_id': self.franja.pk},
+            {'socio_id': self.socio.pk, 'franja_id': martes.pk},
+            # El plan 2x semanal no admite una tercera reserva en la semana
+            {'socio_id': self.socio.pk, 'franja_id': miercoles.pk},
+            {'socio_id': self.staff.pk, 'franja_id': martes.pk},
+            {'socio_id': 'x'},
+        ])
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['reservados'], 3)
+        self.assertEqual(self.estados(respuesta), [
+            'reservado', 'reservado', 'sin_cupo', 'ya_reservado', 'reservado', 'limite_plan', 'socio_invalido',
+            'invalido',
+        ])
+        self.assertEqual(Turno.objects.filter(estado='CONFIRMADO').count(), 3)
+        self.franja.refresh_from_db()
+        self.assertEqual((self.franja.confirmados, self.franja.cupos_disponibles), (2, 0))
+        self.assertEqual(
+            UsoPlan.objects.get(socio=self.socio, periodo='semana', inicio=self.lunes).usados, 2
+        )
+
+    def test_todo_o_nada_revierte_el_lote(self):
+        otro, tercero = self.crear_socio('otro'), self.crear_socio('tercero')
+
+        respuesta = self.reservar_lote([
+            {'socio_id': socio.pk, 'franja_id': self.franja.pk} for socio in (self.socio, otro, tercero)
+        ], todo_o_nada=True)
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.data['reservados'], 0)
+        self.assertEqual(self.estados(respuesta), ['disponible', 'disponible', 'sin_cupo'])
+        self.assertFalse(Turno.objects.filter(socio__isnull=False).exists())
+        self.franja.refresh_from_db()
+        self.assertEqual(self.franja.cupos_disponibles, 2)
+        self.assertFalse(UsoPlan.objects.filter(usados__gt=0).exists())
+
+    def test_todo_o_nada_sin_errores(self):
+        otro = self.crear_socio('otro')
+
+        respuesta = self.reservar_lote([
+            {'socio_id': socio.pk, 'franja_id': self.franja.pk} for socio in (self.socio, otro)
+        ], todo_o_nada=True)
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['reservados'], 2)
+
+    def test_solo_staff(self):
+        self.client.force_authenticate(self.socio)
+        respuesta = self.client.post('/api/turnos/turno/reservar_para_socios/', {
+            'reservas': [{'socio_id': self.socio.pk, 'franja_id': self.franja.pk}]
+        }, format='json')
+
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertFalse(Turno.objects.exists())
+
+    def test_lista_vacia(self):
+        self.assertEqual(self.reservar_lote([]).status_code, 400)
+
+
+class ReservarSerieTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        generar_franjas(self.lunes, self.lunes + timedelta(weeks=3, days=-1))
+
+    def franja(self, semana, dia, hora=10):
+        hora_inicio = timezone.make_aware(
+            datetime.combine(self.lunes + timedelta(weeks=semana, days=dia), time(hora))
+        )
+        return FranjaHoraria.objects.get(hora_inicio=hora_inicio)
+
+    def reservar_serie(self, dias, **datos):
+        self.client.force_authenticate(self.socio)
+        return self.client.post('/api/turnos/turno/reservar_serie/', {
+            'dias': dias, 'hora': '10:00', 'semanas': 3, 'fecha_inicio': str(self.lunes), **datos
+        }, format='json')
+
+    def estados(self, respuesta):
+        return [ocurrencia['estado'] for ocurrencia in respuesta.data['ocurrencias']]
+
+    def test_reserva_toda_la_serie(self):
+        respuesta = self.reservar_serie([0, 2])
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['reservados'], 6)
+        self.assertEqual(respuesta.data['clases_restantes'], 2)
+        self.assertEqual(Turno.objects.filter(socio=self.socio, estado='CONFIRMADO').count(), 6)
+        self.assertEqual(self.franja(1, 2).confirmados, 1)
+        self.assertEqual(
+            list(UsoPlan.objects.filter(periodo='semana').order_by('inicio').values_list('usados', flat=True)),
+            [2, 2, 2]
+        )
+
+    def test_resultado_parcial(self):
+        FranjaHoraria.objects.filter(pk=self.franja(0, 0).pk).update(confirmados=10)
+        self.franja(1, 2).delete()
+        self.reservar(self.socio, self.franja(2, 0))
+
+        respuesta = self.reservar_serie([0, 2])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            self.estados(respuesta),
+            ['sin_cupo', 'reservado', 'reservado', 'sin_franja', 'ya_reservado', 'reservado']
+        )
+        self.assertEqual(respuesta.data['reservados'], 3)
+        self.assertEqual(Turno.objects.filter(socio=self.socio).count(), 4)
+        self.assertEqual(self.socio.cuotas_mensuales.get().clases_restantes, 4)
+
+    def test_limite_del_plan_por_semana(self):
+        respuesta = self.reservar_serie([0, 2, 4], semanas=1)
+
+        self.assertEqual(self.estados(respuesta), ['reservado', 'reservado', 'limite_plan'])
+
+    def test_todo_o_nada_no_reserva_ninguna(self):
+        FranjaHoraria.objects.filter(pk=self.franja(0, 0).pk).update(confirmados=10)
+
+        respuesta = self.reservar_serie([0, 2], todo_o_nada=True)
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.data['reservados'], 0)
+        self.assertEqual(self.estados(respuesta), ['sin_cupo'] + ['disponible'] * 5)
+        self.assertFalse(Turno.objects.exists())
+        self.assertFalse(UsoPlan.objects.filter(usados__gt=0).exists())
+        self.assertEqual(self.socio.cuotas_mensuales.get().clases_restantes, 8)
+        self.assertEqual(self.franja(0, 2).confirmados, 0)
+
+    def test_todo_o_nada_con_toda_la_serie_disponible(self):
+        respuesta = self.reservar_serie([0, 2], todo_o_nada=True)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['reservados'], 6)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.reservar_serie([]).status_code, 400)
+        self.assertEqual(self.reservar_serie([0], hora='10:30').status_code, 400)
+        self.assertEqual(self.reservar_serie([0], semanas=9).status_code, 400)
+
+
+class MisTurnosTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.proximos = [self.crear_turno(dia, hora) for dia, hora in [(0, 10), (0, 12), (1, 9), (2, 18), (4, 8)]]
+        # Hace dos semanas
+        self.pasados = [self.crear_turno(dia, 10, 'FINALIZADO') for dia in (-14, -13, -12)]
+        self.crear_turno(3, 10, 'CANCELADO')
+        otro = self.crear_socio('otro')
+        Turno(
+            franja=self.proximos[0].franja, socio=otro, hora_inicio=self.proximos[0].hora_inicio, estado='CONFIRMADO'
+        ).save(validar=False)
+        self.client.force_authenticate(self.socio)
+
+    def crear_turno(self, dia, hora, estado='CONFIRMADO'):
+        franja = self.crear_franja(dia=dia, hora=hora)
+        turno = Turno(franja=franja, socio=self.socio, hora_inicio=franja.hora_inicio, estado=estado)
+        turno.save(validar=False)
+        return turno
+
+    def recorrer(self, **params):
+        """Ids de todas las páginas siguiendo el link 'next'"""
+        ids, paginas = [], 0
+        respuesta = self.client.get('/api/turnos/turno/mis_turnos/', params)
+        while True:
+            self.assertEqual(respuesta.status_code, 200, respuesta.data)
+            ids += [turno['id'] for turno in respuesta.data['results']]
+            paginas += 1
+            if not respuesta.data['next']:
+                return ids, paginas
+            respuesta = self.client.get(respuesta.data['next'])
+
+    def test_proximos_del_mas_cercano(self):
+        ids, paginas = self.recorrer(page_size=2)
+
+        self.assertEqual(ids, [turno.pk for turno in self.proximos])
+        self.assertEqual(paginas, 3)
+
+    def test_pasados_del_mas_reciente(self):
+        ids, paginas = self.recorrer(scope='past', page_size=2)
+
+        self.assertEqual(ids, [turno.pk for turno in reversed(self.pasados)])
+        self.assertEqual(paginas, 2)
+
+    def test_pagina_nueva_no_repite_ni_saltea(self):
+        respuesta = self.client.get('/api/turnos/turno/mis_turnos/', {'page_size': 2})
+        # Una reserva nueva anterior al cursor no desplaza la página siguiente
+        self.crear_turno(0, 8)
+
+        siguiente = self.client.get(respuesta.data['next'])
+
+        self.assertEqual([turno['id'] for turno in siguiente.data['results']], [self.proximos[2].pk, self.proximos[3].pk])
+
+    def test_formato_compacto(self):
+        respuesta = self.client.get('/api/turnos/turno/mis_turnos/', {'formato': 'compacto', 'page_size': 1})
+
+        turno = Turno.objects.get(pk=self.proximos[0].pk)
+        self.assertEqual(
+            respuesta.data['results'],
+            [{
+                'id': turno.pk,
+                'franja_id': turno.franja_id,
+                'hora_inicio': turno.hora_inicio.isoformat(),
+                'hora_fin': turno.hora_fin.isoformat(),
+                'estado': 'CONFIRMADO',
+            }]
+        )
+
+    def test_scope_invalido(self):
+        respuesta = self.client.get('/api/turnos/turno/mis_turnos/', {'scope': 'todos'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ArchivoTests(TurnosTestCase):
+
+    def crear_turno(self, dia, hora, estado='FINALIZADO', socio=None):
+        franja = self.crear_franja(dia=dia, hora=hora)
+        turno = Turno(franja=franja, socio=socio or self.socio, hora_inicio=franja.hora_inicio, estado=estado)
+        turno.save(validar=False)
+        return turno
+
+    def test_archivar_dos_veces_no_duplica(self):
+        viejos = [
+            self.crear_turno(-63, 10), self.crear_turno(-62, 11, 'ASISTIO'), self.crear_turno(-61, 12, 'AUSENTE')
+        ]
+        reciente = self.crear_turno(-14, 10)
+        activo = self.crear_turno(-61, 18, 'CONFIRMADO')
+
+        call_command('archivar_turnos', '--lote', '2', stdout=StringIO())
+        call_command('archivar_turnos', '--lote', '2', stdout=StringIO())
+
+        # Se conserva el id y el estado del turno original
+        self.assertEqual(
+            list(TurnoHistorico.objects.order_by('hora_inicio').values_list('id', 'estado')),
+            [(turno.pk, turno.estado) for turno in viejos]
+        )
+        self.assertFalse(Turno.objects.filter(pk__in=[turno.pk for turno in viejos]).exists())
+        # Los recientes y los que no están cerrados quedan en la tabla de turnos
+        self.assertEqual(set(Turno.objects.values_list('pk', flat=True)), {reciente.pk, activo.pk})
+
+    def test_lote_cortado_despues_de_copiar(self):
+        turno = self.crear_turno(-63, 10)
+        # La copia ya se hizo pero el borrado no llegó a correr
+        TurnoHistorico.objects.create(id=turno.pk, socio=self.socio, hora_inicio=turno.hora_inicio, estado=turno.estado)
+
+        self.assertEqual(archivar(), 1)
+
+        self.assertEqual(TurnoHistorico.objects.count(), 1)
+        self.assertFalse(Turno.objects.filter(pk=turno.pk).exists())
+
+    def test_historial_lee_las_dos_tablas(self):
+        otro = self.crear_socio('otro')
+        archivado = self.crear_turno(-14, 9, socio=otro)
+        pendiente = self.crear_turno(-14, 10, 'CONFIRMADO')
+        cerrado = self.crear_turno(-14, 11, 'AUSENTE')
+        otro_dia = self.crear_turno(-13, 10)
+        archivar(dias=7)
+        self.assertEqual(
+            set(TurnoHistorico.objects.values_list('pk', flat=True)), {archivado.pk, cerrado.pk, otro_dia.pk}
+        )
+        self.client.force_authenticate(self.crear_staff())
+
+        respuesta = self.client.get('/api/turnos/turno/historial/', {'fecha': str(self.lunes - timedelta(days=14))})
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['total_confirmados'], 3)
+        self.assertEqual(
+            [(turno['id'], turno['socio'], turno['estado']) for turno in respuesta.data['turnos']],
+            [
+                (archivado.pk, 'otro', 'FINALIZADO'),
+                # La reserva activa de una hora pasada se muestra finalizada
+                (pendiente.pk, 'socio', 'FINALIZADO'),
+                (cerrado.pk, 'socio', 'AUSENTE'),
+            ]
+        )
+
+    def test_historial_solo_staff(self):
+        self.client.force_authenticate(self.socio)
+        respuesta = self.client.get('/api/turnos/turno/historial/', {'fecha': str(self.lunes)})
+        self.assertEqual(respuesta.status_code, 403)
+
+
+@override_settings(TURNOS_CHECKIN_EN_LOTE=False)
+class CheckinTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Turno de la hora en curso
+        hora_inicio = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+        franja = FranjaHoraria.objects.create(hora_inicio=hora_inicio, capacidad=10)
+        self.turno = Turno(franja=franja, socio=self.socio, hora_inicio=hora_inicio, estado='CONFIRMADO')
+        self.turno.save(validar=False)
+        self.staff = self.crear_staff()
+
+    def pedir_token(self):
+        self.client.force_authenticate(self.socio)
+        respuesta = self.client.get('/api/turnos/turno/token_checkin/')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data['token']
+
+    def checkin(self, token):
+        self.client.force_authenticate(self.staff)
+        return self.client.post('/api/turnos/turno/checkin/', {'token': token}, format='json')
+
+    def test_token_valido_registra_el_ingreso(self):
+        token = self.pedir_token()
+
+        respuesta = self.checkin(token)
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual((respuesta.data['turno_id'], respuesta.data['ya_registrado']), (self.turno.pk, False))
+        self.turno.refresh_from_db()
+        self.assertIsNotNone(self.turno.ingreso)
+
+        # El mismo QR otra vez no pisa la hora de ingreso
+        otra_vez = self.checkin(token)
+        self.assertTrue(otra_vez.data['ya_registrado'])
+        self.assertEqual(otra_vez.data['ingreso'], self.turno.ingreso.isoformat())
+
+    def test_token_vencido(self):
+        token = self.pedir_token()
+        despues = time_module.time() + vigencia_token() + 1
+
+        with mock.patch('django.core.signing.time.time', return_value=despues):
+            respuesta = self.checkin(token)
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data['detail'], 'El QR venció, generá uno nuevo.')
+        self.assertIsNone(Turno.objects.get(pk=self.turno.pk).ingreso)
+
+    def test_token_adulterado(self):
+        otro = self.crear_socio('otro')
+        token = self.pedir_token()
+        # Mismo timestamp y firma con el id de otro socio
+        firma = token.split(':', 1)[1]
+        adulterado = signing.dumps([otro.pk, 1], salt=SALT).split(':', 1)[0] + ':' + firma
+        otra_firma = token[:-1] + ('B' if token.endswith('A') else 'A')
+
+        for token_malo in (adulterado, otra_firma, 'cualquier-cosa'):
+            respuesta = self.checkin(token_malo)
+            self.assertEqual(respuesta.status_code, 400, token_malo)
+            self.assertEqual(respuesta.data['detail'], 'QR inválido.')
+        self.assertIsNone(Turno.objects.get(pk=self.turno.pk).ingreso)
+
+    def test_solo_staff(self):
+        token = self.pedir_token()
+        respuesta = self.client.post('/api/turnos/turno/checkin/', {'token': token}, format='json')
+        self.assertEqual(respuesta.status_code, 403)
+
+    @override_settings(TURNOS_CHECKIN_EN_LOTE=True)
+    def test_ingresos_en_lote(self):
+        registro = RegistroIngresos()
+        ahora = timezone.now()
+
+        with mock.patch('turnos.checkin.threading.Thread') as hilo, \
+                mock.patch('turnos.checkin.atexit.register') as al_salir:
+            self.assertEqual(registro.agregar(self.turno.pk, ahora), ahora)
+            # El primer ingreso queda aunque llegue otro QR antes de guardar
+            self.assertEqual(registro.agregar(self.turno.pk, ahora + timedelta(minutes=1)), ahora)
+
+        hilo.return_value.start.assert_called_once()
+        al_salir.assert_called_once_with(registro._vaciar_al_salir)
+        self.assertIsNone(Turno.objects.get(pk=self.turno.pk).ingreso)
+        self.assertEqual(registro.pendiente(self.turno.pk), ahora)
+
+        # Al terminar el proceso se guarda lo pendiente
+        registro._vaciar_al_salir()
+
+        self.assertEqual(Turno.objects.get(pk=self.turno.pk).ingreso, ahora)
+        self.assertIsNone(registro.pendiente(self.turno.pk))
+
+
+class MarcarAsistenciasTests(TurnosTestCase):
+
+    def crear_turno(self, dia, hora, socio, estado='FINALIZADO', ingreso=False):
+        hora_inicio = timezone.make_aware(datetime.combine(self.lunes + timedelta(days=dia), time(hora)))
+        franja, _ = FranjaHoraria.objects.get_or_create(hora_inicio=hora_inicio)
+        turno = Turno(
+            franja=franja, socio=socio, hora_inicio=franja.hora_inicio, estado=estado,
+            ingreso=franja.hora_inicio if ingreso else None
+        )
+        turno.save(validar=False)
+        return turno
+
+    def marcar(self):
+        salida = StringIO()
+        call_command('marcar_asistencias', stdout=salida)
+        return salida.getvalue()
+
+    def contadores(self):
+        return {
+            fila.socio_id: (fila.asistencias, fila.ausencias, fila.ultima_ausencia)
+            for fila in AsistenciaSocio.objects.all()
+        }
+
+    def test_marca_y_suma_los_contadores(self):
+        otro = self.crear_socio('otro')
+        asistio = self.crear_turno(-14, 10, self.socio, ingreso=True)
+        falto = self.crear_turno(-13, 10, self.socio)
+        self.crear_turno(-14, 10, otro)
+        ultima = self.crear_turno(-13, 18, otro)
+
+        self.marcar()
+
+        self.assertEqual(Turno.objects.get(pk=asistio.pk).estado, 'ASISTIO')
+        self.assertEqual(Turno.objects.get(pk=falto.pk).estado, 'AUSENTE')
+        self.assertEqual(self.contadores(), {
+            self.socio.pk: (1, 1, Turno.objects.get(pk=falto.pk).hora_inicio),
+            otro.pk: (0, 2, Turno.objects.get(pk=ultima.pk).hora_inicio),
+        })
+
+    def test_volver_a_correr_no_cuenta_dos_veces(self):
+        self.crear_turno(-14, 10, self.socio, ingreso=True)
+        self.crear_turno(-13, 10, self.socio)
+        self.marcar()
+        antes = self.contadores()
+
+        self.marcar()
+
+        self.assertEqual(self.contadores(), antes)
+        self.assertEqual(antes[self.socio.pk][:2], (1, 1))
+
+    def test_dia_con_turnos_sin_finalizar_no_se_cierra(self):
+        self.crear_turno(-14, 10, self.socio)
+        self.crear_turno(-14, 12, self.crear_socio('otro'), estado='CONFIRMADO')
+
+        salida = self.marcar()
+
+        self.assertIn('turnos sin finalizar', salida)
+        self.assertFalse(Turno.objects.filter(estado__in=['ASISTIO', 'AUSENTE']).exists())
+        self.assertFalse(AsistenciaSocio.objects.exists())
+
+
+class OcupacionTests(TurnosTestCase):
+
+    def crear_filas(self):
+        # Lunes 2/3/2026 y la semana siguiente
+        lunes = date(2026, 3, 2)
+        OcupacionHora.objects.bulk_create([
+            OcupacionHora(fecha=lunes, hora=10, capacidad=10, reservados=2, confirmados=3, asistieron=2),
+            OcupacionHora(fecha=lunes + timedelta(days=7), hora=10, capacidad=10, confirmados=5, asistieron=4),
+            OcupacionHora(fecha=lunes + timedelta(days=1), hora=18, capacidad=20, confirmados=10, asistieron=5),
+            # Hora bloqueada: no cuenta como día abierto ni aparece en el mapa
+            OcupacionHora(fecha=lunes + timedelta(days=5), hora=14, capacidad=0),
+        ])
+        return lunes, lunes + timedelta(days=13)
+
+    def test_resumen(self):
+        desde, hasta = self.crear_filas()
+
+        with mock.patch('turnos.ocupacion.np', None):
+            resumen = resumen_ocupacion(desde, hasta)
+
+        self.assertEqual(resumen['horas'], [10, 18])
+        mapa = resumen['mapa_calor']
+        self.assertEqual(mapa['ocupacion'][:2], [[50.0, None], [None, 50.0]])
+        self.assertEqual(mapa['asistencia'][:2], [[30.0, None], [None, 25.0]])
+        # Dos lunes abiertos a las 10
+        self.assertEqual(mapa['promedio_reservas'][:2], [[5.0, None], [None, 10.0]])
+        self.assertEqual(mapa['ocupacion'][5], [None, None])
+        self.assertEqual(
+            [
+                (semana['semana'], semana['capacidad'], semana['ocupados'], semana['asistieron'], semana['asistencia'])
+                for semana in resumen['tendencia']
+            ],
+            [('2026-03-02', 30, 15, 7, 23.3), ('2026-03-09', 10, 5, 4, 40.0)]
+        )
+
+    @skipIf(np is None, 'NumPy no está instalado')
+    def test_numpy_y_python_dan_lo_mismo(self):
+        desde, hasta = self.crear_filas()
+
+        con_numpy = resumen_ocupacion(desde, hasta)
+        with mock.patch('turnos.ocupacion.np', None):
+            sin_numpy = resumen_ocupacion(desde, hasta)
+
+        self.assertEqual(con_numpy, sin_numpy)
+
+    def test_rango_sin_filas(self):
+        resumen = resumen_ocupacion(date(2026, 3, 2), date(2026, 3, 8))
+        self.assertEqual((resumen['horas'], resumen['tendencia']), ([], []))
+
+    def test_actualizar_lee_franjas_y_asistencias_archivadas(self):
+        franja = self.crear_franja(dia=-14)
+        FranjaHoraria.objects.filter(pk=franja.pk).update(confirmados=3)
+        Turno(franja=franja, socio=self.socio, hora_inicio=franja.hora_inicio, estado='ASISTIO').save(validar=False)
+        TurnoHistorico.objects.create(
+            id=10 ** 6, socio=self.crear_socio('otro'), hora_inicio=franja.hora_inicio, estado='ASISTIO'
+        )
+
+        self.assertEqual(actualizar_ocupacion(completo=True), (1, 1))
+
+        fila = OcupacionHora.objects.get()
+        self.assertEqual(
+            (fila.fecha, fila.hora, fila.capacidad, fila.confirmados, fila.asistieron),
+            (self.lunes - timedelta(days=14), 10, 10, 3, 2)
+        )
+
+        # Sin cambios no se recalcula nada; un cambio del día lo vuelve a leer
+        self.assertEqual(actualizar_ocupacion(), (0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            FranjaHoraria.objects.filter(pk=franja.pk).update(confirmados=4)
+            marcar_cambio(franja.hora_inicio)
+
+        # Solo cambia la fila de esa hora (los días recalculados pueden incluir
+        # fechas que otros tests marcaron sin llegar al on_commit)
+        self.assertEqual(actualizar_ocupacion()[1], 1)
+        self.assertEqual(OcupacionHora.objects.get().confirmados, 4)
+
+    def test_endpoint_solo_staff(self):
+        self.client.force_authenticate(self.socio)
+        self.assertEqual(self.client.get('/api/turnos/turno/ocupacion/').status_code, 403)
+
+        self.client.force_authenticate(self.crear_staff())
+        respuesta = self.client.get(
+            '/api/turnos/turno/ocupacion/', {'fecha_desde': '2026-03-09', 'fecha_hasta': '2026-03-02'}
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ListaEsperaTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Franja completa con dos socios esperando, en orden de llegada
+        self.franja = self.crear_franja(capacidad=1)
+        self.reservar(self.socio, self.franja)
+        self.primero = self.crear_socio('primero')
+        self.segundo = self.crear_socio('segundo')
+        ListaEspera.objects.create(franja=self.franja, socio=self.primero)
+        ListaEspera.objects.create(franja=self.franja, socio=self.segundo)
+
+    def cancelar_reserva(self):
+        respuesta = self.cancelar(self.socio, Turno.objects.get(socio=self.socio))
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+
+    def test_cancelar_promueve_al_primero(self):
+        with override_settings(TURNOS_LISTA_ESPERA_EN_SEGUNDO_PLANO=True), \
+                mock.patch('turnos.lista_espera._promotor') as promotor, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.cancelar_reserva()
+        promotor.avisar.assert_called_with(self.franja.pk)
+
+        self.assertEqual(promover_franja(self.franja.pk), 1)
+
+        turno = Turno.objects.get(franja=self.franja)
+        self.assertEqual(turno.socio, self.primero)
+        self.assertEqual(turno.estado, 'CONFIRMADO')
+        self.franja.refresh_from_db()
+        self.assertEqual(self.franja.confirmados, 1)
+        self.assertEqual(list(self.franja.lista_espera.values_list('socio', flat=True)), [self.segundo.pk])
+        self.assertTrue(EventoListaEspera.objects.filter(socio=self.primero, tipo='promovido', turno=turno).exists())
+        self.assertEqual(self.primero.cuotas_mensuales.get().clases_restantes, 7)
+
+    def test_socio_sin_cuota_se_descarta(self):
+        self.primero.cuotas_mensuales.update(fecha_vencimiento=timezone.localdate() - timedelta(days=1))
+        self.cancelar_reserva()
+
+        self.assertEqual(promover_siguiente(self.franja.pk), 'descartado')
+        self.assertEqual(promover_siguiente(self.franja.pk), 'promovido')
+
+        self.assertEqual(Turno.objects.get(franja=self.franja).socio, self.segundo)
+        self.assertFalse(ListaEspera.objects.exists())
+        self.assertTrue(EventoListaEspera.objects.filter(socio=self.primero, tipo='descartado').exists())
+
+    def test_socio_en_el_limite_del_plan_se_descarta(self):
+        UsoPlan.objects.create(socio=self.primero, periodo='semana', inicio=self.lunes, usados=2)
+        self.cancelar_reserva()
+
+        self.assertEqual(promover_franja(self.franja.pk), 1)
+
+        self.assertEqual(Turno.objects.get(franja=self.franja).socio, self.segundo)
+        self.assertEqual(UsoPlan.objects.get(socio=self.primero, periodo='semana').usados, 2)
+        self.assertTrue(EventoListaEspera.objects.filter(socio=self.primero, tipo='descartado').exists())
+
+    def test_franja_bloqueada_no_promueve(self):
+        self.cancelar_reserva()
+        FranjaHoraria.objects.filter(pk=self.franja.pk).update(bloqueada=True)
+
+        self.assertIsNone(promover_siguiente(self.franja.pk))
+
+        self.assertFalse(Turno.objects.exists())
+        self.assertEqual(ListaEspera.objects.count(), 2)
+        self.assertFalse(EventoListaEspera.objects.filter(tipo__in=['promovido', 'descartado']).exists())
+
+    def test_listar_posiciones_sin_una_consulta_por_entrada(self):
+        self.client.force_authenticate(self.segundo)
+        with CaptureQueriesContext(connection) as una_entrada:
+            respuesta = self.client.get('/api/turnos/turno/lista_espera/')
+        self.assertEqual([entrada['posicion'] for entrada in respuesta.data], [2])
+
+        for dia in (1, 2):
+            franja = self.crear_franja(dia=dia, capacidad=0)
+            ListaEspera.objects.create(franja=franja, socio=self.segundo)
+        with CaptureQueriesContext(connection) as tres_entradas:
+            respuesta = self.client.get('/api/turnos/turno/lista_espera/')
+
+        self.assertEqual([entrada['posicion'] for entrada in respuesta.data], [2, 1, 1])
+        self.assertEqual(len(tres_entradas), len(una_entrada))
+
+
+class CalendarioTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.franja = self.crear_franja(capacidad=3)
+        self.otro = self.crear_socio('otro')
+        self.reservar(self.socio, self.franja)
+        self.reservar(self.otro, self.franja)
+        self.rango = {'fecha_inicio': str(self.lunes), 'fecha_fin': str(self.lunes + timedelta(days=6))}
+
+    def horario(self, usuario, hora='10:00'):
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.get('/api/turnos/turno/calendario/', self.rango)
+        self.assertEqual(respuesta.status_code, 200)
+        return next(horario for horario in respuesta.data[0]['horarios'] if horario['hora'] == hora)
+
+    def test_contadores_de_la_franja(self):
+        horario = self.horario(self.socio)
+
+        self.assertEqual(horario['franja_id'], self.franja.pk)
+        self.assertEqual(horario['total_cupos'], 3)
+        self.assertEqual(horario['cupos_confirmados'], 2)
+        self.assertEqual(horario['cupos_disponibles'], 1)
+
+    def test_socio_solo_ve_sus_reservas(self):
+        turnos = self.horario(self.socio)['turnos']
+
+        self.assertEqual([(turno['socio_id'], turno['es_mio']) for turno in turnos], [(self.socio.pk, True)])
+        self.assertTrue(turnos[0]['puede_cancelar'])
+
+    def test_staff_ve_todas_las_reservas(self):
+        turnos = self.horario(self.crear_staff())['turnos']
+
+        self.assertEqual(sorted(turno['socio'] for turno in turnos), ['otro', 'socio'])
+        self.assertFalse(any(turno['es_mio'] for turno in turnos))
+
+    def test_anonimo_ve_los_cupos_sin_reservas(self):
+        horario = self.horario(None)
+
+        self.assertEqual(horario['cupos_disponibles'], 1)
+        self.assertEqual(horario['turnos'], [])
+
+    def test_consultas_no_dependen_de_la_cantidad_de_reservas(self):
+        staff = self.crear_staff()
+        self.client.force_authenticate(staff)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get('/api/turnos/turno/calendario/', self.rango)
+
+        for dia in range(1, 5):
+            franja = self.crear_franja(dia=dia)
+            for i in range(3):
+                Turno.objects.create(
+                    franja=franja, socio=self.crear_socio(f's{dia}{i}'), hora_inicio=franja.hora_inicio,
+                    estado='CONFIRMADO'
+                )
+        cache.clear()
+        with CaptureQueriesContext(connection) as muchas:
+            self.client.get('/api/turnos/turno/calendario/', self.rango)
+
+        self.assertEqual(len(muchas), len(pocas))
+
+
+class CalendarioCompactoTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        franja = self.crear_franja(capacidad=3)
+        self.reservar(self.socio, franja)
+        self.reservar(self.crear_socio('otro'), franja)
+        FranjaHoraria.objects.filter(pk=self.crear_franja(dia=1, hora=9).pk).update(bloqueada=True)
+        # Sábado 14: bloqueada por la plantilla
+        self.crear_franja(dia=5, hora=14)
+        cancelada = self.crear_franja(dia=2, hora=18)
+        Turno(
+            franja=cancelada, socio=self.socio, hora_inicio=cancelada.hora_inicio, estado='CANCELADO'
+        ).save(validar=False)
+        self.rango = {'fecha_inicio': str(self.lunes), 'fecha_fin': str(self.lunes + timedelta(days=6))}
+
+    def calendario(self, usuario, **params):
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.get('/api/turnos/turno/calendario/', {**self.rango, **params})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.data
+
+    def expandir(self, compacto, usuario):
+        """Arma el formato completo a partir del compacto"""
+        user_id = usuario.pk if usuario else None
+        socios = compacto['socios']
+        dias = []
+        for dia in compacto['dias']:
+            horarios = {}
+            for i, hora in enumerate(dia['horas']):
+                horarios[hora] = {
+                    'hora': f"{hora:02d}:00",
+                    'franja_id': dia['franja_id'][i],
+                    'total_cupos': dia['capacidad'][i],
+                    'cupos_disponibles': dia['disponibles'][i],
+                    'cupos_reservados': dia['reservados'][i],
+                    'cupos_confirmados': dia['confirmados'][i],
+                    'cupos_bloqueados': dia['capacidad'][i] if dia['bloqueada'][i] else 0,
+                    'turnos': [],
+                }
+            turnos = dia['turnos']
+            for i, hora in enumerate(turnos['hora']):
+                socio = turnos['socio'][i]
+                socio_id = socios['id'][socio] if socio is not None else None
+                es_mio = socio_id is not None and socio_id == user_id
+                horarios[hora]['turnos'].append({
+                    'id': turnos['id'][i],
+                    'estado': compacto['estados'][turnos['estado'][i]],
+                    'socio': socios['username'][socio] if socio is not None else None,
+                    'socio_id': socio_id,
+                    'es_mio': es_mio,
+                    'puede_cancelar': es_mio and bool(turnos['cancelable'][i]),
+                })
+            dias.append({'fecha': dia['fecha'], 'es_domingo': dia['es_domingo'], 'horarios': list(horarios.values())})
+        return dias
+
+    def test_mismo_contenido_que_el_completo(self):
+        for usuario in (self.socio, self.crear_staff(), None):
+            # La segunda vuelta sale de la caché
+            for _ in range(2):
+                completo = self.calendario(usuario)
+                compacto = self.calendario(usuario, formato='compacto')
+
+                self.assertEqual(compacto['formato'], 'compacto')
+                self.assertEqual(self.expandir(compacto, usuario), completo)
+
+    def test_columnas_alineadas(self):
+        compacto = self.calendario(self.socio, formato='compacto')
+        lunes, martes = compacto['dias'][:2]
+
+        self.assertEqual(lunes['horas'], [10])
+        self.assertEqual((lunes['capacidad'], lunes['disponibles'], lunes['confirmados']), ([3], [1], [2]))
+        self.assertEqual((martes['horas'], martes['bloqueada'], martes['disponibles']), ([9], [1], [0]))
+        self.assertEqual(compacto['dias'][-1]['bloqueada'], [1])
+        # El socio ve solo su reserva, sin las canceladas
+        self.assertEqual(compacto['socios'], {'id': [self.socio.pk], 'username': ['socio']})
+        self.assertEqual(lunes['turnos']['cancelable'], [1])
+        self.assertEqual(compacto['dias'][2]['turnos']['id'], [])
+
+
+class CalendarioVersionesTests(TurnosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.crear_franja()
+        self.client.force_authenticate(self.socio)
+        self.rango = {'fecha_inicio': str(self.lunes), 'fecha_fin': str(self.lunes + timedelta(days=6))}
+
+    def pedir_calendario(self, **headers):
+        return self.client.get('/api/turnos/turno/calendario/', self.rango, headers=headers)
+
+    def test_cambio_de_plantilla_cambia_el_etag_sin_version_del_dia(self):
+        etag = self.pedir_calendario()['ETag']
+        self.assertEqual(self.pedir_calendario(if_none_match=etag).status_code, 304)
+        self.assertFalse(VersionDia.objects.exists())
+
+        HorarioPlantilla.objects.create(dia_semana=0, hora_desde=10, hora_hasta=11, bloqueado=True)
+
+        respuesta = self.pedir_calendario(if_none_match=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_cambio_de_plantilla_no_usa_el_calendario_cacheado(self):
+        for formato in ({}, {'formato': 'compacto'}):
+            self.rango.update(formato)
+            self.pedir_calendario()
+        HorarioPlantilla.objects.create(dia_semana=0, hora_desde=10, hora_hasta=11, bloqueado=True)
+
+        self.rango.pop('formato')
+        lunes = self.pedir_calendario().data[0]
+        horario = next(horario for horario in lunes['horarios'] if horario['hora'] == '10:00')
+        self.assertEqual(horario['cupos_disponibles'], 0)
+
+        self.rango['formato'] = 'compacto'
+        lunes = self.pedir_calendario().data['dias'][0]
+        self.assertEqual(lunes['disponibles'][lunes['horas'].index(10)], 0)
@@ -1,7 +1,7 @@
 # backend/turnos/urls.py
 
 from rest_framework.routers import DefaultRouter
-from .views import TurnoViewSet
+from .views import TurnoViewSet, eventos_turnos
 from django.urls import path, include
 
 router = DefaultRouter()
@@ -9,5 +9,6 @@ router.register(r'turno', TurnoViewSet, basename='turno')  # 👈 CAMBIAR A SING
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('eventos/', eventos_turnos, name='turnos-eventos'),
     
 ]
\ No newline at end of file
@@ -0,0 +1,129 @@
+# turnos/versiones.py
+"""
+Versiones por día para GET condicionales.
+
+Cada cambio en una franja o reserva incrementa la VersionDia de su fecha
+local al confirmarse la transacción. Los listados arman su ETag con la
+suma de versiones del rango (una consulta indexada) y, si el cliente ya
+tiene esa versión, responden 304 sin armar el payload.
+
+Un cambio en la plantilla de horarios afecta a todos los días, incluso a
+los que todavía no tienen VersionDia: por eso el ETag también lleva la
+versión de la plantilla (ver horarios.py).
+"""
+import hashlib
+import threading
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .horarios import version_plantilla
+from .models import VersionDia
+
+# Fechas modificadas en la transacción en curso (por hilo)
+_pendientes = threading.local()
+
+
+def incrementar_versiones(fechas=None):
+    """Suma 1 a la versión de las fechas indicadas, o de todas si fechas es None"""
+    ahora = timezone.now()
+    if fechas is None:
+        VersionDia.objects.update(version=F('version') + 1, actualizado=ahora)
+        return
+
+    fechas = list(fechas)
+    if not fechas:
+        return
+    VersionDia.objects.bulk_create([VersionDia(fecha=fecha) for fecha in fechas], ignore_conflicts=True)
+    VersionDia.objects.filter(fecha__in=fechas).update(version=F('version') + 1, actualizado=ahora)
+
+
+def _aplicar_pendientes():
+    fechas = getattr(_pendientes, 'fechas', None)
+    if not fechas:
+        return
+    _pendientes.fechas = set()
+    incrementar_versiones(fechas)
+
+
+def marcar_cambio(*horas):
+    """
+    Registra que cambiaron los turnos de las horas dadas. Las versiones se
+    incrementan juntas al confirmar la transacción, así un borrado masivo
+    hace un solo UPDATE y el contador no se bloquea mientras dura la reserva.
+    Si la transacción se revierte, las fechas se incrementan con la próxima
+    (un incremento de más solo provoca una recarga).
+    """
+    fechas = getattr(_pendientes, 'fechas', None)
+    if fechas is None:
+        fechas = _pendientes.fechas = set()
+    fechas.update(timezone.localtime(hora).date() for hora in horas if hora)
+    transaction.on_commit(_aplicar_pendientes)
+
+
+def firma_rango(fecha_desde=None, fecha_hasta=None):
+    """
+    Versión de los días entre dos fechas (sin límite si son None):
+    {'total': suma de versiones, 'ultima': último cambio}
+    """
+    versiones = VersionDia.objects.all()
+    if fecha_desde:
+        versiones = versiones.filter(fecha__gte=fecha_desde)
+    if fecha_hasta:
+        versiones = versiones.filter(fecha__lte=fecha_hasta)
+    firma = versiones.aggregate(total=Sum('version'), ultima=Max('actualizado'))
+    firma['total'] = firma['total'] or 0
+    return firma
+
+
+def validadores(user, alcance, fecha_desde=None, fecha_hasta=None, firma=None):
+    """
+    (etag, ultima_modificacion) de un listado de turnos entre dos fechas
+    (sin límite si son None), para el usuario dado.
+    """
+    if firma is None:
+        firma = firma_rango(fecha_desde, fecha_hasta)
+
+    # El estado efectivo y puede_cancelar cambian al empezar cada hora
+    hora_actual = timezone.now().replace(minute=0, second=0, microsecond=0)
+    usuario = user.pk if user.is_authenticated else 0
+
+    clave = (
+        f"{alcance}:{usuario}:{fecha_desde}:{fecha_hasta}:{firma['total']}:"
+        f"{version_plantilla()}:{hora_actual.isoformat()}"
+    )
+    etag = hashlib.md5(clave.encode()).hexdigest()
+    ultima = max(firma['ultima'] or hora_actual, hora_actual)
+    return etag, ultima
+
+
+def respuesta_no_modificada(request, etag, ultima_modificacion):
+    """Respuesta 304 si el cliente ya tiene esta versión, o None"""
+    respuesta = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=int(ultima_modificacion.timestamp())
+    )
+    if respuesta is not None:
+        agregar_validadores(respuesta, etag, ultima_modificacion)
+    return respuesta
+
+
+def agregar_validadores(response, etag, ultima_modificacion):
+    """Agrega ETag y Last-Modified; el navegador revalida en cada pedido"""
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(ultima_modificacion.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def rango_local(desde, hasta):
+    """Fechas locales de dos datetimes (hasta puede ser None = sin límite)"""
+    return (
+        timezone.localtime(desde).date(),
+        timezone.localtime(hasta).date() if hasta else None
+    )
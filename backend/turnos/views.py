@@ -2,18 +2,63 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework import serializers
 from django.core.exceptions import ValidationError 
-from .models import Turno
+from django.db import transaction, IntegrityError, OperationalError
+from .models import Turno, FranjaHoraria, UsoPlan, ListaEspera, EventoListaEspera, AsistenciaSocio, ESTADOS_ACTIVOS
 from .serializers import TurnoSerializer, TurnoStaffSerializer
-from django.db.models import Q, Count
+from .calendario import construir_calendario, construir_calendario_compacto
+from .eventos import registrar_franja, obtener_broker
+from .lista_espera import avisar_cupo_liberado, registrar_evento
+from .archivo import asistencias
+from .ocupacion import resumen_ocupacion
+from .checkin import TokenInvalido, buscar_turno, generar_token, leer_token, registro_ingresos, vigencia_token
+from .generacion import generar_franjas
+from .versiones import marcar_cambio, firma_rango, validadores, respuesta_no_modificada, agregar_validadores, rango_local
+from django.db.models import Q, Count, F
 from django.utils import timezone
 from datetime import timedelta, datetime, time
 from backend.permissions import IsStaffUser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.pagination import CursorPagination
 import re
+import json
+import logging
+from collections import Counter
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 
 # ✅ CORREGIDO: Importar desde cuotas_mensuales, NO desde turnos
 from cuotas_mensuales.models import CuotaMensual
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+
+# Reservas por request en reservar_para_socios
+MAXIMO_RESERVAS_LOTE = 200
+
+
+class _ReservasCambiaron(Exception):
+    """Revierte las reservas de un socio del lote (su uso o sus clases cambiaron mientras tanto)"""
+
+
+class MisTurnosPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre hora_inicio, id: cada página es una
+    consulta por índice, sin OFFSET. Los pasados se recorren del más reciente.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('hora_inicio', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get('scope') == 'past':
+            return ('-hora_inicio', '-id')
+        return self.ordering
 
 class TurnoViewSet(viewsets.ModelViewSet):
     
@@ -23,9 +68,12 @@ class TurnoViewSet(viewsets.ModelViewSet):
         return TurnoSerializer
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'generar_turnos_semana']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'generar_turnos_semana', 'checkin',
+                           'asistencia_socios', 'ocupacion', 'reservar_para_socio', 'reservar_para_socios']:
             self.permission_classes = [IsStaffUser] 
-        elif self.action in ['reservar', 'cancelar', 'confirmar', 'mis_turnos']:
+        elif self.action in ['reservar', 'reservar_serie', 'cancelar', 'confirmar', 'mis_turnos', 'lista_espera',
+                             'unirse_lista_espera', 'salir_lista_espera', 'eventos_lista_espera',
+                             'token_checkin']:
             self.permission_classes = [permissions.IsAuthenticated]
         else:
             self.permission_classes = [permissions.AllowAny]
@@ -36,20 +84,37 @@ class TurnoViewSet(viewsets.ModelViewSet):
         now = timezone.now()
         user = self.request.user
         
-        # Limpieza de turnos pasados
-        Turno.objects.filter(hora_inicio__lt=now).exclude(estado='FINALIZADO').update(estado='FINALIZADO')
+        # Los turnos pasados se finalizan con `manage.py finalizar_turnos`;
+        # las lecturas solo filtran por hora
         
-        # Staff ve todo
+        # Staff ve todas las reservas
         if user.is_staff:
-            return Turno.objects.all().order_by('hora_inicio') 
+            return Turno.objects.all().select_related('socio').order_by('hora_inicio') 
         
-        # Socios y no autenticados
-        q_filter = Q(estado='DISPONIBLE', socio__isnull=True)
+        # Socios: solo sus reservas futuras (los cupos libres se consultan por franja)
+        if not user.is_authenticated:
+            return Turno.objects.none()
         
-        if user.is_authenticated:
-            q_filter |= Q(socio=user, estado__in=['RESERVADO', 'CONFIRMADO'])
+        return Turno.objects.filter(
+            socio=user,
+            estado__in=['RESERVADO', 'CONFIRMADO'],
+            hora_inicio__gte=now
+        ).order_by('hora_inicio')
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
         
-        return Turno.objects.filter(q_filter).filter(hora_inicio__gte=now).order_by('hora_inicio')
+        # Staff ve todos los días; un socio solo sus reservas desde hoy
+        if user.is_staff:
+            etag, modificado = validadores(user, 'turnos')
+        else:
+            etag, modificado = validadores(user, 'turnos', timezone.localdate())
+        
+        no_modificado = respuesta_no_modificada(request, etag, modificado)
+        if no_modificado:
+            return no_modificado
+        
+        return agregar_validadores(super().list(request, *args, **kwargs), etag, modificado)
 
     def create(self, request, *args, **kwargs):
         if request.data.get('hora_inicio'):
@@ -64,28 +129,76 @@ class TurnoViewSet(viewsets.ModelViewSet):
                     'detail': 'Formato de fecha inválido.'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-        data = request.data.copy()
-        data['socio'] = None 
-        data['estado'] = 'DISPONIBLE'
+            hora_dt = hora_dt.replace(second=0, microsecond=0)
+            if timezone.is_naive(hora_dt):
+                hora_dt = timezone.make_aware(hora_dt, timezone.get_current_timezone())
+        else:
+            return Response({
+                'detail': 'Debe proporcionar hora_inicio.'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(data=data)
-        serializer.is_valid(raise_exception=True)
+        # Crear un cupo = sumar 1 a la capacidad de la franja de esa hora
         try:
-            self.perform_create(serializer)
+            with transaction.atomic():
+                franja = FranjaHoraria.objects.filter(hora_inicio=hora_dt).first()
+                if franja:
+                    FranjaHoraria.objects.filter(pk=franja.pk).update(capacidad=F('capacidad') + 1)
+                    marcar_cambio(franja.hora_inicio)
+                    registrar_franja(franja.pk, franja.hora_inicio)
+                    avisar_cupo_liberado(franja.pk)
+                else:
+                    franja = FranjaHoraria(hora_inicio=hora_dt, capacidad=1)
+                    franja.full_clean()
+                    franja.save()
         except ValidationError as e:
             return Response({'detail': e.messages}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({'detail': 'Cupo de turno creado con éxito.'}, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        """Mueve la reserva a la franja de su nueva hora y ajusta los contadores"""
+        franja_anterior = serializer.instance.franja
+        hora_inicio = serializer.validated_data.get('hora_inicio', serializer.instance.hora_inicio)
+        
+        franja = FranjaHoraria.objects.filter(hora_inicio=hora_inicio).first()
+        if not franja:
+            raise serializers.ValidationError({'hora_inicio': 'No existe una franja horaria para ese horario.'})
+        
+        anterior = serializer.instance
+        uso_anterior = (anterior.socio_id, anterior.hora_inicio, anterior.estado in ESTADOS_ACTIVOS)
+        
+        try:
+            with transaction.atomic():
+                turno = serializer.save(franja=franja)
+                franja.recalcular_contadores()
+                if franja_anterior.pk != franja.pk:
+                    franja_anterior.recalcular_contadores()
+                
+                # El staff puede mover la reserva de semana/día o cambiarle el estado (sin límite de plan)
+                uso_nuevo = (turno.socio_id, turno.hora_inicio, turno.estado in ESTADOS_ACTIVOS)
+                if uso_nuevo != uso_anterior:
+                    if uso_anterior[2]:
+                        UsoPlan.liberar([uso_anterior[:2]])
+                    if uso_nuevo[2] and turno.socio_id:
+                        UsoPlan.ocupar(turno.socio_id, turno.hora_inicio)
+        except ValidationError as e:
+            raise serializers.ValidationError(e.message_dict)
+
+    def perform_destroy(self, instance):
+        instance.liberar()
+
     @action(methods=['post'], detail=False, permission_classes=[IsStaffUser])
     def generar_turnos_semana(self, request):
         """
-        Genera automáticamente todos los turnos de una semana específica
-        Lunes a Viernes: 8:00 a 22:00
-        Sábados: 8:00 a 13:00 y 17:00 a 22:00
-        10 cupos por hora
+        Genera automáticamente las franjas de una o varias semanas
+        según la plantilla de horarios (HorarioPlantilla)
+
+        Parámetros: fecha_inicio (YYYY-MM-DD), y opcionalmente fecha_fin o
+        semanas (default 1). Con dry_run=true solo devuelve lo que se crearía.
         """
         fecha_inicio_str = request.data.get('fecha_inicio')
+        fecha_fin_str = request.data.get('fecha_fin')
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
         
         if not fecha_inicio_str:
             return Response({
@@ -94,6 +207,8 @@ class TurnoViewSet(viewsets.ModelViewSet):
         
         try:
             fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date() if fecha_fin_str else None
+            semanas = int(request.data.get('semanas', 1))
         except ValueError:
             return Response({
                 'detail': 'Formato de fecha inválido. Use YYYY-MM-DD'
@@ -102,88 +217,43 @@ class TurnoViewSet(viewsets.ModelViewSet):
         # Ajustar al lunes de esa semana
         dias_desde_lunes = fecha_inicio.weekday()
         lunes = fecha_inicio - timedelta(days=dias_desde_lunes)
+        if not fecha_fin:
+            fecha_fin = lunes + timedelta(weeks=max(semanas, 1), days=-1)
         
-        turnos_creados = 0
-        turnos_bloqueados = 0
-        turnos_existentes = 0
-        errores = []
+        if fecha_fin < lunes or (fecha_fin - lunes).days > 7 * 12:
+            return Response({
+                'detail': 'El rango debe ser de 1 a 12 semanas'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Generar turnos de lunes a sábado
-        for dia in range(6):
-            fecha = lunes + timedelta(days=dia)
-            es_sabado = fecha.weekday() == 5
-            
-            # Definir horarios según el día
-            if es_sabado:
-                horarios = list(range(8, 13)) + list(range(17, 23))
-            else:
-                horarios = list(range(8, 23))
-            
-            # Crear turnos para cada hora
-            for hora in horarios:
-                # ✅ SOLUCIÓN: Crear datetime naive y convertir con la timezone configurada
-                dt_naive = datetime.combine(fecha, time(hora, 0))
-                hora_inicio = timezone.make_aware(dt_naive, timezone.get_current_timezone())
-                
-                # Contar cupos existentes en ese rango de 1 hora
-                cupos_existentes = Turno.objects.filter(
-                    hora_inicio__gte=hora_inicio,
-                    hora_inicio__lt=hora_inicio + timedelta(hours=1)
-                ).count()
-                
-                cupos_a_crear = 10 - cupos_existentes
-                
-                if cupos_a_crear <= 0:
-                    turnos_existentes += 10
-                    continue
-                
-                # Crear los cupos
-                for cupo in range(cupos_a_crear):
-                    try:
-                        hora_con_segundos = hora_inicio + timedelta(seconds=cupo)
-                        
-                        turno = Turno.objects.create(
-                            hora_inicio=hora_con_segundos,
-                            estado='DISPONIBLE'
-                        )
-                        turnos_creados += 1
-                    except Exception as e:
-                        errores.append(f"Error en {hora_inicio} cupo {cupo+1}: {str(e)}")
-                
-                if cupos_existentes > 0:
-                    turnos_existentes += cupos_existentes
-            
-            # Bloquear horarios no disponibles del sábado (13-17)
-            if es_sabado:
-                for hora in range(13, 17):
-                    dt_naive = datetime.combine(fecha, time(hora, 0))
-                    hora_bloqueada = timezone.make_aware(dt_naive, timezone.get_current_timezone())
-                    
-                    if not Turno.objects.filter(
-                        hora_inicio__gte=hora_bloqueada,
-                        hora_inicio__lt=hora_bloqueada + timedelta(hours=1)
-                    ).exists():
-                        try:
-                            Turno.objects.create(
-                                hora_inicio=hora_bloqueada,
-                                estado='BLOQUEADO'
-                            )
-                            turnos_bloqueados += 1
-                        except:
-                            pass
+        resumen = generar_franjas(lunes, fecha_fin, dry_run=dry_run)
         
-        return Response({
-            'detail': f'Generación completada',
-            'turnos_creados': turnos_creados,
-            'turnos_bloqueados': turnos_bloqueados,
-            'turnos_existentes': turnos_existentes,
-            'errores': errores if errores else None
-        }, status=status.HTTP_201_CREATED)
+        respuesta = {
+            'detail': 'Simulación completada' if dry_run else 'Generación completada',
+            'turnos_creados': resumen['cupos_nuevos'],
+            'turnos_bloqueados': resumen['bloqueadas_nuevas'],
+            'turnos_existentes': resumen['cupos_existentes'],
+            'errores': None
+        }
+        if dry_run:
+            respuesta['dry_run'] = True
+            respuesta['franjas_nuevas'] = [
+                {
+                    'hora_inicio': franja.hora_inicio,
+                    'capacidad': franja.capacidad,
+                    'bloqueada': franja.bloqueada
+                }
+                for franja in resumen['franjas_nuevas']
+            ]
+            return Response(respuesta, status=status.HTTP_200_OK)
+        
+        return Response(respuesta, status=status.HTTP_201_CREATED)
 
     @action(methods=['get'], detail=False)
     def calendario(self, request):
         """
         Endpoint para obtener turnos agrupados por fecha y hora para el calendario
+        
+        ?formato=compacto devuelve los días por columnas (ver calendario.py)
         """
         now = timezone.now()
         user = request.user
@@ -201,192 +271,162 @@ class TurnoViewSet(viewsets.ModelViewSet):
         else:
             fecha_fin = fecha_inicio + timedelta(days=30)
         
-        # 🔹 IMPORTANTE: Obtener TODOS los turnos del rango para contar correctamente
-        turnos_todos = Turno.objects.filter(
-            hora_inicio__gte=fecha_inicio,
-            hora_inicio__lte=fecha_fin
-        )
-        
-        # Filtrar qué turnos mostrar según permisos
-        if user.is_staff:
-            turnos_mostrar = turnos_todos
-        else:
-            q_filter = Q(estado='DISPONIBLE', socio__isnull=True) | Q(estado='BLOQUEADO')
-            if user.is_authenticated:
-                q_filter |= Q(socio=user, estado__in=['RESERVADO', 'CONFIRMADO', 'FINALIZADO'])
-            
-            turnos_mostrar = turnos_todos.filter(q_filter)
+        # Si el cliente ya tiene esta versión del rango, 304 sin armar el calendario
+        compacto = request.query_params.get('formato') == 'compacto'
+        fecha_desde, fecha_hasta = rango_local(fecha_inicio, fecha_fin)
+        firma = firma_rango(fecha_desde, fecha_hasta)
+        alcance = 'calendario_compacto' if compacto else 'calendario'
+        etag, modificado = validadores(user, alcance, fecha_desde, fecha_hasta, firma)
+        no_modificado = respuesta_no_modificada(request, etag, modificado)
+        if no_modificado:
+            return no_modificado
         
-        # Agrupar por fecha y hora
-        calendario_data = {}
+        # Solo se cachean rangos fijos (sin fecha_inicio el rango empieza "ahora")
+        version = firma['total'] if fecha_inicio_str else None
+        construir = construir_calendario_compacto if compacto else construir_calendario
+        resultado = construir(fecha_inicio, fecha_fin, user, version=version)
         
-        # 🔹 PASO 1: Contar el TOTAL de cupos por fecha/hora (usando TODOS los turnos)
-        for turno in turnos_todos.order_by('hora_inicio'):
-            turno_local = timezone.localtime(turno.hora_inicio)
-            fecha_key = turno_local.strftime('%Y-%m-%d')
-            hora_key = turno_local.strftime('%H:00')
-            
-            if fecha_key not in calendario_data:
-                calendario_data[fecha_key] = {}
-            
-            if hora_key not in calendario_data[fecha_key]:
-                calendario_data[fecha_key][hora_key] = {
-                    'hora': hora_key,
-                    'total_cupos': 0,
-                    'cupos_disponibles': 0,
-                    'cupos_reservados': 0,
-                    'cupos_confirmados': 0,
-                    'cupos_bloqueados': 0,
-                    'turnos': []
-                }
-            
-            # 🔹 CORREGIDO: Contar el total real de cupos
-            calendario_data[fecha_key][hora_key]['total_cupos'] += 1
-            
-            # Contar estados (solo de los que se van a mostrar al usuario)
-            if turno.estado == 'DISPONIBLE':
-                calendario_data[fecha_key][hora_key]['cupos_disponibles'] += 1
-            elif turno.estado == 'RESERVADO':
-                calendario_data[fecha_key][hora_key]['cupos_reservados'] += 1
-            elif turno.estado == 'CONFIRMADO':
-                calendario_data[fecha_key][hora_key]['cupos_confirmados'] += 1
-            elif turno.estado == 'BLOQUEADO':
-                calendario_data[fecha_key][hora_key]['cupos_bloqueados'] += 1
-        
-        # 🔹 PASO 2: Agregar la info detallada solo de los turnos que el usuario puede ver
-        for turno in turnos_mostrar.order_by('hora_inicio'):
-            turno_local = timezone.localtime(turno.hora_inicio)
-            fecha_key = turno_local.strftime('%Y-%m-%d')
-            hora_key = turno_local.strftime('%H:00')
-            
-            # Agregar info del turno
-            turno_info = {
-                'id': turno.id,
-                'estado': turno.estado,
-                'socio': turno.socio.username if turno.socio else None,
-                'socio_id': turno.socio.id if turno.socio else None,
-                'es_mio': turno.socio == user if user.is_authenticated else False,
-                'puede_cancelar': turno.puede_cancelar if turno.socio == user else False
-            }
-            
-            calendario_data[fecha_key][hora_key]['turnos'].append(turno_info)
-        
-        # Convertir a lista ordenada
-        resultado = []
-        for fecha, horas in sorted(calendario_data.items()):
-            resultado.append({
-                'fecha': fecha,
-                'es_domingo': datetime.strptime(fecha, '%Y-%m-%d').weekday() == 6,
-                'horarios': sorted(horas.values(), key=lambda x: x['hora'])
-            })
-        
-        return Response(resultado)
+        return agregar_validadores(Response(resultado), etag, modificado)
     
-    def _validar_limites_plan(self, socio, fecha_turno):
-        """Verifica si el socio puede reservar según su plan actual"""
-        
-        # 1. BUSCAR CUOTA ACTIVA
-        cuota = CuotaMensual.objects.filter(
+    def _cuota_activa(self, socio):
+        """Cuota activa más reciente del socio, con su plan"""
+        return CuotaMensual.objects.filter(
             socio=socio,
             estado='activa',
             fecha_vencimiento__gte=timezone.now().date()
-        ).order_by('-fecha_vencimiento').first()
-
-        if not cuota:
-            return False, "No tienes una cuota mensual activa. Por favor, regulariza tu situación para reservar turnos."
+        ).select_related('plan').order_by('-fecha_vencimiento').first()
 
+    def _registrar_uso_plan(self, socio, cuota, hora_inicio):
+        """
+        Suma la reserva al uso del socio (UsoPlan) verificando el límite de su plan.
+        Retorna el mensaje de error si se alcanzó el límite, o None.
+        Debe llamarse dentro de la transacción de la reserva.
+        """
         plan = cuota.plan
-        
-        print("=" * 60)
-        print(f"🔍 VALIDANDO LÍMITES DEL PLAN")
-        print(f"   Socio: {socio.username}")
-        print(f"   Plan: {plan.nombre}")
-        print(f"   Tipo límite: {plan.tipo_limite}")
-        print(f"   Cantidad límite: {plan.cantidad_limite}")
-
-        # 2. SI ES PASE LIBRE, PERMITIR SIN RESTRICCIONES
-        if plan.tipo_limite == 'libre':
-            print(f"   ✅ Pase Libre - Sin restricciones")
-            print("=" * 60)
-            return True, None
-
-        # 3. CALCULAR RANGO DE FECHAS SEGÚN TIPO DE LÍMITE
-        if plan.tipo_limite == 'semanal':
-            # Calcular lunes y domingo de la semana del turno
-            fecha_turno_date = fecha_turno.date() if hasattr(fecha_turno, 'date') else fecha_turno
-            
-            # Lunes de la semana (weekday 0 = lunes)
-            dias_desde_lunes = fecha_turno_date.weekday()
-            inicio_semana = fecha_turno_date - timedelta(days=dias_desde_lunes)
-            fin_semana = inicio_semana + timedelta(days=6)  # Domingo
-            
-            inicio_rango = timezone.make_aware(
-                datetime.combine(inicio_semana, time.min),
-                timezone.get_current_timezone()
-            )
-            fin_rango = timezone.make_aware(
-                datetime.combine(fin_semana, time.max),
-                timezone.get_current_timezone()
-            )
-            
-            nombre_periodo = f"esta semana ({inicio_semana.strftime('%d/%m')} - {fin_semana.strftime('%d/%m')})"
+
+        # Pase libre (o tipo desconocido): se registra el uso sin límite
+        excedido = UsoPlan.ocupar(socio.pk, hora_inicio, UsoPlan.limites_de_plan(plan))
+        if not excedido:
+            return None
+
+        inicio = UsoPlan.periodos(hora_inicio)[excedido]
+        if excedido == 'semana':
+            fin = inicio + timedelta(days=6)  # Domingo
+            nombre_periodo = f"esta semana ({inicio.strftime('%d/%m')} - {fin.strftime('%d/%m')})"
             tipo_periodo = "semana"
-            
-        elif plan.tipo_limite == 'diario':
-            # Solo contar turnos del mismo día
-            fecha_turno_date = fecha_turno.date() if hasattr(fecha_turno, 'date') else fecha_turno
-            
-            inicio_rango = timezone.make_aware(
-                datetime.combine(fecha_turno_date, time.min),
-                timezone.get_current_timezone()
-            )
-            fin_rango = timezone.make_aware(
-                datetime.combine(fecha_turno_date, time.max),
-                timezone.get_current_timezone()
-            )
-            
-            nombre_periodo = f"hoy ({fecha_turno_date.strftime('%d/%m/%Y')})"
+        else:
+            nombre_periodo = f"hoy ({inicio.strftime('%d/%m/%Y')})"
             tipo_periodo = "día"
+
+        usados = plan.cantidad_limite
+        mensaje_error = (
+            f"❌ Límite alcanzado\n\n"
+            f"Tu plan '{plan.nombre}' permite {plan.cantidad_limite} "
+            f"{'turno' if plan.cantidad_limite == 1 else 'turnos'} por {tipo_periodo}.\n\n"
+            f"Ya tienes {usados} {'turno reservado' if usados == 1 else 'turnos reservados'} "
+            f"{nombre_periodo}."
+        )
+        logger.debug(
+            "Límite del plan alcanzado: %s, plan %s (%s %s)",
+            socio.username, plan.nombre, plan.cantidad_limite, plan.tipo_limite
+        )
+        return mensaje_error
+
+    def _obtener_franja(self, request, verificar_cupo=True):
+        """
+        Obtiene la franja futura indicada en franja_id, o la de la hora
+        indicada en hora_inicio (cualquier cupo libre de esa hora).
+        Retorna (franja, respuesta_error)
+        """
+        franja_id = request.data.get('franja_id')
+        hora_str = request.data.get('hora_inicio')
+        
+        if not franja_id and not hora_str:
+            return None, Response({
+                'detail': 'Debe proporcionar el ID de la franja horaria (franja_id) o la hora (hora_inicio)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        franjas = FranjaHoraria.objects.filter(hora_inicio__gte=timezone.now())
+        if franja_id:
+            franja = franjas.filter(pk=franja_id).first()
         else:
-            print(f"   ⚠️ Tipo de límite desconocido: {plan.tipo_limite}")
-            print("=" * 60)
-            return True, None
+            try:
+                hora_dt = self._hora_de_franja(hora_str)
+            except ValueError:
+                return None, Response({
+                    'detail': 'Formato de hora inválido. Use ISO 8601 (ej: 2026-10-20T18:00:00)'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            franja = franjas.filter(hora_inicio=hora_dt).first()
+        
+        if not franja:
+            return None, Response({
+                'detail': 'Franja horaria no encontrada'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        # Chequeo rápido; el que decide es el UPDATE condicional de _ocupar_cupo
+        if verificar_cupo and franja.cupos_disponibles <= 0:
+            return None, self._respuesta_sin_cupo()
+        
+        return franja, None
 
-        print(f"   📅 Rango: {inicio_rango} - {fin_rango}")
+    @staticmethod
+    def _hora_de_franja(hora_str):
+        """Hora ISO 8601 (local si no trae zona) llevada al inicio de su franja. Lanza ValueError"""
+        hora_dt = datetime.fromisoformat(str(hora_str).replace('Z', '+00:00'))
+        if timezone.is_naive(hora_dt):
+            hora_dt = timezone.make_aware(hora_dt, timezone.get_current_timezone())
+        # Cualquier momento dentro de la hora corresponde a esa franja
+        return hora_dt.replace(minute=0, second=0, microsecond=0)
 
-        # 4. CONTAR TURNOS YA RESERVADOS EN EL RANGO
-        turnos_ocupados = Turno.objects.filter(
-            socio=socio,
-            estado__in=['RESERVADO', 'CONFIRMADO'],
-            hora_inicio__gte=inicio_rango,
-            hora_inicio__lte=fin_rango
-        ).count()
-
-        print(f"   📊 Turnos ocupados: {turnos_ocupados}/{plan.cantidad_limite}")
-
-        # 5. VALIDAR LÍMITE
-        if turnos_ocupados >= plan.cantidad_limite:
-            mensaje_error = (
-                f"❌ Límite alcanzado\n\n"
-                f"Tu plan '{plan.nombre}' permite {plan.cantidad_limite} "
-                f"{'turno' if plan.cantidad_limite == 1 else 'turnos'} por {tipo_periodo}.\n\n"
-                f"Ya tienes {turnos_ocupados} {'turno reservado' if turnos_ocupados == 1 else 'turnos reservados'} "
-                f"{nombre_periodo}."
-            )
-            print(f"   ❌ LÍMITE ALCANZADO")
-            print("=" * 60)
-            return False, mensaje_error
+    def _respuesta_sin_cupo(self):
+        return Response({
+            'detail': 'Cupo no disponible para reserva',
+            'error_code': 'sin_cupo'
+        }, status=status.HTTP_409_CONFLICT)
+
+    def _respuesta_reintentar(self, error):
+        """
+        La base no pudo tomar el bloqueo (deadlock, lock wait timeout o
+        "database is locked" en SQLite): la transacción ya se revirtió y
+        el cliente puede repetir el pedido.
+        """
+        logger.warning("Contención en la base, se pide reintentar: %s", error)
+        return Response({
+            'detail': 'Hay muchas reservas en este momento. Intenta nuevamente en unos segundos.',
+            'error_code': 'reintentar'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+    def _ocupar_cupo(self, franja, socio):
+        """
+        Reclama un cupo de la franja (FranjaHoraria.reclamar_cupo) y crea la
+        reserva confirmada del socio. Debe llamarse dentro de transaction.atomic().
+        Retorna None si no quedaba cupo.
+        """
+        if not franja.reclamar_cupo():
+            return None
         
-        print(f"   ✅ Puede reservar (le quedan {plan.cantidad_limite - turnos_ocupados} turnos)")
-        print("=" * 60)
-        return True, None
+        turno = Turno(
+            franja=franja,
+            socio=socio,
+            hora_inicio=franja.hora_inicio,
+            estado='CONFIRMADO',
+            fecha_reserva=timezone.now()
+        )
+        try:
+            # Savepoint propio: la restricción única (franja, socio) cubre el doble click
+            with transaction.atomic():
+                turno.save()
+        except IntegrityError:
+            raise ValidationError({
+                'socio': 'Ya tienes un turno confirmado o reservado que se solapa con este horario.'
+            })
+        return turno
 
     # turnos/views.py - REEMPLAZAR LOS MÉTODOS reservar y cancelar
 
-    @action(methods=['post'], detail=True, permission_classes=[IsStaffUser])
-    def reservar_para_socio(self, request, pk=None):
+    @action(methods=['post'], detail=False, permission_classes=[IsStaffUser])
+    def reservar_para_socio(self, request):
         """Staff puede reservar turnos a nombre de un socio"""
-        turno = self.get_object()
         socio_id = request.data.get('socio_id')
         
         if not socio_id:
@@ -409,17 +449,12 @@ class TurnoViewSet(viewsets.ModelViewSet):
                 'detail': 'Socio no encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        if turno.socio is not None or turno.estado != 'DISPONIBLE':
-            return Response({
-                'detail': 'Cupo no disponible para reserva'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        franja, error = self._obtener_franja(request)
+        if error:
+            return error
         
         # Validar cuota activa del socio
-        cuota = CuotaMensual.objects.filter(
-            socio=socio,
-            estado='activa',
-            fecha_vencimiento__gte=timezone.now().date()
-        ).order_by('-fecha_vencimiento').first()
+        cuota = self._cuota_activa(socio)
 
         if not cuota:
             return Response({
@@ -434,26 +469,26 @@ class TurnoViewSet(viewsets.ModelViewSet):
                 'error_code': 'sin_clases'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validar límites del plan
-        puede_reservar, mensaje_error = self._validar_limites_plan(socio, turno.hora_inicio)
-        if not puede_reservar:
-            return Response({
-                'detail': mensaje_error,
-                'error_code': 'limite_plan'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         # Confirmar turno
-        turno.socio = socio
-        turno.estado = 'CONFIRMADO'
-        turno.fecha_reserva = timezone.now()
-        
         try:
-            turno.full_clean()
-            turno.save()
-            
-            # Descontar clase si aplica
-            if should_count:
-                cuota.descontar_clase()
+            with transaction.atomic():
+                # Límites del plan: primero la fila del socio, así un rechazo no toca la franja
+                mensaje_error = self._registrar_uso_plan(socio, cuota, franja.hora_inicio)
+                if mensaje_error:
+                    transaction.set_rollback(True)
+                    return Response({
+                        'detail': mensaje_error,
+                        'error_code': 'limite_plan'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                turno = self._ocupar_cupo(franja, socio)
+                if not turno:
+                    transaction.set_rollback(True)
+                    return self._respuesta_sin_cupo()
+                
+                # Descontar clase si aplica (si otra reserva se llevó la última, se revierte todo)
+                if should_count and not cuota.descontar_clase():
+                    raise ValidationError({'cuota': f'{socio.username} no tiene clases disponibles este mes.'})
             
         except ValidationError as e:
             return Response({'detail': e.message_dict}, status=status.HTTP_400_BAD_REQUEST)
@@ -466,9 +501,207 @@ class TurnoViewSet(viewsets.ModelViewSet):
         
         return Response({
             'detail': mensaje,
+            'turno_id': turno.id,
             'clases_restantes': cuota.clases_restantes if should_count else None
         }, status=status.HTTP_200_OK)
 
+    @action(methods=['post'], detail=False, permission_classes=[IsStaffUser])
+    def reservar_para_socios(self, request):
+        """
+        Staff reserva varios turnos de una vez (ej: un grupo de entrenamiento):
+        reservas = [{socio_id, hora_inicio o franja_id}, ...].
+        
+        Socios, cuotas, franjas, reservas existentes y uso de los planes se leen
+        para todo el lote con pocas consultas y se validan en memoria; después
+        se reclama el cupo de cada reserva. Cada ítem informa su resultado y los
+        que fallan no revierten a los demás, salvo con todo_o_nada=true.
+        """
+        reservas = request.data.get('reservas')
+        if not isinstance(reservas, list) or not reservas:
+            return Response({
+                'detail': 'Debe proporcionar la lista de reservas ([{socio_id, hora_inicio}])'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(reservas) > MAXIMO_RESERVAS_LOTE:
+            return Response({
+                'detail': f'Se pueden reservar hasta {MAXIMO_RESERVAS_LOTE} turnos por vez'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        todo_o_nada = str(request.data.get('todo_o_nada', '')).lower() in ('1', 'true')
+        
+        ahora = timezone.now()
+        resultados = []
+        pedidos = []
+        
+        def rechazar(resultado, estado, detalle):
+            resultado['estado'] = estado
+            resultado['detalle'] = detalle
+        
+        # 1. Leer los pedidos
+        for indice, reserva in enumerate(reservas):
+            resultado = {'indice': indice, 'socio_id': None, 'hora_inicio': None, 'estado': None, 'turno_id': None, 'detalle': ''}
+            resultados.append(resultado)
+            if not isinstance(reserva, dict):
+                rechazar(resultado, 'invalido', 'Cada reserva debe tener socio_id y hora_inicio (o franja_id).')
+                continue
+            try:
+                resultado['socio_id'] = int(reserva.get('socio_id'))
+                franja_id = int(reserva['franja_id']) if reserva.get('franja_id') else None
+                hora = self._hora_de_franja(reserva['hora_inicio']) if not franja_id and reserva.get('hora_inicio') else None
+            except (TypeError, ValueError):
+                rechazar(resultado, 'invalido', 'socio_id, franja_id u hora_inicio inválidos.')
+                continue
+            if not franja_id and not hora:
+                rechazar(resultado, 'invalido', 'Falta hora_inicio o franja_id.')
+                continue
+            pedidos.append((resultado, franja_id, hora))
+        
+        # 2. Socios y cuotas de todo el lote (una consulta cada uno)
+        socio_ids = {resultado['socio_id'] for resultado, _, _ in pedidos}
+        socios = {
+            socio.pk: socio
+            for socio in User.objects.filter(pk__in=socio_ids, is_active=True).select_related('perfil')
+        }
+        cuotas = {}
+        for cuota in CuotaMensual.objects.filter(
+            socio_id__in=socio_ids,
+            estado='activa',
+            fecha_vencimiento__gte=ahora.date()
+        ).select_related('plan').order_by('socio_id', '-fecha_vencimiento'):
+            cuotas.setdefault(cuota.socio_id, cuota)
+        
+        franjas = FranjaHoraria.objects.filter(
+            Q(pk__in=[franja_id for _, franja_id, _ in pedidos if franja_id])
+            | Q(hora_inicio__in=[hora for _, _, hora in pedidos if hora])
+        )
+        franjas_por_id = {franja.pk: franja for franja in franjas}
+        franjas_por_hora = {franja.hora_inicio: franja for franja in franjas_por_id.values()}
+        
+        logger.debug(
+            "Reserva en lote de %s turnos (%s socios) por %s",
+            len(resultados), len(socio_ids), request.user.username
+        )
+        
+        with transaction.atomic():
+            # 3. Validación en memoria
+            candidatos = []
+            for resultado, franja_id, hora in pedidos:
+                franja = franjas_por_id.get(franja_id) if franja_id else franjas_por_hora.get(hora)
+                if franja:
+                    resultado['hora_inicio'] = franja.hora_inicio.isoformat()
+                candidatos.append((resultado, franja))
+            
+            horas = {franja.hora_inicio for _, franja in candidatos if franja}
+            ocupadas = set(Turno.objects.filter(
+                socio_id__in=socio_ids, estado__in=ESTADOS_ACTIVOS, hora_inicio__in=horas
+            ).values_list('socio_id', 'hora_inicio'))
+            usados = UsoPlan.bloquear_varios([
+                (resultado['socio_id'], franja.hora_inicio)
+                for resultado, franja in candidatos
+                if franja and resultado['socio_id'] in cuotas
+            ])
+            cupos = {franja.pk: franja.cupos_disponibles for franja in franjas_por_id.values()}
+            clases_pedidas = Counter()
+            aceptadas = {}
+            
+            for resultado, franja in candidatos:
+                socio_id = resultado['socio_id']
+                socio = socios.get(socio_id)
+                cuota = cuotas.get(socio_id)
+                if socio is None or not hasattr(socio, 'perfil') or socio.perfil.rol != 'socio':
+                    rechazar(resultado, 'socio_invalido', 'El usuario no es un socio activo.')
+                elif franja is None:
+                    rechazar(resultado, 'sin_franja', 'No hay turnos generados para ese horario.')
+                elif franja.hora_inicio <= ahora:
+                    rechazar(resultado, 'pasado', 'El horario ya pasó.')
+                elif (socio_id, franja.hora_inicio) in ocupadas:
+                    rechazar(resultado, 'ya_reservado', f'{socio.username} ya tiene un turno en este horario.')
+                elif cuota is None:
+                    rechazar(resultado, 'sin_cuota', f'{socio.username} no tiene una cuota mensual activa.')
+                elif cupos[franja.pk] <= 0:
+                    rechazar(resultado, 'sin_cupo', 'Cupo no disponible para reserva.')
+                else:
+                    plan = cuota.plan
+                    periodos = UsoPlan.periodos(franja.hora_inicio)
+                    should_count = (plan.tipo_limite == 'semanal' and plan.cantidad_limite in (2, 3))
+                    if any(
+                        usados[(socio_id, periodo, periodos[periodo])] >= limite
+                        for periodo, limite in UsoPlan.limites_de_plan(plan).items()
+                    ):
+                        rechazar(resultado, 'limite_plan', f"El plan '{plan.nombre}' de {socio.username} no permite más turnos en ese período.")
+                    elif should_count and clases_pedidas[socio_id] >= cuota.clases_restantes:
+                        rechazar(resultado, 'sin_clases', f'{socio.username} no tiene clases disponibles este mes.')
+                    else:
+                        aceptadas.setdefault(socio_id, []).append((franja, resultado))
+                        ocupadas.add((socio_id, franja.hora_inicio))
+                        cupos[franja.pk] -= 1
+                        if should_count:
+                            clases_pedidas[socio_id] += 1
+                        for periodo, inicio in periodos.items():
+                            usados[(socio_id, periodo, inicio)] += 1
+            
+            # 4. Reclamar los cupos, un savepoint por socio (y uno por reserva)
+            for socio_id, reservas_socio in aceptadas.items():
+                socio = socios[socio_id]
+                cuota = cuotas[socio_id]
+                reservados = []
+                try:
+                    with transaction.atomic():
+                        cantidades = Counter()
+                        for franja, resultado in reservas_socio:
+                            turno = Turno(
+                                franja=franja,
+                                socio=socio,
+                                hora_inicio=franja.hora_inicio,
+                                estado='CONFIRMADO',
+                                fecha_reserva=ahora
+                            )
+                            try:
+                                with transaction.atomic():
+                                    if not franja.reclamar_cupo():
+                                        rechazar(resultado, 'sin_cupo', 'Cupo no disponible para reserva.')
+                                        continue
+                                    # Horario y solapamiento ya validados en lote
+                                    turno.save(validar=False)
+                            except IntegrityError:
+                                rechazar(resultado, 'ya_reservado', f'{socio.username} ya tiene un turno en este horario.')
+                                continue
+                            resultado['estado'] = 'reservado'
+                            resultado['turno_id'] = turno.id
+                            reservados.append(resultado)
+                            cantidades.update(UsoPlan.periodos(turno.hora_inicio).items())
+                        
+                        # Uso del plan (filas bloqueadas en el paso 3) y clases del socio de una vez
+                        should_count = (cuota.plan.tipo_limite == 'semanal' and cuota.plan.cantidad_limite in (2, 3))
+                        if not UsoPlan.sumar(socio_id, cantidades, UsoPlan.limites_de_plan(cuota.plan)) or (
+                            should_count and reservados and not cuota.descontar_clase(len(reservados))
+                        ):
+                            raise _ReservasCambiaron()
+                except _ReservasCambiaron:
+                    for resultado in reservados:
+                        resultado.update(turno_id=None)
+                        rechazar(resultado, 'conflicto', f'Las reservas de {socio.username} cambiaron mientras se procesaba el lote.')
+            
+            reservados = sum(1 for resultado in resultados if resultado['estado'] == 'reservado')
+            
+            if todo_o_nada and reservados < len(resultados):
+                transaction.set_rollback(True)
+                for resultado in resultados:
+                    if resultado['estado'] == 'reservado':
+                        resultado.update(estado='disponible', turno_id=None)
+                logger.debug("Lote revertido: %s/%s disponibles", reservados, len(resultados))
+                return Response({
+                    'detail': 'No se reservó ningún turno: algunas reservas del lote no se pueden hacer.',
+                    'reservados': 0,
+                    'resultados': resultados
+                }, status=status.HTTP_409_CONFLICT)
+        
+        logger.debug("Lote: %s/%s reservados", reservados, len(resultados))
+        
+        return Response({
+            'detail': f'{reservados} de {len(resultados)} turnos reservados.',
+            'reservados': reservados,
+            'resultados': resultados
+        }, status=status.HTTP_200_OK)
+
     @action(methods=['post'], detail=True, permission_classes=[IsStaffUser])
     def cancelar_para_socio(self, request, pk=None):
         """Staff puede cancelar turnos de cualquier socio"""
@@ -487,43 +720,38 @@ class TurnoViewSet(viewsets.ModelViewSet):
         socio = turno.socio
         socio_username = socio.username
         
-        # Devolver la clase si aplica
         cuota = CuotaMensual.objects.filter(
             socio=socio,
             estado='activa'
         ).order_by('-fecha_vencimiento').first()
+        should_count_cancel = False
         
-        if cuota:
-            should_count_cancel = (cuota.plan.tipo_limite == 'semanal' and cuota.plan.cantidad_limite in (2, 3))
-            if should_count_cancel:
-                cuota.clases_restantes += 1
-                
-                # No superar el total calculado
-                def _effective_limit_from_cuota_obj(cuota_obj):
-                    plan = cuota_obj.plan
-                    try:
-                        cantidad = int(plan.cantidad_limite)
-                    except Exception:
-                        cantidad = None
-                    nombre = (cuota_obj.plan_nombre or '')
-                    m = re.search(r"\b(\d+)x\b", nombre.lower())
-                    parsed = int(m.group(1)) if m else None
-                    return parsed or cantidad
-
-                eff = _effective_limit_from_cuota_obj(cuota)
-                if eff:
-                    max_total = eff * 4
-                    if cuota.clases_restantes > max_total:
-                        cuota.clases_restantes = max_total
+        with transaction.atomic():
+            # Liberar turno (si otro request ya lo canceló, la clase no se devuelve dos veces)
+            if not turno.liberar():
+                return Response({
+                    'detail': 'El turno ya fue cancelado'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Devolver la clase si aplica
+            if cuota:
+                should_count_cancel = (cuota.plan.tipo_limite == 'semanal' and cuota.plan.cantidad_limite in (2, 3))
+                if should_count_cancel:
+                    # No superar el total calculado
+                    def _effective_limit_from_cuota_obj(cuota_obj):
+                        plan = cuota_obj.plan
+                        try:
+                            cantidad = int(plan.cantidad_limite)
+                        except Exception:
+                            cantidad = None
+                        nombre = (cuota_obj.plan_nombre or '')
+                        m = re.search(r"\b(\d+)x\b", nombre.lower())
+                        parsed = int(m.group(1)) if m else None
+                        return parsed or cantidad
 
-                cuota.save(update_fields=['clases_restantes'])
-                print(f"✅ Clase devuelta a {socio_username}. Restantes: {cuota.clases_restantes}/{cuota.clases_totales}")
-        
-        # Liberar turno
-        turno.estado = 'DISPONIBLE'
-        turno.socio = None
-        turno.fecha_reserva = None
-        turno.save()
+                    eff = _effective_limit_from_cuota_obj(cuota)
+                    cuota.devolver_clase(eff * 4 if eff else None)
+                    print(f"✅ Clase devuelta a {socio_username}. Restantes: {cuota.clases_restantes}/{cuota.clases_totales}")
         
         mensaje = f'Turno cancelado. Cupo liberado para {socio_username}.'
         clases_totales_calculado = None
@@ -550,16 +778,15 @@ class TurnoViewSet(viewsets.ModelViewSet):
             'clases_totales_calculado': clases_totales_calculado
         }, status=status.HTTP_200_OK)
 
-    @action(methods=['post'], detail=True)
-    def reservar(self, request, pk=None):
-        """Reserva Y confirma el turno directamente + descuenta 1 clase"""
-        turno = self.get_object()
+    @action(methods=['post'], detail=False)
+    def reservar(self, request):
+        """Reserva Y confirma un cupo de la franja directamente + descuenta 1 clase"""
         user = request.user
 
-        print("="*50)
-        print(f"🔍 Turno ID: {turno.id}")
-        print(f"🔍 Usuario: {user.username} (staff={user.is_staff})")
-        print("="*50)
+        logger.debug(
+            "Reserva de %s: franja %s / hora %s",
+            user.username, request.data.get('franja_id'), request.data.get('hora_inicio')
+        )
         
         # Validar que el usuario NO sea staff
         if user.is_staff:
@@ -567,17 +794,12 @@ class TurnoViewSet(viewsets.ModelViewSet):
                 'detail': 'Los administradores y entrenadores no pueden reservar turnos.'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        if turno.socio is not None or turno.estado != 'DISPONIBLE':
-            return Response({
-                'detail': 'Cupo no disponible para reserva'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        franja, error = self._obtener_franja(request)
+        if error:
+            return error
         
         # 🆕 1. VALIDAR QUE TENGA CUOTA ACTIVA Y CLASES DISPONIBLES
-        cuota = CuotaMensual.objects.filter(
-            socio=user,
-            estado='activa',
-            fecha_vencimiento__gte=timezone.now().date()
-        ).order_by('-fecha_vencimiento').first()
+        cuota = self._cuota_activa(user)
 
         if not cuota:
             return Response({
@@ -592,37 +814,36 @@ class TurnoViewSet(viewsets.ModelViewSet):
                 'error_code': 'sin_clases'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validar límites del plan (semanal/diario)
-        puede_reservar, mensaje_error = self._validar_limites_plan(user, turno.hora_inicio)
-
-        if not puede_reservar:
-            return Response({
-                'detail': mensaje_error,
-                'error_code': 'limite_plan'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         # Confirmar directamente
-        turno.socio = user
-        turno.estado = 'CONFIRMADO'
-        turno.fecha_reserva = timezone.now()
-        
         try:
-            print("🔄 Llamando a full_clean()...")
-            turno.full_clean()
-            print("✅ full_clean() OK")
-            turno.save()
-            print("✅ save() OK")
-            
-            # 🆕 3. DESCONTAR 1 CLASE: solo para los planes semanales limitados (2x/3x)
-            if should_count:
-                cuota.descontar_clase()
-                print(f"✅ Clase descontada. Restantes: {cuota.clases_restantes}/{cuota.clases_totales}")
+            with transaction.atomic():
+                # Validar límites del plan (semanal/diario) sumando al uso del socio
+                mensaje_error = self._registrar_uso_plan(user, cuota, franja.hora_inicio)
+                if mensaje_error:
+                    transaction.set_rollback(True)
+                    return Response({
+                        'detail': mensaje_error,
+                        'error_code': 'limite_plan'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                turno = self._ocupar_cupo(franja, user)
+                if not turno:
+                    logger.debug("Cupo de la franja %s tomado por otra reserva", franja.pk)
+                    transaction.set_rollback(True)
+                    return self._respuesta_sin_cupo()
+                
+                # 🆕 3. DESCONTAR 1 CLASE: solo para los planes semanales limitados (2x/3x)
+                if should_count:
+                    if not cuota.descontar_clase():
+                        raise ValidationError({'cuota': 'No tienes clases disponibles este mes.'})
             
         except ValidationError as e:
-            print(f"❌ ValidationError: {e.message_dict}")
+            logger.debug("Reserva rechazada para %s: %s", user.username, e.message_dict)
             return Response({'detail': e.message_dict}, status=status.HTTP_400_BAD_REQUEST)
+        except OperationalError as e:
+            return self._respuesta_reintentar(e)
         except Exception as e:
-            print(f"❌ Exception: {type(e).__name__}: {str(e)}")
+            logger.exception("Error inesperado al reservar para %s", user.username)
             return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
         # 🆕 Calcular total efectivo según plan (para consistencia con frontend)
@@ -656,12 +877,200 @@ class TurnoViewSet(viewsets.ModelViewSet):
 
         resp = {
             'detail': mensaje,
+            'turno_id': turno.id,
             'clases_restantes': clases_restantes_dev if should_count else None,
             'clases_totales_calculado': clases_totales_calculado
         }
 
         return Response(resp, status=status.HTTP_200_OK)
 
+    def _ocurrencias_serie(self, request):
+        """
+        Horas de una serie semanal: dias (0=lunes ... 6=domingo), hora (ej: "19:00"),
+        semanas (1 a 8, default 4) y fecha_inicio opcional (default hoy).
+        Retorna (horas, respuesta_error)
+        """
+        dias = request.data.get('dias')
+        hora_str = str(request.data.get('hora', ''))
+        
+        try:
+            dias = sorted({int(dia) for dia in dias})
+            if not dias or not all(0 <= dia <= 6 for dia in dias):
+                raise ValueError
+        except (TypeError, ValueError):
+            return None, Response({
+                'detail': 'Debe proporcionar los días de la semana (dias), ej: [0, 2] para lunes y miércoles'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        match = re.fullmatch(r'(\d{1,2})(?::00)?', hora_str.strip())
+        if not match or int(match.group(1)) > 23:
+            return None, Response({
+                'detail': 'Debe proporcionar una hora en punto (hora), ej: "19:00"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        hora = int(match.group(1))
+        
+        try:
+            semanas = int(request.data.get('semanas', 4))
+        except (TypeError, ValueError):
+            semanas = 0
+        if not 1 <= semanas <= 8:
+            return None, Response({
+                'detail': 'La cantidad de semanas debe estar entre 1 y 8'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        fecha_inicio = timezone.localdate()
+        if request.data.get('fecha_inicio'):
+            try:
+                fecha_inicio = max(
+                    datetime.strptime(request.data['fecha_inicio'], '%Y-%m-%d').date(),
+                    fecha_inicio
+                )
+            except ValueError:
+                return None, Response({
+                    'detail': 'Formato de fecha inválido. Use YYYY-MM-DD'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        tz = timezone.get_current_timezone()
+        horas = []
+        for offset in range(semanas * 7):
+            fecha = fecha_inicio + timedelta(days=offset)
+            if fecha.weekday() in dias:
+                horas.append(timezone.make_aware(datetime.combine(fecha, time(hora)), tz))
+        return horas, None
+
+    @action(methods=['post'], detail=False)
+    def reservar_serie(self, request):
+        """
+        Reserva la misma hora en varios días de las próximas semanas
+        (ej: lunes y miércoles 19:00 durante 4 semanas) en una sola transacción.
+        
+        Cuota, límites del plan, clases y reservas existentes se validan para
+        todas las ocurrencias con unas pocas consultas; después se reclama el
+        cupo de cada una. Cada ocurrencia informa su resultado. Con
+        todo_o_nada=true, si alguna no se puede reservar no se reserva ninguna.
+        """
+        user = request.user
+        
+        if user.is_staff:
+            return Response({
+                'detail': 'Los administradores y entrenadores no pueden reservar turnos.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        horas, error = self._ocurrencias_serie(request)
+        if error:
+            return error
+        todo_o_nada = str(request.data.get('todo_o_nada', '')).lower() in ('1', 'true')
+        
+        cuota = self._cuota_activa(user)
+        if not cuota:
+            return Response({
+                'detail': 'No tienes una cuota mensual activa. Por favor, regulariza tu situación para reservar turnos.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        plan = cuota.plan
+        limites = UsoPlan.limites_de_plan(plan)
+        should_count = (plan.tipo_limite == 'semanal' and plan.cantidad_limite in (2, 3))
+        ahora = timezone.now()
+        
+        logger.debug("Serie de %s turnos para %s (plan %s)", len(horas), user.username, plan.nombre)
+        
+        ocurrencias = [{'hora_inicio': hora.isoformat(), 'estado': None, 'turno_id': None, 'detalle': ''} for hora in horas]
+        
+        def rechazar(ocurrencia, estado, detalle):
+            ocurrencia['estado'] = estado
+            ocurrencia['detalle'] = detalle
+        
+        with transaction.atomic():
+            # 1. Validación en lote: franjas, reservas del socio y uso del plan
+            franjas = {franja.hora_inicio: franja for franja in FranjaHoraria.objects.filter(hora_inicio__in=horas)}
+            ocupadas = set(Turno.objects.filter(
+                socio=user, estado__in=ESTADOS_ACTIVOS, hora_inicio__in=horas
+            ).values_list('hora_inicio', flat=True))
+            usados = UsoPlan.bloquear(user.pk, horas)
+            
+            aceptadas = []
+            for hora, ocurrencia in zip(horas, ocurrencias):
+                franja = franjas.get(hora)
+                if hora <= ahora:
+                    rechazar(ocurrencia, 'pasado', 'El horario ya pasó.')
+                elif franja is None:
+                    rechazar(ocurrencia, 'sin_franja', 'No hay turnos generados para ese horario.')
+                elif hora in ocupadas:
+                    rechazar(ocurrencia, 'ya_reservado', 'Ya tienes un turno en este horario.')
+                elif franja.cupos_disponibles <= 0:
+                    rechazar(ocurrencia, 'sin_cupo', 'Cupo no disponible para reserva.')
+                elif any(
+                    usados[(periodo, UsoPlan.periodos(hora)[periodo])] >= limite
+                    for periodo, limite in limites.items()
+                ):
+                    rechazar(ocurrencia, 'limite_plan', f"Tu plan '{plan.nombre}' no permite más turnos en ese período.")
+                elif should_count and len(aceptadas) >= cuota.clases_restantes:
+                    rechazar(ocurrencia, 'sin_clases', 'No te quedan clases disponibles este mes.')
+                else:
+                    aceptadas.append((franja, ocurrencia))
+                    for clave in UsoPlan.periodos(hora).items():
+                        usados[clave] += 1
+            
+            # 2. Reclamar el cupo de cada ocurrencia válida (cada una con su savepoint)
+            cantidades = Counter()
+            for franja, ocurrencia in aceptadas:
+                turno = Turno(
+                    franja=franja,
+                    socio=user,
+                    hora_inicio=franja.hora_inicio,
+                    estado='CONFIRMADO',
+                    fecha_reserva=ahora
+                )
+                try:
+                    with transaction.atomic():
+                        if not franja.reclamar_cupo():
+                            rechazar(ocurrencia, 'sin_cupo', 'Cupo no disponible para reserva.')
+                            continue
+                        # Horario y solapamiento ya validados en lote
+                        turno.save(validar=False)
+                except IntegrityError:
+                    rechazar(ocurrencia, 'ya_reservado', 'Ya tienes un turno en este horario.')
+                    continue
+                ocurrencia['estado'] = 'reservado'
+                ocurrencia['turno_id'] = turno.id
+                cantidades.update(UsoPlan.periodos(turno.hora_inicio).items())
+            
+            reservados = sum(1 for ocurrencia in ocurrencias if ocurrencia['estado'] == 'reservado')
+            
+            if todo_o_nada and reservados < len(ocurrencias):
+                transaction.set_rollback(True)
+                for ocurrencia in ocurrencias:
+                    if ocurrencia['estado'] == 'reservado':
+                        ocurrencia.update(estado='disponible', turno_id=None)
+                logger.debug("Serie revertida: %s/%s disponibles", reservados, len(ocurrencias))
+                return Response({
+                    'detail': 'No se reservó ningún turno: algunas fechas de la serie no están disponibles.',
+                    'reservados': 0,
+                    'ocurrencias': ocurrencias
+                }, status=status.HTTP_409_CONFLICT)
+            
+            # 3. Uso del plan y clases de una sola vez (filas ya bloqueadas en el paso 1)
+            if not UsoPlan.sumar(user.pk, cantidades, limites) or (
+                should_count and reservados and not cuota.descontar_clase(reservados)
+            ):
+                transaction.set_rollback(True)
+                return Response({
+                    'detail': 'Tus reservas cambiaron mientras se procesaba la serie. Inténtalo nuevamente.'
+                }, status=status.HTTP_409_CONFLICT)
+        
+        logger.debug("Serie: %s/%s reservados", reservados, len(ocurrencias))
+        
+        mensaje = f'{reservados} de {len(ocurrencias)} turnos reservados.'
+        if should_count:
+            mensaje += f' Te quedan {cuota.clases_restantes} clases este mes.'
+        
+        return Response({
+            'detail': mensaje,
+            'reservados': reservados,
+            'ocurrencias': ocurrencias,
+            'clases_restantes': cuota.clases_restantes if should_count else None
+        }, status=status.HTTP_200_OK)
+
     @action(methods=['post'], detail=True)
     def cancelar(self, request, pk=None):
         """Cancela el turno si falta más de 1 hora + DEVUELVE la clase"""
@@ -680,42 +1089,41 @@ class TurnoViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         if turno.estado in ['RESERVADO', 'CONFIRMADO']:
-            # 🆕 DEVOLVER LA CLASE (solo para planes semanales limitados)
             cuota = CuotaMensual.objects.filter(
                 socio=user,
                 estado='activa'
             ).order_by('-fecha_vencimiento').first()
+            should_count_cancel = False
             
-            if cuota:
-                should_count_cancel = (cuota.plan.tipo_limite == 'semanal' and cuota.plan.cantidad_limite in (2, 3))
-                if should_count_cancel:
-                    cuota.clases_restantes += 1
-                    # No superar el total calculado (usar misma regla que en reservar)
-                    # Calcular effective limit
-                    def _effective_limit_from_cuota_obj(cuota_obj):
-                        plan = cuota_obj.plan
-                        try:
-                            cantidad = int(plan.cantidad_limite)
-                        except Exception:
-                            cantidad = None
-                        nombre = (cuota_obj.plan_nombre or '')
-                        m = re.search(r"\b(\d+)x\b", nombre.lower())
-                        parsed = int(m.group(1)) if m else None
-                        return parsed or cantidad
-
-                    eff = _effective_limit_from_cuota_obj(cuota)
-                    if eff:
-                        max_total = eff * 4
-                        if cuota.clases_restantes > max_total:
-                            cuota.clases_restantes = max_total
+            try:
+                with transaction.atomic():
+                    # Si otro request ya lo canceló, la clase no se devuelve dos veces
+                    if not turno.liberar():
+                        return Response({
+                            'detail': 'El turno ya fue cancelado'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+                
+                    # 🆕 DEVOLVER LA CLASE (solo para planes semanales limitados)
+                    if cuota:
+                        should_count_cancel = (cuota.plan.tipo_limite == 'semanal' and cuota.plan.cantidad_limite in (2, 3))
+                        if should_count_cancel:
+                            # No superar el total calculado (usar misma regla que en reservar)
+                            def _effective_limit_from_cuota_obj(cuota_obj):
+                                plan = cuota_obj.plan
+                                try:
+                                    cantidad = int(plan.cantidad_limite)
+                                except Exception:
+                                    cantidad = None
+                                nombre = (cuota_obj.plan_nombre or '')
+                                m = re.search(r"\b(\d+)x\b", nombre.lower())
+                                parsed = int(m.group(1)) if m else None
+                                return parsed or cantidad
 
-                    cuota.save(update_fields=['clases_restantes'])
-                    print(f"✅ Clase devuelta. Restantes: {cuota.clases_restantes}/{cuota.clases_totales}")
-            
-            turno.estado = 'DISPONIBLE'
-            turno.socio = None
-            turno.fecha_reserva = None
-            turno.save()
+                            eff = _effective_limit_from_cuota_obj(cuota)
+                            cuota.devolver_clase(eff * 4 if eff else None)
+                            print(f"✅ Clase devuelta. Restantes: {cuota.clases_restantes}/{cuota.clases_totales}")
+            except OperationalError as e:
+                return self._respuesta_reintentar(e)
             
             mensaje = 'Turno cancelado, cupo liberado.'
             clases_totales_calculado = None
@@ -748,10 +1156,293 @@ class TurnoViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], url_path='mis_turnos', permission_classes=[IsAuthenticated])
     def mis_turnos(self, request):
-        """Devuelve los turnos del usuario autenticado"""
-        turnos = Turno.objects.filter(socio=request.user).order_by('hora_inicio')
-        serializer = self.get_serializer(turnos, many=True)
-        return Response(serializer.data)
+        """
+        Turnos del usuario autenticado, paginados por cursor:
+        - scope=upcoming (default): reservas activas desde ahora, de la más próxima
+        - scope=past: turnos que ya empezaron, del más reciente (los de los últimos
+          TURNOS_ARCHIVAR_DESPUES_DE_DIAS días; los anteriores están archivados)
+        - formato=compacto: solo id, franja_id, hora_inicio, hora_fin y estado
+        - page_size (default 20, máx 100) y cursor (del link 'next')
+        """
+        scope = request.query_params.get('scope', 'upcoming')
+        if scope not in ('upcoming', 'past'):
+            return Response({
+                'detail': 'El parámetro "scope" debe ser "upcoming" o "past"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Cada página / scope / formato tiene su propio ETag
+        etag, modificado = validadores(request.user, f'mis_turnos:{request.query_params.urlencode()}')
+        no_modificado = respuesta_no_modificada(request, etag, modificado)
+        if no_modificado:
+            return no_modificado
+        
+        ahora = timezone.now()
+        turnos = Turno.objects.filter(socio=request.user)
+        if scope == 'upcoming':
+            turnos = turnos.filter(estado__in=ESTADOS_ACTIVOS, hora_inicio__gte=ahora)
+        else:
+            turnos = turnos.filter(hora_inicio__lt=ahora)
+        
+        compacto = request.query_params.get('formato') == 'compacto'
+        if compacto:
+            turnos = turnos.values('id', 'franja_id', 'hora_inicio', 'estado')
+        else:
+            turnos = turnos.select_related('socio')
+        
+        paginador = MisTurnosPagination()
+        pagina = paginador.paginate_queryset(turnos, request, view=self)
+        
+        if compacto:
+            datos = [
+                {
+                    'id': turno['id'],
+                    'franja_id': turno['franja_id'],
+                    'hora_inicio': turno['hora_inicio'].isoformat(),
+                    'hora_fin': (turno['hora_inicio'] + timedelta(hours=1)).isoformat(),
+                    'estado': Turno.calcular_estado(turno['estado'], turno['hora_inicio'], ahora),
+                }
+                for turno in pagina
+            ]
+        else:
+            datos = self.get_serializer(pagina, many=True).data
+        
+        return agregar_validadores(paginador.get_paginated_response(datos), etag, modificado)
+    
+    @action(methods=['get'], detail=False, url_path='lista_espera')
+    def lista_espera(self, request):
+        """Horarios en los que el socio está anotado en lista de espera, con su posición"""
+        entradas = ListaEspera.con_posicion(
+            ListaEspera.objects.filter(
+                socio=request.user,
+                franja__hora_inicio__gt=timezone.now()
+            )
+        ).select_related('franja').order_by('franja__hora_inicio')
+        
+        return Response([
+            {
+                'id': entrada.id,
+                'franja_id': entrada.franja_id,
+                'hora_inicio': entrada.franja.hora_inicio.isoformat(),
+                'posicion': entrada.posicion_actual,
+                'creado': entrada.creado.isoformat(),
+            }
+            for entrada in entradas
+        ])
+
+    @action(methods=['post'], detail=False)
+    def unirse_lista_espera(self, request):
+        """Anota al socio en la lista de espera de una hora sin cupos"""
+        user = request.user
+        
+        if user.is_staff:
+            return Response({
+                'detail': 'Los administradores y entrenadores no pueden anotarse en listas de espera.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        franja, error = self._obtener_franja(request, verificar_cupo=False)
+        if error:
+            return error
+        
+        if franja.cupos_disponibles > 0:
+            return Response({
+                'detail': 'Este horario tiene cupos disponibles: puedes reservarlo directamente.',
+                'error_code': 'hay_cupo'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not self._cuota_activa(user):
+            return Response({
+                'detail': 'No tienes una cuota mensual activa. Por favor, regulariza tu situación para reservar turnos.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if Turno.objects.filter(franja=franja, socio=user).exists():
+            return Response({
+                'detail': 'Ya tienes un turno en este horario.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            with transaction.atomic():
+                entrada = ListaEspera.objects.create(franja=franja, socio=user)
+                registrar_evento(user.pk, franja.hora_inicio, 'alta')
+        except IntegrityError:
+            return Response({
+                'detail': 'Ya estás en la lista de espera de este horario.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Por si se liberó un cupo mientras se anotaba
+        avisar_cupo_liberado(franja.pk)
+        
+        posicion = entrada.posicion()
+        return Response({
+            'detail': f'Te anotaste en la lista de espera. Estás en la posición {posicion}. '
+                      f'Si se libera un cupo, el turno se confirma automáticamente.',
+            'lista_espera_id': entrada.id,
+            'posicion': posicion
+        }, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=False)
+    def salir_lista_espera(self, request):
+        """Quita al socio de la lista de espera de una hora"""
+        franja_id = request.data.get('franja_id')
+        if not franja_id:
+            return Response({
+                'detail': 'Debe proporcionar el ID de la franja horaria (franja_id)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            entrada = ListaEspera.objects.select_related('franja').filter(
+                franja_id=franja_id, socio=request.user
+            ).first()
+            if not entrada:
+                return Response({
+                    'detail': 'No estás en la lista de espera de este horario.'
+                }, status=status.HTTP_404_NOT_FOUND)
+            entrada.delete()
+            registrar_evento(request.user.pk, entrada.franja.hora_inicio, 'baja')
+        
+        return Response({'detail': 'Saliste de la lista de espera.'}, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], detail=False, url_path='eventos_lista_espera')
+    def eventos_lista_espera(self, request):
+        """
+        Eventos de lista de espera del socio posteriores a ?desde=<id>
+        (el frontend guarda el último id recibido y consulta los nuevos)
+        """
+        try:
+            desde = int(request.query_params.get('desde', 0))
+        except ValueError:
+            return Response({
+                'detail': 'El parámetro "desde" debe ser un número'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        eventos = EventoListaEspera.objects.filter(
+            socio=request.user, id__gt=desde
+        ).order_by('id')[:50]
+        
+        return Response([
+            {
+                'id': evento.id,
+                'tipo': evento.tipo,
+                'hora_inicio': evento.hora_inicio.isoformat(),
+                'detalle': evento.detalle,
+                'turno_id': evento.turno_id,
+                'creado': evento.creado.isoformat(),
+            }
+            for evento in eventos
+        ])
+    
+    @action(methods=['get'], detail=False)
+    def token_checkin(self, request):
+        """QR firmado para entrar por el kiosco: id del socio y de su cuota activa, con vencimiento"""
+        cuota = self._cuota_activa(request.user)
+        if not cuota:
+            return Response({
+                'detail': 'No tienes una cuota mensual activa.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        vigencia = vigencia_token()
+        return Response({
+            'token': generar_token(request.user.id, cuota.id),
+            'vence': (timezone.now() + timedelta(seconds=vigencia)).isoformat(),
+            'vigencia_segundos': vigencia,
+        })
+    
+    @action(methods=['post'], detail=False)
+    def checkin(self, request):
+        """
+        Kiosco de la entrada (staff): recibe el QR del socio y registra su
+        ingreso al turno de ahora. La firma se verifica sin consultas y el
+        turno se busca con una sola; el ingreso se guarda en el próximo lote.
+        """
+        try:
+            socio_id, cuota_id = leer_token(request.data.get('token') or '')
+        except TokenInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ahora = timezone.now()
+        turno = buscar_turno(socio_id, cuota_id, ahora)
+        if turno is None:
+            return Response({
+                'detail': 'El socio no tiene un turno reservado para esta hora.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if not turno['cuota_activa']:
+            return Response({
+                'detail': 'La cuota del socio no está activa.',
+                'socio': turno['socio__username']
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        ingreso = turno['ingreso'] or registro_ingresos.pendiente(turno['id'])
+        ya_registrado = ingreso is not None
+        if not ya_registrado:
+            ingreso = registro_ingresos.agregar(turno['id'], ahora)
+        
+        return Response({
+            'detail': 'Ingreso ya registrado' if ya_registrado else 'Ingreso registrado',
+            'ya_registrado': ya_registrado,
+            'turno_id': turno['id'],
+            'hora_inicio': turno['hora_inicio'].isoformat(),
+            'socio': turno['socio__username'],
+            'socio_id': socio_id,
+            'ingreso': ingreso.isoformat(),
+        })
+    
+    @action(methods=['get'], detail=False)
+    def asistencia_socios(self, request):
+        """
+        Contadores de asistencias y ausencias por socio (staff), de más a menos
+        ausencias. Filtros opcionales: socio_id y minimo_ausencias.
+        """
+        contadores = AsistenciaSocio.objects.select_related('socio').order_by('-ausencias', 'socio_id')
+        
+        socio_id = request.query_params.get('socio_id')
+        if socio_id:
+            contadores = contadores.filter(socio_id=socio_id)
+        
+        minimo = request.query_params.get('minimo_ausencias')
+        if minimo:
+            try:
+                contadores = contadores.filter(ausencias__gte=int(minimo))
+            except ValueError:
+                return Response({
+                    'detail': 'minimo_ausencias debe ser un número'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response([
+            {
+                'socio_id': contador.socio_id,
+                'socio': contador.socio.username,
+                'asistencias': contador.asistencias,
+                'ausencias': contador.ausencias,
+                'ultima_ausencia': contador.ultima_ausencia.isoformat() if contador.ultima_ausencia else None,
+            }
+            for contador in contadores
+        ])
+    
+    @action(methods=['get'], detail=False)
+    def ocupacion(self, request):
+        """
+        Estadísticas de ocupación (staff): mapa de calor por día de la semana y
+        hora, y tendencia semanal. Parámetros: fecha_desde y fecha_hasta
+        (YYYY-MM-DD, por defecto las últimas 12 semanas). Se arman con la tabla
+        que actualiza `manage.py actualizar_ocupacion`.
+        """
+        hoy = timezone.localdate()
+        try:
+            fecha_hasta = datetime.strptime(request.query_params['fecha_hasta'], '%Y-%m-%d').date() \
+                if request.query_params.get('fecha_hasta') else hoy
+            fecha_desde = datetime.strptime(request.query_params['fecha_desde'], '%Y-%m-%d').date() \
+                if request.query_params.get('fecha_desde') else fecha_hasta - timedelta(weeks=12)
+        except ValueError:
+            return Response({
+                'detail': 'Formato de fecha inválido. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if fecha_desde > fecha_hasta:
+            return Response({
+                'detail': 'fecha_desde debe ser anterior a fecha_hasta'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(resumen_ocupacion(fecha_desde, fecha_hasta))
     
     @action(methods=['get'], detail=False, url_path='historial')
     def historial_dia(self, request):
@@ -788,26 +1479,98 @@ class TurnoViewSet(viewsets.ModelViewSet):
             timezone.get_current_timezone()
         )
         
-        # ✅ CORREGIDO: Obtener todos los turnos que tienen socio asignado (están confirmados)
-        turnos = Turno.objects.filter(
-            hora_inicio__gte=inicio_dia,
-            hora_inicio__lte=fin_dia,
-            socio__isnull=False  # ✅ Si tiene socio, está confirmado
-        ).select_related('socio').order_by('hora_inicio')
+        # ✅ Turnos con socio asignado, de la tabla de turnos y de los archivados
+        turnos = asistencias(inicio_dia, fin_dia)
         
         # Serializar datos
+        ahora = timezone.now()
         turnos_data = []
         for turno in turnos:
             turnos_data.append({
-                'id': turno.id,
-                'hora_inicio': turno.hora_inicio,
-                'socio': turno.socio.username if turno.socio else None,
-                'socio_id': turno.socio.id if turno.socio else None,
-                'estado': turno.estado
+                'id': turno['id'],
+                'hora_inicio': turno['hora_inicio'],
+                'socio': turno['socio'],
+                'socio_id': turno['socio_id'],
+                'estado': Turno.calcular_estado(turno['estado'], turno['hora_inicio'], ahora)
             })
         
         return Response({
             'fecha': fecha_str,
             'total_confirmados': len(turnos_data),  # ✅ Todos los que tienen socio
             'turnos': turnos_data
-        })
\ No newline at end of file
+        })
+
+
+def _usuario_desde_token(request):
+    """
+    EventSource no permite enviar headers, así que el JWT llega en ?token=.
+    Retorna el usuario o None (anónimo / token inválido).
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+    token = request.GET.get('token')
+    if not token:
+        return None
+    autenticacion = JWTAuthentication()
+    try:
+        return autenticacion.get_user(autenticacion.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def eventos_turnos(request):
+    """
+    Stream de Server-Sent Events con los cambios de disponibilidad.
+
+    - canal=calendario (default): eventos 'cupos' y 'recargar' del rango
+      fecha_inicio..fecha_fin (YYYY-MM-DD, default la semana desde hoy).
+    - canal=agenda (solo staff): además eventos 'agenda' con las altas y
+      bajas de reservas del día indicado en fecha (default hoy).
+
+    Necesita un servidor ASGI (ej: uvicorn backend.asgi:application).
+    """
+    if 'wsgi.version' in request.META:
+        return JsonResponse({
+            'detail': 'Los eventos en vivo requieren el servidor ASGI (backend.asgi).'
+        }, status=501)
+
+    canal = request.GET.get('canal', 'calendario')
+    if canal not in ('calendario', 'agenda'):
+        return JsonResponse({'detail': 'Canal inválido. Use calendario o agenda'}, status=400)
+
+    user = await sync_to_async(_usuario_desde_token)(request)
+    if canal == 'agenda' and not (user and user.is_staff):
+        return JsonResponse({'detail': 'No tienes permisos para ver la agenda'}, status=403)
+
+    try:
+        if canal == 'agenda':
+            fecha_desde = fecha_hasta = datetime.strptime(
+                request.GET.get('fecha', timezone.localdate().isoformat()), '%Y-%m-%d'
+            ).date()
+        else:
+            fecha_desde = datetime.strptime(
+                request.GET.get('fecha_inicio', timezone.localdate().isoformat()), '%Y-%m-%d'
+            ).date()
+            fecha_hasta = datetime.strptime(
+                request.GET.get('fecha_fin', (fecha_desde + timedelta(days=6)).isoformat()), '%Y-%m-%d'
+            ).date()
+    except ValueError:
+        return JsonResponse({'detail': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=400)
+
+    tipos = {'cupos', 'recargar', 'agenda'} if canal == 'agenda' else {'cupos', 'recargar'}
+
+    async def stream():
+        yield 'retry: 5000\n\n'
+        async for eventos in obtener_broker().escuchar(fecha_desde.isoformat(), fecha_hasta.isoformat()):
+            eventos = [evento for evento in eventos if evento['tipo'] in tipos]
+            if not eventos:
+                yield ': latido\n\n'
+                continue
+            for evento in eventos:
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento['datos'])}\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
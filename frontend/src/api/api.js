@@ -112,18 +112,42 @@ const api = {
     return response.data;
   },
 
-  listarCuotas: async () => {
-    const response = await apiClient.get('/cuotas/cuota_mensual/');
+  // Filtros opcionales: { estado_calculado: 'activa' | 'por_vencer' | 'vencida', ordering: 'dias_restantes' | '-dias_restantes' }
+  listarCuotas: async (filtros = {}) => {
+    const response = await apiClient.get('/cuotas/cuota_mensual/', { params: filtros });
     return response.data;
   },
 
-  listarCuotasActivas: async () => {
-    const response = await apiClient.get('/cuotas/cuota_mensual/cuotas_activas/');
+  // 🆕 Listado paginado por cursor. filtros: { page_size, cursor, ultima, search, estado, plan,
+  // vence_desde, vence_hasta, estado_calculado, ordering }. Devuelve { results, next, previous, planes }
+  listarCuotasPaginadas: async (filtros = {}) => {
+    const response = await apiClient.get('/cuotas/cuota_mensual/', {
+      params: { page_size: 50, ...filtros }
+    });
+    return response.data;
+  },
+
+  // 🆕 { total, activas, por_vencer, vencidas } con los mismos filtros del listado
+  obtenerResumenCuotas: async (filtros = {}) => {
+    const response = await apiClient.get('/cuotas/cuota_mensual/resumen/', { params: filtros });
+    return response.data;
+  },
+
+  listarCuotasActivas: async (filtros = {}) => {
+    const response = await apiClient.get('/cuotas/cuota_mensual/cuotas_activas/', { params: filtros });
     return response.data;
   },
 
-  listarCuotasVencidas: async () => {
-    const response = await apiClient.get('/cuotas/cuota_mensual/cuotas_vencidas/');
+  listarCuotasVencidas: async (filtros = {}) => {
+    const response = await apiClient.get('/cuotas/cuota_mensual/cuotas_vencidas/', { params: filtros });
+    return response.data;
+  },
+
+  // 🆕 Cuotas que vencen en los próximos días, las más próximas primero
+  listarCuotasPorVencer: async () => {
+    const response = await apiClient.get('/cuotas/cuota_mensual/cuotas_activas/', {
+      params: { estado_calculado: 'por_vencer', ordering: 'dias_restantes' }
+    });
     return response.data;
   },
 
@@ -361,31 +385,131 @@ const api = {
     return response.data;
   },
 
+  // 🆕 Mismo calendario por columnas: { formato, estados, socios: { id, username }, dias: [...] }
+  obtenerCalendarioCompacto: async (fechaInicio, fechaFin) => {
+    const response = await apiClient.get('/turnos/turno/calendario/', {
+      params: { fecha_inicio: fechaInicio, fecha_fin: fechaFin, formato: 'compacto' }
+    });
+    return response.data;
+  },
+
+  // 🆕 Cambios de cupos en vivo (Server-Sent Events). Devuelve el EventSource para cerrarlo.
+  suscribirEventosTurnos: (fechaInicio, fechaFin, { onCupos, onRecargar }) => {
+    const params = new URLSearchParams({ fecha_inicio: fechaInicio, fecha_fin: fechaFin });
+    const token = localStorage.getItem('access_token');
+    if (token) params.append('token', token);
+
+    const fuente = new EventSource(`${apiClient.defaults.baseURL}/turnos/eventos/?${params}`);
+    fuente.addEventListener('cupos', (e) => onCupos(JSON.parse(e.data)));
+    fuente.addEventListener('recargar', () => onRecargar());
+    return fuente;
+  },
+
   // ✅ AGREGADO: Endpoint para obtener turnos del socio actual
-  obtenerMisTurnos: async () => {
-    const response = await apiClient.get('/turnos/turno/mis_turnos/');
+  // Paginado por cursor: { scope: 'upcoming' | 'past', formato: 'compacto', page_size, cursor }
+  // Devuelve { results, next, previous }
+  obtenerMisTurnos: async (params = {}) => {
+    const response = await apiClient.get('/turnos/turno/mis_turnos/', { params });
+    return response.data;
+  },
+
+  reservarTurno: async (franjaId) => {
+    const response = await apiClient.post('/turnos/turno/reservar/', {
+      franja_id: franjaId
+    });
     return response.data;
   },
 
-  reservarTurno: async (turnoId) => {
-    const response = await apiClient.post(`/turnos/turno/${turnoId}/reservar/`);
+  // 🆕 Serie semanal: misma hora en varios días (0=lunes) durante N semanas
+  reservarSerie: async ({ dias, hora, semanas = 4, fechaInicio, todoONada = false }) => {
+    const response = await apiClient.post('/turnos/turno/reservar_serie/', {
+      dias,
+      hora,
+      semanas,
+      fecha_inicio: fechaInicio,
+      todo_o_nada: todoONada
+    });
     return response.data;
   },
 
   // Staff reserva turno a nombre de un socio
-  reservarTurnoParaSocio: async (turnoId, socioId) => {
-    const response = await apiClient.post(`/turnos/turno/${turnoId}/reservar_para_socio/`, {
+  reservarTurnoParaSocio: async (franjaId, socioId) => {
+    const response = await apiClient.post('/turnos/turno/reservar_para_socio/', {
+      franja_id: franjaId,
       socio_id: socioId
     });
     return response.data;
   },
 
+  // Staff reserva varios turnos de una vez: [{ socio_id, hora_inicio | franja_id }]
+  reservarTurnosParaSocios: async (reservas, todoONada = false) => {
+    const response = await apiClient.post('/turnos/turno/reservar_para_socios/', {
+      reservas,
+      todo_o_nada: todoONada
+    });
+    return response.data;
+  },
+
   // Staff cancela turno de un socio
   cancelarTurnoParaSocio: async (turnoId) => {
     const response = await apiClient.post(`/turnos/turno/${turnoId}/cancelar_para_socio/`);
     return response.data;
   },
 
+  // 🆕 Lista de espera de horas completas
+  obtenerListaEspera: async () => {
+    const response = await apiClient.get('/turnos/turno/lista_espera/');
+    return response.data;
+  },
+
+  unirseListaEspera: async (franjaId) => {
+    const response = await apiClient.post('/turnos/turno/unirse_lista_espera/', {
+      franja_id: franjaId
+    });
+    return response.data;
+  },
+
+  salirListaEspera: async (franjaId) => {
+    const response = await apiClient.post('/turnos/turno/salir_lista_espera/', {
+      franja_id: franjaId
+    });
+    return response.data;
+  },
+
+  // Eventos (alta, baja, promovido, descartado) posteriores al id indicado
+  obtenerEventosListaEspera: async (desde = 0) => {
+    const response = await apiClient.get('/turnos/turno/eventos_lista_espera/', {
+      params: { desde }
+    });
+    return response.data;
+  },
+
+  // 🆕 QR firmado para el kiosco de la entrada (vence en vigencia_segundos)
+  obtenerTokenCheckin: async () => {
+    const response = await apiClient.get('/turnos/turno/token_checkin/');
+    return response.data;
+  },
+
+  // Kiosco (staff): registra el ingreso del socio con el token leído del QR
+  registrarCheckin: async (token) => {
+    const response = await apiClient.post('/turnos/turno/checkin/', { token });
+    return response.data;
+  },
+
+  // Staff: asistencias y ausencias por socio ({ socio_id, minimo_ausencias } opcionales)
+  obtenerAsistenciaSocios: async (params = {}) => {
+    const response = await apiClient.get('/turnos/turno/asistencia_socios/', { params });
+    return response.data;
+  },
+
+  // Staff: mapa de calor de ocupación (día x hora) y tendencia semanal
+  obtenerOcupacion: async (fechaDesde, fechaHasta) => {
+    const response = await apiClient.get('/turnos/turno/ocupacion/', {
+      params: { fecha_desde: fechaDesde, fecha_hasta: fechaHasta }
+    });
+    return response.data;
+  },
+
   confirmarTurno: async (turnoId) => {
     const response = await apiClient.post(`/turnos/turno/${turnoId}/confirmar/`);
     return response.data;
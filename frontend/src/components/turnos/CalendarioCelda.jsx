@@ -3,6 +3,9 @@
 import React from 'react';
 import moment from 'moment';
 
+// Turnos que ya pasaron (marcar_asistencias los pasa a ASISTIO o AUSENTE)
+const ESTADOS_CERRADOS = ['FINALIZADO', 'ASISTIO', 'AUSENTE'];
+
 const CalendarioCelda = ({ fecha, hora, horarioData, user, onAbrirModal }) => {
     
     const getCeldaInfo = () => {
@@ -51,10 +54,10 @@ const CalendarioCelda = ({ fecha, hora, horarioData, user, onAbrirModal }) => {
                 };
             }
 
-            // 🔹 SOCIOS: Solo ven "Ver asistencia" si tienen turno FINALIZADO
+            // 🔹 SOCIOS: Solo ven "Ver asistencia" si tienen turno cerrado (FINALIZADO/ASISTIO/AUSENTE)
             const turnos = horarioData.turnos || [];
             const usuarioAsistio = turnos.some(
-                t => t.es_mio && t.estado === 'FINALIZADO'
+                t => t.es_mio && ESTADOS_CERRADOS.includes(t.estado)
             );
 
             if (usuarioAsistio) {
@@ -97,10 +100,10 @@ const CalendarioCelda = ({ fecha, hora, horarioData, user, onAbrirModal }) => {
                 };
             }
 
-            // 🔹 SOCIOS: Solo ven "Ver asistencia" si tienen turno FINALIZADO
+            // 🔹 SOCIOS: Solo ven "Ver asistencia" si tienen turno cerrado (FINALIZADO/ASISTIO/AUSENTE)
             const turnos = horarioData.turnos || [];
             const usuarioAsistio = turnos.some(
-                t => t.es_mio && t.estado === 'FINALIZADO'
+                t => t.es_mio && ESTADOS_CERRADOS.includes(t.estado)
             );
 
             if (usuarioAsistio) {
@@ -1,6 +1,6 @@
 // frontend/src/components/turnos/CalendarioTurnos.jsx
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../../context/AuthContext';
 import moment from 'moment';
 import 'moment/locale/es';
@@ -33,6 +33,77 @@ const CalendarioTurnos = ({ isStaff, onEditar }) => {
         fetchCalendario();
     }, [semanaInicio]);
 
+    // 🆕 Actualizar los cupos en vivo en lugar de volver a pedir el calendario
+    useEffect(() => {
+        if (typeof EventSource === 'undefined') return;
+
+        const fechaInicio = semanaInicio.format('YYYY-MM-DD');
+        const fechaFin = semanaInicio.clone().add(6, 'days').format('YYYY-MM-DD');
+
+        const fuente = api.suscribirEventosTurnos(fechaInicio, fechaFin, {
+            onCupos: (cambio) => {
+                setCalendarioData(prev => prev.map(dia => dia.fecha !== cambio.fecha ? dia : {
+                    ...dia,
+                    horarios: dia.horarios.map(h => h.franja_id !== cambio.franja_id ? h : {
+                        ...h,
+                        total_cupos: cambio.total_cupos,
+                        cupos_disponibles: cambio.cupos_disponibles,
+                        cupos_reservados: cambio.cupos_reservados,
+                        cupos_confirmados: cambio.cupos_confirmados,
+                        cupos_bloqueados: cambio.cupos_bloqueados
+                    })
+                }));
+            },
+            onRecargar: () => fetchCalendario()
+        });
+
+        return () => fuente.close();
+    }, [semanaInicio]);
+
+    // 🆕 Avisos de la lista de espera (promovido / descartado)
+    const ultimoEventoEspera = useRef(null);
+
+    useEffect(() => {
+        if (!user || isStaff) return;
+
+        const CLAVE = 'ultimo_evento_lista_espera';
+        let cancelado = false;
+
+        const consultar = async (avisar) => {
+            try {
+                let desde = ultimoEventoEspera.current ?? Number(localStorage.getItem(CLAVE) || 0);
+                let eventos;
+                do {
+                    eventos = await api.obtenerEventosListaEspera(desde);
+                    if (cancelado) return;
+                    for (const evento of eventos) {
+                        desde = evento.id;
+                        if (!avisar) continue;
+                        const hora = moment(evento.hora_inicio).format('dddd DD/MM HH:mm');
+                        if (evento.tipo === 'promovido') {
+                            showSuccess(`Se liberó un cupo: tu turno del ${hora}hs quedó confirmado.`);
+                            fetchCalendario();
+                        } else if (evento.tipo === 'descartado') {
+                            showInfo(`Saliste de la lista de espera del ${hora}hs: ${evento.detalle}`);
+                        }
+                    }
+                } while (eventos.length === 50);
+                ultimoEventoEspera.current = desde;
+                localStorage.setItem(CLAVE, String(desde));
+            } catch (err) {
+                console.error('❌ Error al consultar la lista de espera:', err);
+            }
+        };
+
+        // La primera vez solo se marca lo ya visto
+        consultar(localStorage.getItem(CLAVE) !== null);
+        const intervalo = setInterval(() => consultar(true), 30000);
+        return () => {
+            cancelado = true;
+            clearInterval(intervalo);
+        };
+    }, [user, isStaff]);
+
     const fetchCalendario = async () => {
         setLoading(true);
         setError(null);
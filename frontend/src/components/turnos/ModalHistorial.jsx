@@ -88,6 +88,12 @@ const ModalHistorial = ({ fecha, data, onCerrar }) => {
                                             } else if (estado === 'FINALIZADO') {
                                                 badgeText = 'Finalizado';
                                                 badgeClasses = 'bg-gray-100 text-gray-800';
+                                            } else if (estado === 'ASISTIO') {
+                                                badgeText = 'Asistió';
+                                                badgeClasses = 'bg-green-100 text-green-800';
+                                            } else if (estado === 'AUSENTE') {
+                                                badgeText = 'Ausente';
+                                                badgeClasses = 'bg-amber-100 text-amber-800';
                                             }
 
                                             return (
@@ -1,6 +1,6 @@
 // frontend/src/components/turnos/ModalHorario.jsx
 
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import moment from 'moment';
 import { Clock, Users, X, UserPlus } from 'lucide-react';
 import ModalReservarParaSocio from './ModalReservarParaSocio';
@@ -8,7 +8,7 @@ import { useCustomAlert } from '../../hooks/useCustomAlert';
 import api from '../../api/api';
 
 const ModalHorario = ({ fecha, hora, data, user, isStaff, onAccion, onEditar, onCerrar }) => {
-    const { cupos_disponibles, cupos_reservados, cupos_confirmados, total_cupos, turnos } = data;
+    const { franja_id, cupos_disponibles, cupos_reservados, cupos_confirmados, total_cupos, turnos } = data;
     const misTurnos = turnos.filter(t => t.es_mio);
     const fechaFormateada = moment(fecha).format('dddd DD [de] MMMM, YYYY');
     
@@ -16,6 +16,40 @@ const ModalHorario = ({ fecha, hora, data, user, isStaff, onAccion, onEditar, on
     const [turnoIdSeleccionado, setTurnoIdSeleccionado] = useState(null);
     
     const { showSuccess, showError, showConfirm, AlertComponent } = useCustomAlert();
+
+    // 🆕 Lista de espera (solo socios, en horas sin cupos)
+    const esperaDisponible = cupos_disponibles === 0 && misTurnos.length === 0 && user && !isStaff;
+    const [posicionEspera, setPosicionEspera] = useState(null);
+
+    useEffect(() => {
+        if (!esperaDisponible || !franja_id) return;
+        api.obtenerListaEspera()
+            .then(entradas => {
+                const entrada = entradas.find(e => e.franja_id === franja_id);
+                setPosicionEspera(entrada ? entrada.posicion : null);
+            })
+            .catch(error => console.error('❌ Error al cargar la lista de espera:', error));
+    }, [franja_id, esperaDisponible]);
+
+    const handleUnirseListaEspera = async () => {
+        try {
+            const response = await api.unirseListaEspera(franja_id);
+            setPosicionEspera(response.posicion);
+            showSuccess(response.detail);
+        } catch (error) {
+            showError(error.response?.data?.detail || 'Error al anotarse en la lista de espera.');
+        }
+    };
+
+    const handleSalirListaEspera = async () => {
+        try {
+            const response = await api.salirListaEspera(franja_id);
+            setPosicionEspera(null);
+            showSuccess(response.detail);
+        } catch (error) {
+            showError(error.response?.data?.detail || 'Error al salir de la lista de espera.');
+        }
+    };
     
     const horaCompleta = `${fecha}T${hora}`;
     const horaTurno = moment(horaCompleta);
@@ -23,9 +57,8 @@ const ModalHorario = ({ fecha, hora, data, user, isStaff, onAccion, onEditar, on
     const puedeCancelar = horaTurno.diff(ahora, 'hours', true) > 1;
 
     const handleAbrirReservarParaSocio = () => {
-        const turnoDisponible = turnos.find(t => t.estado === 'DISPONIBLE' && !t.socio);
-        if (turnoDisponible) {
-            setTurnoIdSeleccionado(turnoDisponible.id);
+        if (franja_id) {
+            setTurnoIdSeleccionado(franja_id);
             setMostrarModalReservarParaSocio(true);
         }
     };
@@ -38,10 +71,10 @@ const ModalHorario = ({ fecha, hora, data, user, isStaff, onAccion, onEditar, on
     };
 
     // ✅ FUNCIÓN PARA RESERVAR (mensajes originales)
-    const handleReservar = async (turnoId) => {
+    const handleReservar = async (franjaId) => {
         
         try {
-            const response = await api.reservarTurno(turnoId);
+            const response = await api.reservarTurno(franjaId);
 
             const clasesRestantes = response.clases_restantes !== undefined ? response.clases_restantes : '?';
             
@@ -223,13 +256,11 @@ const ModalHorario = ({ fecha, hora, data, user, isStaff, onAccion, onEditar, on
                     {cupos_disponibles > 0 && misTurnos.length === 0 && user && !isStaff && (
                         <button
                             onClick={() => {                           
-                                // ✅ Buscar cualquier turno sin socio asignado
-                                const turnoDisponible = turnos.find(t => !t.socio && !t.socio_id);
-                                
-                                if (turnoDisponible) {
-                                    handleReservar(turnoDisponible.id);
+                                // ✅ Reservar un cupo de la franja de esta hora
+                                if (franja_id) {
+                                    handleReservar(franja_id);
                                 } else {
-                                    console.error('❌ No se encontró turno disponible');
+                                    console.error('❌ No se encontró la franja horaria');
                                     showError('No se encontró un turno disponible. Intenta recargando la página.');
                                 }
                             }}
@@ -299,6 +330,31 @@ const ModalHorario = ({ fecha, hora, data, user, isStaff, onAccion, onEditar, on
                         </div>
                     )}
 
+                    {/* 🆕 Lista de espera */}
+                    {esperaDisponible && horaTurno.isAfter(ahora) && (
+                        posicionEspera ? (
+                            <div className="space-y-3">
+                                <p className="text-center text-gray-700">
+                                    Estás en la lista de espera (posición <span className="font-bold">{posicionEspera}</span>).
+                                    Si se libera un cupo, el turno se confirma automáticamente.
+                                </p>
+                                <button
+                                    onClick={handleSalirListaEspera}
+                                    className="w-full py-3 bg-gray-200 text-gray-800 rounded-xl hover:bg-gray-300 font-semibold transition-colors"
+                                >
+                                    Salir de la Lista de Espera
+                                </button>
+                            </div>
+                        ) : (
+                            <button
+                                onClick={handleUnirseListaEspera}
+                                className="w-full py-4 bg-amber-500 text-white rounded-xl hover:bg-amber-600 font-bold text-lg transition-colors"
+                            >
+                                Anotarme en Lista de Espera
+                            </button>
+                        )
+                    )}
+
                     {!user && (
                         <div className="text-center py-6 bg-blue-50 rounded-xl">
                             <p className="text-blue-700 font-medium">Debes iniciar sesión para reservar turnos</p>
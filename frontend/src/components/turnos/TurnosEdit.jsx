@@ -17,6 +17,8 @@ const ESTADOS = [
     { value: 'CONFIRMADO', label: 'Confirmado' },
     { value: 'CANCELADO', label: 'Cancelado/Liberado' },
     { value: 'FINALIZADO', label: 'Finalizado' },
+    { value: 'ASISTIO', label: 'Asistió' },
+    { value: 'AUSENTE', label: 'Ausente' },
 ];
 
 const TurnosEdit = ({ turno, onUpdate, onCancel }) => {
@@ -15,13 +15,11 @@ import EstadisticasMembresias from "@/components/membresias/EstadisticasMembresi
 import FiltrosMembresias from "@/components/membresias/FiltrosMembresias";
 import TablaMembresias from "@/components/membresias/TablaMembresias";
 import ModalEditarPrecios from "@/components/membresias/ModalEditarPrecios"; // 🆕 NUEVO
-import { calcularDiasRestantes, calcularEstadisticas } from "@/components/membresias/utils/membresiaHelpers";
 
 const ControlMembresias = () => {
   const navigate = useNavigate();
   
   const [cuotas, setCuotas] = useState([]);
-  const [cuotasFiltradas, setCuotasFiltradas] = useState([]);
   const [loading, setLoading] = useState(true);
   const [busqueda, setBusqueda] = useState("");
   const [filtroEstado, setFiltroEstado] = useState("todos");
@@ -43,95 +41,79 @@ const ControlMembresias = () => {
     vencidas: 0
   });
 
-  useEffect(() => {
-    cargarCuotas();
-  }, []);
+  // 🆕 El listado se pide paginado y filtrado al servidor (solo la cuota más reciente de cada socio)
+  const [siguiente, setSiguiente] = useState(null);
+  const [cargandoMas, setCargandoMas] = useState(false);
 
   useEffect(() => {
-    filtrarCuotas();
-  }, [cuotas, busqueda, filtroEstado]);
+    // Espera a que se deje de escribir antes de buscar
+    const espera = setTimeout(() => cargarCuotas(), 300);
+    return () => clearTimeout(espera);
+  }, [busqueda, filtroEstado]);
+
+  const filtrosActuales = () => {
+    const filtros = { ultima: 1 };
+    if (busqueda.trim()) filtros.search = busqueda.trim();
+    if (filtroEstado === "activa" || filtroEstado === "vencida") {
+      filtros.estado = filtroEstado;
+    } else if (filtroEstado === "porVencer") {
+      filtros.estado = "activa";
+      filtros.estado_calculado = "por_vencer";
+    }
+    return filtros;
+  };
+
+  // El plan viene por id: se completa plan_info con los planes de la página
+  const enriquecerCuotas = (data) => data.results.map(cuota => ({
+    ...cuota,
+    plan_info: data.planes[cuota.plan],
+    diasRestantes: cuota.dias_restantes,
+    estadoCalculado: cuota.estado === 'activa' && cuota.estado_calculado === 'por_vencer'
+      ? 'porVencer'
+      : cuota.estado,
+  }));
+
+  const cursorDe = (url) => (url ? new URL(url).searchParams.get('cursor') : null);
 
   const cargarCuotas = async () => {
     setLoading(true);
     try {
-      const timestamp = new Date().getTime();
-      const cuotasData = await api.listarCuotas();
-      
-      console.log("📊 Total cuotas recibidas:", cuotasData.length);
-      
-      if (!Array.isArray(cuotasData)) {
-        toast.error("Error en el formato de datos");
-        setCuotas([]);
-        return;
-      }
-      
-      // Filtrar solo la cuota más reciente de cada socio
-      const cuotasPorSocio = {};
-      cuotasData.forEach(cuota => {
-        const socioId = cuota.socio;
-        const fechaInicio = new Date(cuota.fecha_inicio);
-        
-        if (!cuotasPorSocio[socioId]) {
-          cuotasPorSocio[socioId] = cuota;
-        } else {
-          const fechaExistente = new Date(cuotasPorSocio[socioId].fecha_inicio);
-          if (fechaInicio > fechaExistente) {
-            console.log(`🔄 Reemplazando cuota de ${cuota.socio_username}: ID ${cuotasPorSocio[socioId].id} por ID ${cuota.id}`);
-            cuotasPorSocio[socioId] = cuota;
-          }
-        }
-      });
-      
-      const cuotasMasRecientes = Object.values(cuotasPorSocio);
-      
-      console.log("✅ Cuotas filtradas (más recientes):", cuotasMasRecientes.length);
-      
-      // Enriquecer cuotas con datos calculados
-      const cuotasEnriquecidas = cuotasMasRecientes.map(cuota => {
-        const diasRestantes = calcularDiasRestantes(cuota.fecha_vencimiento);
-        let estadoCalculado = cuota.estado;
-        
-        if (cuota.estado === 'activa' && diasRestantes <= 5 && diasRestantes > 0) {
-          estadoCalculado = 'porVencer';
-        }
-        
-        return {
-          ...cuota,
-          diasRestantes,
-          estadoCalculado,
-        };
+      const [data, resumen] = await Promise.all([
+        api.listarCuotasPaginadas(filtrosActuales()),
+        api.obtenerResumenCuotas({ ultima: 1 }),
+      ]);
+
+      setCuotas(enriquecerCuotas(data));
+      setSiguiente(cursorDe(data.next));
+      setStats({
+        total: resumen.total,
+        activas: resumen.activas,
+        porVencer: resumen.por_vencer,
+        vencidas: resumen.vencidas,
       });
-      
-      setCuotas(cuotasEnriquecidas);
-      setStats(calcularEstadisticas(cuotasEnriquecidas));
     } catch (error) {
       console.error("❌ Error al cargar cuotas:", error);
       toast.error(error.response?.data?.detail || "Error al cargar las cuotas");
       setCuotas([]);
+      setSiguiente(null);
     } finally {
       setLoading(false);
     }
   };
 
-  const filtrarCuotas = () => {
-    let resultado = [...cuotas];
-    
-    if (busqueda) {
-      resultado = resultado.filter(cuota => 
-        cuota.socio_username?.toLowerCase().includes(busqueda.toLowerCase()) ||
-        cuota.socio_email?.toLowerCase().includes(busqueda.toLowerCase())
-      );
-    }
-    
-    if (filtroEstado !== "todos") {
-      if (filtroEstado === "porVencer") {
-        resultado = resultado.filter(cuota => cuota.estadoCalculado === "porVencer");
-      } else {
-        resultado = resultado.filter(cuota => cuota.estado === filtroEstado);
-      }
+  const cargarMas = async () => {
+    if (!siguiente) return;
+    setCargandoMas(true);
+    try {
+      const data = await api.listarCuotasPaginadas({ ...filtrosActuales(), cursor: siguiente });
+      setCuotas(prev => [...prev, ...enriquecerCuotas(data)]);
+      setSiguiente(cursorDe(data.next));
+    } catch (error) {
+      console.error("❌ Error al cargar más cuotas:", error);
+      toast.error("Error al cargar más cuotas");
+    } finally {
+      setCargandoMas(false);
     }
-    
-    setCuotasFiltradas(resultado);
   };
 
   const handleAbrirModal = (cuota) => {
@@ -253,11 +235,19 @@ const ControlMembresias = () => {
 
         {/* Tabla de Cuotas */}
         <TablaMembresias 
-          cuotasFiltradas={cuotasFiltradas}
+          cuotasFiltradas={cuotas}
           loading={loading}
           onAbrirModal={handleAbrirModal}
           onRecargar={cargarCuotas}
         />
+
+        {siguiente && (
+          <div className="flex justify-center">
+            <Button variant="outline" onClick={cargarMas} disabled={cargandoMas}>
+              {cargandoMas ? "Cargando..." : "Cargar más cuotas"}
+            </Button>
+          </div>
+        )}
       </div>
 
       {/* Modal de Renovación */}
@@ -48,36 +48,23 @@ const HomeSocio = () => {
   const cargarTurnos = async () => {
     try {
       setLoadingTurnos(true);
-      const dataTurnos = await api.obtenerMisTurnos(); 
+      // Solo lo que muestra la pantalla: próximos y las últimas 5 asistencias
+      const [proximos, historial] = await Promise.all([
+        api.obtenerMisTurnos({ scope: 'upcoming', formato: 'compacto', page_size: 50 }),
+        api.obtenerMisTurnos({ scope: 'past', formato: 'compacto', page_size: 5 }),
+      ]);
       
-      console.log('🎯 Todos mis turnos:', dataTurnos);
+      // Turnos futuros (ya vienen ordenados del más próximo)
+      const futuros = proximos.results;
       
-      const ahora = new Date();
-      
-      if (Array.isArray(dataTurnos)) {
-        // Turnos futuros (CONFIRMADO o cualquier estado que no sea FINALIZADO)
-        const futuros = dataTurnos
-          .filter(t => {
-            const fechaHoraTurno = new Date(t.hora_inicio);
-            return fechaHoraTurno > ahora && t.estado !== 'FINALIZADO';
-          })
-          .sort((a, b) => new Date(a.hora_inicio) - new Date(b.hora_inicio));
-        
-        // 🔹 CAMBIO: Turnos pasados con estado FINALIZADO (donde asistió)
-        const pasados = dataTurnos
-          .filter(t => {
-            const fechaHoraTurno = new Date(t.hora_inicio);
-            return fechaHoraTurno <= ahora && t.estado === 'FINALIZADO';
-          })
-          .sort((a, b) => new Date(b.hora_inicio) - new Date(a.hora_inicio))
-          .slice(0, 5);
-            
-        console.log('📅 Turnos futuros:', futuros);
-        console.log('📋 Turnos pasados (FINALIZADOS):', pasados);
-            
-        setTurnos(futuros);
-        setTurnosHistorial(pasados);
-      }
+      // 🔹 CAMBIO: Turnos pasados donde asistió (FINALIZADO o ASISTIO), del más reciente
+      const pasados = historial.results.filter(t => ['FINALIZADO', 'ASISTIO'].includes(t.estado));
+          
+      console.log('📅 Turnos futuros:', futuros);
+      console.log('📋 Turnos pasados (FINALIZADOS):', pasados);
+          
+      setTurnos(futuros);
+      setTurnosHistorial(pasados);
     } catch (error) {
       console.error("Error al cargar turnos:", error);
       setTurnos([]);
@@ -16,8 +16,10 @@ export const getCalendarioTurnos = async (fechaInicio, fechaFin) => {
 };
 
 // Acciones del Socio
-export const reservarTurno = async (turnoId) => {
-    const response = await apiClient.post(`/turnos/turno/${turnoId}/reservar/`);
+export const reservarTurno = async (franjaId) => {
+    const response = await apiClient.post('/turnos/turno/reservar/', {
+        franja_id: franjaId
+    });
     return response.data;
 };
 